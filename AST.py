@@ -1,5 +1,8 @@
 from Token import Token, TokenType
 from Expression import *
+from Parallel import ParallelFor
+from Modules import Import
+from Tasks import finish_tasks
 from typing import List
 
 class AST:
@@ -13,7 +16,15 @@ class AST:
         # The final tree structure is stored in self.tree
 
     def evaluate(self, env, verbose=True):
-        return self.tree.evaluate(env, verbose)  # Call the evaluate() on the root node (self.tree), which recursively evaluates the entire AST
+        # Call evaluate_in() on the root node (self.tree), which recursively evaluates the entire AST.
+        # Top-level variables are stored in env itself, so they outlive the run (e.g. between REPL lines)
+        try:
+            result = self.tree.evaluate_in(env, verbose)
+        except BaseException:
+            finish_tasks(error=True)  # Stop any spawned tasks that are still suspended
+            raise
+        finish_tasks()  # The program ends when the tasks it spawned have finished
+        return result
     
     # Checks if the next token matches a given type
     def _match(self, *types: List[TokenType]) -> bool:
@@ -90,6 +101,15 @@ class AST:
         if self._match(TokenType.RETURN):
             return self._return_statement()  # Parse a return statement
 
+        if self._match(TokenType.YIELD):
+            return Yield(self._expression())  # Parse a yield statement (the function becomes a generator)
+
+        if self._match(TokenType.IMPORT):
+            # Parse import "path/lib.luma"; the path must be a plain string so it can be loaded ahead of time
+            if not self._match(TokenType.STRING):
+                raise SyntaxError("Expected a file path in quotes after 'import'")
+            return Import(self._previous().literal)
+
         if self._match(TokenType.FUN):
             return self._function_declaration()  # Parse a function declaration
 
@@ -332,8 +352,14 @@ class AST:
 
 
     def _for_loop(self):
-        # A for loop must start with a '(' before initializer
-        if not self._match(TokenType.LEFT_PAREN):
+        has_paren = self._match(TokenType.LEFT_PAREN)  # The parentheses are optional for 'for x in xs'
+
+        # Iterator form: for x in xs { ... } or for (x in range(10)) { ... }
+        if self._check(TokenType.IDENTIFIER) and self._check_next(TokenType.IN):
+            return self._for_each_loop(has_paren)
+
+        # A C-style for loop must start with a '(' before initializer
+        if not has_paren:
             raise SyntaxError("Expected '(' after 'for'")
 
         initializer = None
@@ -376,6 +402,38 @@ class AST:
 
         return For(initializer, condition, increment, body)  # Return the For AST node
 
+    def _for_each_loop(self, has_paren):
+        name, iterable, body = self._for_each_parts(has_paren)
+        return ForEach(name, iterable, body)  # Return the ForEach AST node
+
+    # Parses the rest of 'for x in xs { ... }' after 'for' (and the optional '(')
+    # Returns the loop variable name, the collection expression and the body statements
+    def _for_each_parts(self, has_paren):
+        name_token = self._advance()  # Consume the loop variable name
+        self._advance()  # Consume 'in'
+
+        iterable = self._expression()  # Parse the collection or range() being looped over
+
+        # If the header was opened with '(' it must be closed with ')'
+        if has_paren and not self._match(TokenType.RIGHT_PAREN):
+            raise SyntaxError("Expected ')' after for loop collection")
+
+        # Expect opening '{' for the for-loop body
+        if not self._match(TokenType.LEFT_BRACE):
+            raise SyntaxError("Expected '{' to start for-loop block")
+
+        body = []  # Collect all statements inside the loop body
+        while not self._check(TokenType.RIGHT_BRACE) and not self._at_end():
+            stmt = self._statement()
+            if stmt:
+                body.append(stmt)
+
+        # Expect closing '}' after loop body
+        if not self._match(TokenType.RIGHT_BRACE):
+            raise SyntaxError("Expected '}' to close for-loop block")
+
+        return name_token.lexeme, iterable, body
+
     
     #---------------------------------------------------
     # Expression Parsing Functions (Recursive Descent) |
@@ -466,10 +524,10 @@ class AST:
             expression = Binary(expression, operator, right)
         return expression
 
-    # Handles /, *, % operators
+    # Handles /, //, *, % operators
     def _factor(self, verbose=True):
         expression = self._exponent(verbose)
-        while self._match(TokenType.DIV, TokenType.TIMES, TokenType.MOD):
+        while self._match(TokenType.DIV, TokenType.FLOOR_DIV, TokenType.TIMES, TokenType.MOD):
             if self._at_end():  
                 raise SyntaxError(f"Missing operand after '{self._previous().lexeme}'")
             operator = self._previous()
@@ -513,17 +571,58 @@ class AST:
 
         return self._primary()
 
+    # Parses the tokens of one {expression} inside an interpolated string
+    def _embedded_expression(self, tokens: List[Token]):
+        saved_tokens, saved_current = self.tokens, self._current
+        self.tokens, self._current = tokens, 0
+        try:
+            expression = self._expression()
+            if not self._at_end():
+                raise SyntaxError(f"Unexpected token '{self._peek().lexeme}' in string interpolation at line {self._peek().line}")
+            return expression
+        finally:
+            self.tokens, self._current = saved_tokens, saved_current
+
     def _primary(self):
         # Match a numeric literal (float or int) and return a Literal node
-        if self._match(TokenType.FLOAT):
+        if self._match(TokenType.FLOAT, TokenType.INTEGER):
             if self._check(TokenType.BANG):  # Disallow something like `5!`
                 raise SyntaxError(f"Syntax Error: Unexpected token '!' after number.")
-            return Literal(self._previous().literal)  # Create a Literal with the matched float value
+            return Literal(self._previous().literal)  # Create a Literal with the matched number
 
         # Match a string literal like "hello"
         if self._match(TokenType.STRING):  
             return Literal(self._previous().literal)  # Return as a Literal node
 
+        # Match an interpolated string like "score: {x} of {y}"
+        # Each embedded expression is parsed once, here, into its own expression node
+        if self._match(TokenType.INTERPOLATED_STRING):
+            parts = []
+            for part in self._previous().literal:
+                if isinstance(part, str):
+                    parts.append(part)  # Literal text is kept as it is
+                else:
+                    parts.append(self._embedded_expression(part))
+            if all(isinstance(part, str) for part in parts):
+                return Literal("".join(parts))  # Only escaped braces, no expressions
+            return Interpolation(parts)
+
+        # Match parallel for x in xs { ... }, which gives the list of the body's values
+        if self._match(TokenType.PARALLEL):
+            if not self._match(TokenType.FOR):
+                raise SyntaxError("Expected 'for' after 'parallel'")
+            has_paren = self._match(TokenType.LEFT_PAREN)
+            if not (self._check(TokenType.IDENTIFIER) and self._check_next(TokenType.IN)):
+                raise SyntaxError("'parallel' only works with loops like 'for x in xs'")
+            return ParallelFor(*self._for_each_parts(has_paren))
+
+        # Match spawn f(args), which runs the call as a separate task
+        if self._match(TokenType.SPAWN):
+            call = self._primary()
+            if not isinstance(call, FunctionCall):
+                raise SyntaxError("Expected a function call after 'spawn'")
+            return Spawn(call.callee, call.arguments)
+
         # Match a boolean literal (true or false)
         if self._match(TokenType.BOOLEAN):  
             return Literal(self._previous().literal)  # Return as a Literal node
@@ -546,11 +645,17 @@ class AST:
                     if not self._match(TokenType.RIGHT_PAREN):
                         raise SyntaxError("Expected ')' after function arguments")
 
-                    # Special handling for built-in float() and str()
+                    # Special handling for built-in float(), int() and str()
+                    # (every other built-in is a native function, see Builtins.py)
                     if isinstance(expr, Variable) and expr.name.lexeme == "float":
                         if len(arguments) != 1:
                             raise SyntaxError("float() expects exactly 1 argument")
                         return ToFloat(arguments[0])
+
+                    if isinstance(expr, Variable) and expr.name.lexeme == "int":
+                        if len(arguments) != 1:
+                            raise SyntaxError("int() expects exactly 1 argument")
+                        return ToInt(arguments[0])
                     
                     if isinstance(expr, Variable) and expr.name.lexeme == "str":
                         if len(arguments) != 1:
@@ -560,9 +665,21 @@ class AST:
                     # If it's a regular function call, wrap it
                     expr = FunctionCall(expr, arguments)
 
-                # Handle indexing like arr[1]
+                # Handle indexing like arr[1] and slices like v[1:3]
                 elif self._match(TokenType.LEFT_BRACKET):
-                    index_expr = self._expression()
+                    index_expr = None
+                    if not self._check(TokenType.COLON):
+                        index_expr = self._expression()
+
+                    if self._match(TokenType.COLON):
+                        stop_expr = None
+                        if not self._check(TokenType.RIGHT_BRACKET):
+                            stop_expr = self._expression()
+                        if not self._match(TokenType.RIGHT_BRACKET):
+                            raise SyntaxError("Expected ']' after slice")
+                        expr = SliceAccess(expr, index_expr, stop_expr)
+                        continue
+
                     if not self._match(TokenType.RIGHT_BRACKET):
                         raise SyntaxError("Expected ']' after index")
                     expr = IndexAccess(expr, index_expr)
@@ -597,10 +714,11 @@ class AST:
         if self._match(TokenType.LEFT_BRACKET):
             elements = []
             if not self._check(TokenType.RIGHT_BRACKET):  # Allow empty list
-                while True:
-                    elements.append(self._expression())  # Parse each element
-                    if not self._match(TokenType.COMMA):
-                        break
+                elements.append(self._expression())
+                if self._match(TokenType.FOR):
+                    return self._list_comprehension(elements[0])
+                while self._match(TokenType.COMMA):
+                    elements.append(self._expression())  # Parse each remaining element
             if not self._match(TokenType.RIGHT_BRACKET):
                 raise SyntaxError("Expected ']' after list literal")
             return ListLiteral(elements)
@@ -610,4 +728,20 @@ class AST:
             f"Unexpected token: '{self._peek().lexeme}' at line {self._peek().line}, column {self._peek().col}."
         )
 
+    # Parses the rest of [expr for x in xs if cond], after 'for'
+    def _list_comprehension(self, element):
+        if not (self._check(TokenType.IDENTIFIER) and self._check_next(TokenType.IN)):
+            raise SyntaxError("Expected 'x in ...' after 'for' in list comprehension")
+        name_token = self._advance()  # Consume the loop variable name
+        self._advance()  # Consume 'in'
+        iterable = self._expression()
+
+        condition = None
+        if self._match(TokenType.IF):
+            condition = self._expression()
+
+        if not self._match(TokenType.RIGHT_BRACKET):
+            raise SyntaxError("Expected ']' after list comprehension")
+        return ListComprehension(element, name_token.lexeme, iterable, condition)
+
 
@@ -0,0 +1,108 @@
+import io
+import os
+import json
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import luma
+from Errors import LumaError
+
+
+# The outcome of running one program in batch mode
+class BatchResult:
+    def __init__(self, path: str, ok: bool, seconds: float, stdout: str, stderr: str, error: str = None):
+        self.path = path        # The .luma file that was run
+        self.ok = ok            # True if the program finished without an error
+        self.seconds = seconds  # Time spent parsing and running it, measured inside the worker
+        self.stdout = stdout    # Everything the program printed
+        self.stderr = stderr    # Anything written to stderr while it ran
+        self.error = error      # Error message if it failed, otherwise None
+
+    def to_dict(self) -> dict:
+        return {"path": self.path, "ok": self.ok, "seconds": self.seconds,
+                "stdout": self.stdout, "stderr": self.stderr, "error": self.error}
+
+
+# Expands the paths given on the command line: directories give all the .luma files
+# inside them (recursively, in sorted order), files are kept as they are
+def collect_programs(paths) -> list:
+    programs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, files in sorted(os.walk(path)):
+                programs.extend(os.path.join(folder, name) for name in sorted(files) if name.endswith(".luma"))
+        else:
+            programs.append(path)
+    return programs
+
+
+# Answers for ask are taken from a file next to the program with the same name
+# and an .input extension (e.g. Game.input for Game.luma). Without one, ask fails
+def _answers_for(path: str) -> list:
+    input_path = os.path.splitext(path)[0] + ".input"
+    if os.path.isfile(input_path):
+        with open(input_path, "r") as file:
+            return file.read().splitlines()
+    return []
+
+
+# Parses and runs Luma source with its own Environment and captured output.
+# Used by the batch workers and the job server, so it must never raise: every failure becomes a result
+def run_source(source: str, answers: list, path: str = None, limits=None) -> BatchResult:
+    stdout, stderr = io.StringIO(), io.StringIO()
+    start = time.perf_counter()
+    error = None
+    try:
+        with contextlib.redirect_stderr(stderr):
+            luma.compile(source, path).run(stdout=stdout, stdin=answers, limits=limits)
+    except LumaError as e:
+        error = f"{type(e).__name__}: {e.message}" if e.line is None else f"{type(e).__name__} on line {e.line}: {e.message}"
+    seconds = time.perf_counter() - start
+    return BatchResult(path, error is None, seconds, stdout.getvalue(), stderr.getvalue(), error)
+
+
+# Reads and runs one program file, optionally with sandbox limits. Runs inside a worker process
+def run_program(path: str, limits=None) -> BatchResult:
+    try:
+        with open(path, "r") as file:
+            source = file.read()
+        answers = _answers_for(path)
+    except (OSError, UnicodeDecodeError) as e:
+        return BatchResult(path, False, 0.0, "", "", f"Could not read '{path}': {e}")
+    return run_source(source, answers, path, limits)
+
+
+# Runs every program and returns their results in the same order as paths.
+# jobs=1 runs them one after another in this process; otherwise a pool of jobs worker
+# processes is used, and each worker parses the programs it is given itself
+def run_batch(paths, jobs: int = 1, limits=None) -> list:
+    paths = list(paths)
+    if jobs == 1:
+        return [run_program(path, limits) for path in paths]
+    # Hand out several programs at a time so thousands of small scripts are not
+    # dominated by sending one task at a time, but keep chunks small enough to balance the load
+    chunksize = max(1, len(paths) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(run_program, paths, [limits] * len(paths), chunksize=chunksize))
+
+
+# Prints one line per program and a summary, and optionally writes every result
+# (including the captured output) to a JSON Lines file. Returns the number of failures
+def report(results: list, wall_seconds: float, jobs: int, results_path: str = None) -> int:
+    for result in results:
+        status = "ok  " if result.ok else "FAIL"
+        line = f"{status} {result.seconds:8.3f}s  {result.path}"
+        if not result.ok:
+            line += f"  ({result.error})"
+        print(line)
+
+    failed = sum(1 for result in results if not result.ok)
+    busy = sum(result.seconds for result in results)
+    print(f"\n{len(results)} programs, {failed} failed, {wall_seconds:.2f}s wall time with {jobs} job(s) "
+          f"({busy:.2f}s of program time)")
+
+    if results_path is not None:
+        with open(results_path, "w") as file:
+            for result in results:
+                file.write(json.dumps(result.to_dict()) + "\n")
+    return failed
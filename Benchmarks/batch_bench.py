@@ -0,0 +1,71 @@
+# Runs a directory of generated Luma programs in batch mode and reports how it scales:
+#   process per file - one `python luma.py file` per program (what the nightly jobs used to do)
+#   --jobs 1 .. N    - Batch.run_batch with 1, 2, 4, ... up to N worker processes
+#
+# Usage: python Benchmarks/batch_bench.py [programs] [max_jobs]
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Batch import run_batch
+
+# A CPU-bound program, varied a little per file so every file differs
+SOURCE = """
+total = 0
+for (i = 0; i < {limit}; i = i + 1) {{
+  if (i % 3 == 0) {{
+    total = total + i
+  }}
+}}
+print "program {n}: {{total}}"
+"""
+
+
+def job_counts(max_jobs):
+    counts, jobs = [], 1
+    while jobs < max_jobs:
+        counts.append(jobs)
+        jobs *= 2
+    return counts + [max_jobs]
+
+
+def main():
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    max_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for n in range(programs):
+            path = os.path.join(folder, f"program{n:04}.luma")
+            with open(path, "w") as file:
+                file.write(SOURCE.format(limit=5000 + n, n=n))
+            paths.append(path)
+
+        print(f"{programs} programs, {os.cpu_count()} CPU(s)\n")
+
+        # Spawning an interpreter per file is slow, so time a sample and scale it up
+        sample = paths[:min(programs, 20)]
+        start = time.perf_counter()
+        for path in sample:
+            subprocess.run([sys.executable, os.path.join(ROOT, "luma.py"), path], check=True, stdout=subprocess.DEVNULL)
+        per_process = (time.perf_counter() - start) / len(sample) * programs
+        print(f"{'process per file':<18}{per_process:>8.2f}s  (estimated from {len(sample)} files)")
+
+        baseline = None
+        for jobs in job_counts(max_jobs):
+            start = time.perf_counter()
+            results = run_batch(paths, jobs)
+            seconds = time.perf_counter() - start
+            assert all(result.ok for result in results)
+            baseline = baseline or seconds
+            print(f"{f'--jobs {jobs}':<18}{seconds:>8.2f}s  speedup {baseline / seconds:5.2f}x  "
+                  f"efficiency {baseline / seconds / jobs:6.1%}  ({per_process / seconds:.1f}x vs process per file)")
+
+
+if __name__ == "__main__":
+    main()
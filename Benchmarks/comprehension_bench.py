@@ -0,0 +1,58 @@
+# Compares three ways of building a transformed, filtered list in Luma:
+#   index loop     - for (i = 0; ...) { v = xs[i] ... out = out + [v * v] }
+#   for-each loop  - for v in xs { if (...) { out = out + [v * v] } }
+#   comprehension  - [v * v for v in xs if v % 3 != 0]
+#
+# Usage: python Benchmarks/comprehension_bench.py [items]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+
+PROGRAMS = {
+    "index loop": """
+out = []
+for (i = 0; i < len(xs); i = i + 1) {
+  v = xs[i]
+  if (v % 3 != 0) { out = out + [v * v] }
+}
+""",
+    "for-each loop": """
+out = []
+for v in xs {
+  if (v % 3 != 0) { out = out + [v * v] }
+}
+""",
+    "comprehension": """
+out = [v * v for v in xs if v % 3 != 0]
+""",
+}
+
+
+# Best of three runs, to keep noise from other processes out of the comparison
+def time_program(program, xs):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        result = program.run(globals={"xs": xs}, stdout=io.StringIO())
+        best = min(best, time.perf_counter() - start)
+    assert result.globals["out"] == [v * v for v in xs if v % 3 != 0]
+    return best
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    xs = list(range(items))
+    baseline = None
+    for label, source in PROGRAMS.items():
+        elapsed = time_program(luma.compile(source), xs)
+        baseline = baseline or elapsed
+        print(f"{label:<16}{items / elapsed:>12,.0f} items/sec  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Startup time and peak memory of getting a table of rows into a Luma program:
+#   literal    - the rows written into the source as a list literal, scanned and parsed as code
+#   load_csv   - rows = load_csv(path)
+#   load_json  - rows = load_json(path)
+#   csv_rows   - the rows streamed one at a time and added up, never all in memory
+# Every run happens in its own process (timed from compiling the program to the end of its run),
+# so its peak memory can be read from the OS.
+#
+# Usage: python Benchmarks/data_bench.py [rows]
+import io
+import os
+import sys
+import csv
+import json
+import time
+import tempfile
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PROGRAMS = {
+    "load_csv": "rows = load_csv(path)",
+    "load_json": "rows = load_json(path)",
+    "csv_rows": """
+fun score(row) { return row[2] }
+total = sum(map(score, csv_rows(path)))
+""",
+}
+
+
+def make_rows(count):
+    return [[i, f"name{i}", i % 1000 / 4, f"city{i % 50}"] for i in range(count)]
+
+
+# Writes the same rows as a CSV file, a JSON file and a Luma program with a list literal
+def write_files(directory, rows):
+    with open(os.path.join(directory, "rows.csv"), "w", newline="") as file:
+        csv.writer(file).writerows(rows)
+    with open(os.path.join(directory, "rows.json"), "w") as file:
+        json.dump(rows, file)
+    with open(os.path.join(directory, "rows.luma"), "w") as file:
+        file.write("rows = [\n" + ",\n".join(json.dumps(row) for row in rows) + "\n]\n")
+
+
+# Runs one loader inside a child process and prints seconds and peak memory
+def child(kind, directory, count):
+    import luma
+    start = time.perf_counter()
+    if kind == "literal":
+        with open(os.path.join(directory, "rows.luma")) as file:
+            program = luma.compile(file.read())
+        path = None
+    else:
+        program = luma.compile(PROGRAMS[kind])
+        path = os.path.join(directory, "rows.json" if kind == "load_json" else "rows.csv")
+    result = program.run(globals={"path": path}, stdout=io.StringIO())
+    seconds = time.perf_counter() - start
+    if kind == "csv_rows":
+        assert result.globals["total"] == sum(i % 1000 / 4 for i in range(count))
+    else:
+        assert len(result.globals["rows"]) == count
+    print(f"{seconds} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}")
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(directory, make_rows(count))
+        print(f"{count:,} rows of 4 values\n")
+        print(f"{'loader':<12}{'seconds':>10}{'peak memory':>14}")
+        for kind in ["literal", *PROGRAMS]:
+            completed = subprocess.run([sys.executable, __file__, "--child", kind, directory, str(count)],
+                                       capture_output=True, text=True, check=True)
+            seconds, peak_kb = completed.stdout.split()
+            print(f"{kind:<12}{float(seconds):>9.2f}s{int(peak_kb) / 1024:>11.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Writing rows computed by a Luma program into a SQLite database file:
+#   print + parse       - the program prints "a,b" lines; a separate Python process parses them and inserts
+#   execute loop        - d.execute() once per row, inside one d.begin() / d.commit() transaction
+#   execute_many        - d.execute_many() with a list comprehension of all rows
+#   execute_many lazy   - d.execute_many() with map() over a range, so the rows are never all in memory
+#
+# Usage: python Benchmarks/db_bench.py [rows]
+import io
+import os
+import sys
+import csv
+import time
+import sqlite3
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+
+LUMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "luma.py")
+CREATE = "CREATE TABLE results (a INTEGER, b INTEGER)"
+INSERT = "INSERT INTO results VALUES (?, ?)"
+
+PRINTER = """
+for i in range({rows}) {{
+  print "{{i}},{{i * 2}}"
+}}
+"""
+
+PROGRAMS = {
+    "execute loop": """
+d = db(path)
+d.begin()
+for i in range(rows) {
+  d.execute(sql, [i, i * 2])
+}
+d.commit()
+d.close()
+""",
+    "execute_many": """
+d = db(path)
+d.execute_many(sql, [[i, i * 2] for i in range(rows)])
+d.close()
+""",
+    "execute_many lazy": """
+fun row(i) { return [i, i * 2] }
+d = db(path)
+d.execute_many(sql, map(row, range(rows)))
+d.close()
+""",
+}
+
+
+def new_database(directory, name):
+    path = os.path.join(directory, name.replace(" ", "_") + ".db")
+    with sqlite3.connect(path) as connection:
+        connection.execute(CREATE)
+    connection.close()
+    return path
+
+
+def count_rows(path):
+    connection = sqlite3.connect(path)
+    count = connection.execute("SELECT count(*) FROM results").fetchone()[0]
+    connection.close()
+    return count
+
+
+# The way results were stored before: the Luma program prints, another process parses and inserts
+def print_and_parse(path, rows, directory):
+    program = os.path.join(directory, "printer.luma")
+    with open(program, "w") as file:
+        file.write(PRINTER.format(rows=rows))
+    printer = subprocess.Popen([sys.executable, LUMA, program], stdout=subprocess.PIPE, text=True)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(INSERT, ((int(a), int(b)) for a, b in csv.reader(printer.stdout)))
+    connection.close()
+    printer.wait()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{rows:,} rows\n")
+    print(f"{'writer':<20}{'seconds':>10}{'rows/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = new_database(directory, "print + parse")
+        start = time.perf_counter()
+        print_and_parse(path, rows, directory)
+        seconds = time.perf_counter() - start
+        assert count_rows(path) == rows
+        print(f"{'print + parse':<20}{seconds:>9.2f}s{rows / seconds:>12,.0f}")
+
+        for label, source in PROGRAMS.items():
+            path = new_database(directory, label)
+            start = time.perf_counter()
+            luma.compile(source).run(globals={"path": path, "rows": rows, "sql": INSERT}, stdout=io.StringIO())
+            seconds = time.perf_counter() - start
+            assert count_rows(path) == rows
+            print(f"{label:<20}{seconds:>9.2f}s{rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
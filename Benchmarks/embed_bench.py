@@ -0,0 +1,66 @@
+# Runs a small Luma program 10,000 times through the embedding API and compares:
+#   reparse every run  - scan, parse and evaluate the source each time (what luma.run() does)
+#   compile once       - luma.compile() once, then Program.run() with a fresh environment each time
+#   compile once, 8 threads - the same Program shared by a thread pool
+#
+# Usage: python Benchmarks/embed_bench.py [runs]
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+
+SOURCE = """
+fun score(values) {
+  total = 0
+  for v in values {
+    if (v > 2) {
+      total = total + v * 2
+    } else {
+      total = total + v
+    }
+  }
+  return total
+}
+
+result = score(data)
+print "score for {user}: {result}"
+"""
+
+
+def run_program(program, i):
+    out = io.StringIO()
+    result = program.run(globals={"data": [1, 2, 3, 4, 5], "user": f"user{i}"}, stdout=out)
+    return result.globals["result"]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    start = time.perf_counter()
+    for i in range(runs):
+        run_program(luma.compile(SOURCE), i)
+    reparse = time.perf_counter() - start
+    print(f"{'reparse every run':<26}{runs / reparse:>10,.0f} runs/sec")
+
+    program = luma.compile(SOURCE)
+    start = time.perf_counter()
+    for i in range(runs):
+        run_program(program, i)
+    compiled = time.perf_counter() - start
+    print(f"{'compile once':<26}{runs / compiled:>10,.0f} runs/sec  ({reparse / compiled:.2f}x)")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: run_program(program, i), range(runs)))
+    threaded = time.perf_counter() - start
+    assert all(result == 27 for result in results)
+    print(f"{'compile once, 8 threads':<26}{runs / threaded:>10,.0f} runs/sec  ({reparse / threaded:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
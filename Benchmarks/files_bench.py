@@ -0,0 +1,94 @@
+# Streams a generated log file through Luma's file builtins and compares them with plain Python:
+#   for loop       - for line in lines(path) { ... }   (one interpreted loop iteration per line)
+#   map and sum    - sum(map(len, lines(path)))          (no interpreted code per line)
+#   read_chunk     - 1 MB chunks in a while loop
+#   python         - for line in open(path) in Python, as the reference for disk speed
+# Every run happens in its own process, so its peak memory can be read from the OS.
+# The file is written once to a temporary directory and reused by later runs of the same size.
+#
+# Usage: python Benchmarks/files_bench.py [megabytes]
+import io
+import os
+import sys
+import time
+import tempfile
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PROGRAMS = {
+    "for loop": """
+count = 0
+total = 0
+for line in lines(path) {
+  count = count + 1
+  total = total + len(line)
+}
+""",
+    "map and sum": """
+total = sum(map(len, lines(path)))
+""",
+    "read_chunk": """
+f = open(path)
+total = 0
+chunk = read_chunk(f, 1048576)
+while (chunk != "") {
+  total = total + len(chunk)
+  chunk = read_chunk(f, 1048576)
+}
+close(f)
+""",
+}
+
+
+def write_log(path, megabytes):
+    line_number = 0
+    with open(path, "w") as log:
+        while log.tell() < megabytes << 20:
+            lines = []
+            for _ in range(10_000):
+                level = "ERROR" if line_number % 97 == 0 else "INFO"
+                lines.append(f"2025-01-01 12:{line_number // 60 % 60:02d}:{line_number % 60:02d} {level} "
+                             f"worker-{line_number % 32} handled request {line_number} in {line_number % 997} ms\n")
+                line_number += 1
+            log.write("".join(lines))
+
+
+# Runs one reader inside a child process and prints seconds and peak memory
+def child(kind, path):
+    start = time.perf_counter()
+    if kind == "python":
+        total = 0
+        with open(path) as log:
+            for line in log:
+                total += len(line)
+    else:
+        import luma
+        luma.compile(PROGRAMS[kind]).run(globals={"path": path}, stdout=io.StringIO())
+    seconds = time.perf_counter() - start
+    print(f"{seconds} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}")
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+        return
+
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    path = os.path.join(tempfile.gettempdir(), f"luma_files_bench_{megabytes}mb.log")
+    if not os.path.exists(path):
+        write_log(path, megabytes)
+    size_mb = os.path.getsize(path) / (1 << 20)
+    print(f"{path}: {size_mb:.0f} MB\n")
+    print(f"{'reader':<14}{'seconds':>10}{'MB/s':>10}{'peak memory':>14}")
+    for kind in ["python", *PROGRAMS]:
+        completed = subprocess.run([sys.executable, __file__, "--child", kind, path],
+                                   capture_output=True, text=True, check=True)
+        seconds, peak_kb = completed.stdout.split()
+        seconds = float(seconds)
+        print(f"{kind:<14}{seconds:>9.1f}s{size_mb / seconds:>10.0f}{int(peak_kb) / 1024:>11.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Compares three ways of formatting output lines in a Luma loop:
+#   commas         - print "score: ", x, " of ", y
+#   concatenation  - print "score: " + str(x) + " of " + str(y)
+#   interpolation  - print "score: {x} of {y}"
+# Output goes to the null device, so the numbers show formatting cost rather than terminal speed.
+#
+# Usage: python Benchmarks/format_bench.py [number_of_lines]
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import Output
+from AST import AST
+from Environment import Environment
+from Scanner import Scanner
+
+STATEMENTS = {
+    "commas": 'print "item ", i, ": score ", i * 2, " of ", total, " (", name, ")"',
+    "concatenation": 'print "item " + str(i) + ": score " + str(i * 2) + " of " + str(total) + " (" + name + ")"',
+    "interpolation": 'print "item {i}: score {i * 2} of {total} ({name})"',
+}
+
+PROGRAM = """
+total = {lines}
+name = "nightly"
+for i in range(0, {lines}) {{
+  {statement}
+}}
+"""
+
+
+# Best of three runs, to keep noise from other processes out of the comparison
+def time_program(ast, sink):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        with redirect_stdout(sink):
+            ast.evaluate(Environment(), verbose=False)
+            Output.flush_output()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    Output.configure_output(Output.FLUSH_BYTES)
+    with open(os.devnull, "w") as sink:
+        baseline = None
+        for label, statement in STATEMENTS.items():
+            ast = AST(Scanner(PROGRAM.format(lines=lines, statement=statement)).scan_tokens())
+            elapsed = time_program(ast, sink)
+            baseline = baseline or elapsed
+            print(f"{label:<16}{lines / elapsed:>12,.0f} lines/sec  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
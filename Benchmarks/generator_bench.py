@@ -0,0 +1,74 @@
+# Peak memory of a five-stage pipeline, lazy (generators) and eager (a full list after every stage):
+#   numbers(n) -> map(square) -> filter(even) -> map(halve) -> sum
+# Every run happens in its own process, so its peak memory can be read from the OS.
+# The lazy pipeline should stay at the same size however many items flow through it.
+#
+# Usage: python Benchmarks/generator_bench.py [items] [eager_items]
+import io
+import os
+import sys
+import time
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+STAGES = """
+fun numbers(n) {
+  for i in range(n) {
+    yield i
+  }
+}
+fun square(x) { return x * x }
+fun even(x) { return x % 2 == 0 }
+fun halve(x) { return x // 2 }
+"""
+
+LAZY = STAGES + """
+total = sum(map(halve, filter(even, map(square, numbers(n)))))
+"""
+
+EAGER = STAGES + """
+a = list(numbers(n))
+b = list(map(square, a))
+c = list(filter(even, b))
+d = list(map(halve, c))
+total = sum(d)
+"""
+
+
+# Runs one pipeline inside a child process and prints seconds and peak memory
+def child(kind, items):
+    import luma
+    program = luma.compile(LAZY if kind == "lazy" else EAGER)
+    start = time.perf_counter()
+    result = program.run(globals={"n": items}, stdout=io.StringIO())
+    seconds = time.perf_counter() - start
+    expected = sum(i * i // 2 for i in range(0, items, 2))
+    assert result.globals["total"] == expected
+    print(f"{seconds} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}")
+
+
+def measure(kind, items):
+    completed = subprocess.run([sys.executable, __file__, "--child", kind, str(items)],
+                               capture_output=True, text=True, check=True)
+    seconds, peak_kb = completed.stdout.split()
+    return float(seconds), int(peak_kb) / 1024
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], int(sys.argv[3]))
+        return
+
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    eager_items = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    print(f"{'pipeline':<8}{'items':>12}{'seconds':>10}{'peak memory':>14}")
+    runs = [("lazy", eager_items), ("eager", eager_items), ("lazy", items)]
+    for kind, count in runs:
+        seconds, peak_mb = measure(kind, count)
+        print(f"{kind:<8}{count:>12,}{seconds:>9.1f}s{peak_mb:>11.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
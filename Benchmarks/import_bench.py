@@ -0,0 +1,74 @@
+# Startup cost of a program that uses a large library of helper functions:
+#   pasted      - the helpers copied into the program, so every compile scans and parses them again
+#   import      - import "helpers.luma", first run in the process (the module is parsed and run)
+#   import warm - the same program compiled and run again: the cached tree is reused (the module still runs)
+# and the time to parse several independent modules at startup, one after another and in parallel.
+#
+# Usage: python Benchmarks/import_bench.py [functions_per_module] [modules]
+import gc
+import io
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+import Modules
+
+MAIN = 'import "{name}"\nprint helper_{last}(1)\n'
+
+
+def library(prefix, functions):
+    return "".join(f"fun {prefix}_{i}(x) {{\n  y = x * {i}\n  return y + {i}\n}}\n" for i in range(functions))
+
+
+# Compiles and runs a program a few times in this process and gives the time of each round
+def rounds(source, path, count=3):
+    times = []
+    for _ in range(count):
+        gc.collect()  # Keep the trees left over from earlier rounds out of the timing
+        start = time.perf_counter()
+        luma.compile(source, path).run(stdout=io.StringIO())
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    modules = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "helpers.luma"), "w") as file:
+            file.write(library("helper", functions))
+        main_path = os.path.join(directory, "main.luma")
+        print(f"{functions} helper functions\n")
+
+        pasted = rounds(library("helper", functions) + f"print helper_{functions - 1}(1)\n", main_path)
+        print(f"{'pasted':<14}{min(pasted) * 1000:>10.1f} ms per run")
+        imported = rounds(MAIN.format(name="helpers.luma", last=functions - 1), main_path)
+        print(f"{'import':<14}{imported[0] * 1000:>10.1f} ms first run")
+        print(f"{'import warm':<14}{min(imported[1:]) * 1000:>10.1f} ms per run")
+
+        names = []
+        for index in range(modules):
+            names.append(f"lib{index}.luma")
+            with open(os.path.join(directory, names[-1]), "w") as file:
+                file.write(library(f"lib{index}", functions))
+        source = "".join(f'import "{name}"\n' for name in names)
+        print(f"\n{modules} modules of {functions} functions, parsed at startup ({os.cpu_count()} CPU(s))")
+        for label, threshold in (("one by one", float("inf")), ("in parallel", 0)):
+            if threshold == 0 and (os.cpu_count() or 1) == 1:
+                print(f"{label:<14}  (needs more than one CPU)")
+                continue
+            Modules._modules.clear()
+            gc.collect()
+            Modules.PARALLEL_PARSE_BYTES = threshold
+            Modules._get_pool()  # Start the worker processes before timing
+            start = time.perf_counter()
+            luma.compile(source, main_path)
+            print(f"{label:<14}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
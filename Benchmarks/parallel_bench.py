@@ -0,0 +1,82 @@
+# Scaling of pmap and parallel for with the number of worker processes:
+#   CPU-bound  - pmap(fib, ...) where every item costs milliseconds of work
+#   parallel for over a range with a loop in the body
+#   shipping   - pmap(abs, ...) over 1M integers, through shared memory and pickled
+#
+# Usage: python Benchmarks/parallel_bench.py [max_workers]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+import Parallel
+
+CPU_BOUND = """
+fun fib(n) {
+  if (n < 2) { return n }
+  return fib(n - 1) + fib(n - 2)
+}
+result = pmap(fib, [16, 16, 16, 16, 16, 16, 16, 16, 16, 16, 16, 16, 16, 16, 16, 16])
+"""
+
+PARALLEL_FOR = """
+result = parallel for n in range(64) {
+  total = 0
+  for (i = 0; i < 3000; i = i + 1) {
+    total = total + i * n
+  }
+  total
+}
+"""
+
+# A native function does almost no work per item, so this mostly measures moving the data
+SHIPPING = """
+result = pmap(abs, xs)
+"""
+
+
+def timed(source, globals=None):
+    program = luma.compile(source)
+    start = time.perf_counter()
+    program.run(globals=globals, stdout=io.StringIO())
+    return time.perf_counter() - start
+
+
+def worker_counts(max_workers):
+    counts, workers = [], 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, os.cpu_count() or 1)
+    print(f"{os.cpu_count()} CPU(s)\n")
+
+    for label, source in (("pmap(fib, 16 items)", CPU_BOUND), ("parallel for, 64 items", PARALLEL_FOR)):
+        baseline = None
+        for workers in worker_counts(max_workers):
+            Parallel.set_workers(workers)
+            timed(source)  # Start the pool before timing
+            seconds = timed(source)
+            baseline = baseline or seconds
+            print(f"{label:<24} {workers:>2} worker(s) {seconds:>8.3f}s  speedup {baseline / seconds:5.2f}x")
+        print()
+
+    Parallel.set_workers(max_workers)
+    xs = list(range(1_000_000))
+    timed(SHIPPING, {"xs": xs[:10]})
+    shared = timed(SHIPPING, {"xs": xs})
+    threshold = Parallel.SHARED_MEMORY_MIN_ITEMS
+    Parallel.SHARED_MEMORY_MIN_ITEMS = len(xs) + 1  # Force the pickled path
+    pickled = timed(SHIPPING, {"xs": xs})
+    Parallel.SHARED_MEMORY_MIN_ITEMS = threshold
+    print(f"pmap over 1M ints, {max_workers} workers: shared memory {shared:.2f}s, pickled {pickled:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Measures how many lines per second Luma's print statement can write to a file.
+# Compares the buffered output writer in each flush mode against the old
+# implementation (string concatenation plus one Python print() per statement).
+#
+# Usage: python Benchmarks/print_bench.py [number_of_lines]
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import Output
+from AST import AST
+from Environment import Environment
+from Expression import Print
+from Scanner import Scanner
+
+PROGRAM = """
+for i in range(0, {lines}) {{
+  print "report line ", i, ": ok"
+}}
+"""
+
+
+# The Print.evaluate implementation this benchmark compares against
+def legacy_print_evaluate(self, env, verbose=True):
+    result = ""
+    for expr in self.expressions:
+        value = expr.evaluate(env, verbose)
+        result += str(value)
+    print(result)
+    return None
+
+
+# Best of three runs, to keep noise from other processes out of the comparison
+def time_program(ast, sink):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        with redirect_stdout(sink):
+            ast.evaluate(Environment(), verbose=False)
+            Output.flush_output()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    ast = AST(Scanner(PROGRAM.format(lines=lines)).scan_tokens())
+
+    # A block-buffered file behaves like stdout on a pipe, a line-buffered one like
+    # stdout on a terminal or under PYTHONUNBUFFERED=1 (common in batch containers)
+    for sink_label, buffering in (("block-buffered stdout", -1), ("line-buffered stdout", 1)):
+        print(f"-- {sink_label}")
+        with open(os.devnull, "w", buffering=buffering) as sink:
+            buffered_evaluate = Print.evaluate
+            Print.evaluate = legacy_print_evaluate
+            try:
+                baseline = time_program(ast, sink)
+            finally:
+                Print.evaluate = buffered_evaluate
+            print(f"{'legacy print()':<22}{lines / baseline:>12,.0f} lines/sec")
+
+            for label, mode, size in (("flush per line", Output.FLUSH_LINE, None),
+                                      ("flush every 64 KiB", Output.FLUSH_BYTES, 64 * 1024),
+                                      ("flush at exit", Output.FLUSH_EXIT, None)):
+                if size is None:
+                    Output.configure_output(mode)
+                else:
+                    Output.configure_output(mode, size)
+                elapsed = time_program(ast, sink)
+                print(f"{label:<22}{lines / elapsed:>12,.0f} lines/sec  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Load test for the multi-session REPL server (python luma.py serve-repl)
+# Starts a server in this process, then opens 500 simulated sessions at once. Each session
+# defines its own variables and functions and checks that it only ever sees its own values.
+# One extra session runs a long loop the whole time, to show that it does not stall the others.
+#
+# Usage: python Benchmarks/repl_load.py [sessions] [statements per session]
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ReplServer import ReplServer, PROMPT
+
+BUSY_LOOP = "script()\ntotal = 0\nfor (i = 0; i < 300000; i = i + 1) {\ntotal = total + i\n}\nprint total\nend()"
+
+
+async def send(reader, writer, line: str) -> str:
+    writer.write(line.encode() + b"\n")
+    reply = await reader.readuntil(PROMPT.encode())
+    return reply.decode()[:-len(PROMPT)]
+
+
+async def session(port: int, number: int, statements: int, latencies: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readuntil(PROMPT.encode())
+    await send(reader, writer, f"me = {number}")
+    await send(reader, writer, "fun step(x) { return x + me }")
+    for n in range(statements):
+        start = time.perf_counter()
+        reply = await send(reader, writer, f"print step({n})")
+        latencies.append(time.perf_counter() - start)
+        assert reply == f"{n + number}\n", f"session {number} got {reply!r}"
+    writer.write(b"exit()\n")
+    writer.close()
+
+
+async def busy_session(port: int) -> float:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readuntil(PROMPT.encode())
+    start = time.perf_counter()
+    reply = await send(reader, writer, BUSY_LOOP)
+    assert reply == "44999850000\n", reply
+    writer.close()
+    return time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    server = ReplServer(threads=32, log=None)
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+
+    latencies = []
+    busy = asyncio.create_task(busy_session(port))
+    start = time.perf_counter()
+    await asyncio.gather(*(session(port, number, statements, latencies) for number in range(sessions)))
+    elapsed = time.perf_counter() - start
+    busy_seconds = await busy
+
+    print(f"{sessions} sessions x {statements} statements in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:,.0f} evaluations/sec)")
+    print(f"client latency: p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms")
+    print(f"busy session (300k-iteration loop) took {busy_seconds:.2f}s while the others ran")
+    print(f"server-side: {server.metrics()}")
+
+    while server.sessions:  # Let the server notice every client has left before stopping it
+        await asyncio.sleep(0.01)
+    listener.close()
+    await listener.wait_closed()
+    server.executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+# Measures the cost of sandbox metering on loop- and call-heavy programs:
+#   no limits  - Program.run() with no meter
+#   all limits - steps, timeout, list and string sizes and call depth all enforced
+#
+# Usage: python Benchmarks/sandbox_bench.py [repeats]
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+from Sandbox import Limits
+
+PROGRAMS = {
+    "while loop": """
+i = 0
+total = 0
+while (i < 200000) {
+  total = total + i
+  i = i + 1
+}
+""",
+    "counted for": """
+total = 0
+for (i = 0; i < 200000; i = i + 1) {
+  total = total + i
+}
+""",
+    "for-in + calls": """
+fun add(a, b) { return a + b }
+total = 0
+for x in range(100000) {
+  total = add(total, x)
+}
+""",
+    "recursion": """
+fun fib(n) {
+  if (n < 2) { return n }
+  return fib(n - 1) + fib(n - 2)
+}
+print fib(20)
+""",
+}
+
+LIMITS = Limits(max_steps=10**9, timeout=3600, max_list_length=10**7, max_string_length=10**8, max_call_depth=200)
+
+
+# Alternates plain and metered runs so drift in machine speed affects both the same way
+def best_times(repeats, program):
+    plain = metered = float("inf")
+    for _ in range(repeats):
+        for limits in (None, LIMITS):
+            start = time.perf_counter()
+            program.run(stdout=io.StringIO(), limits=limits)
+            seconds = time.perf_counter() - start
+            if limits is None:
+                plain = min(plain, seconds)
+            else:
+                metered = min(metered, seconds)
+    return plain, metered
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'program':<16}{'no limits':>12}{'all limits':>12}{'overhead':>10}")
+    for name, source in PROGRAMS.items():
+        program = luma.compile(source)
+        plain, metered = best_times(repeats, program)
+        print(f"{name:<16}{plain:>11.3f}s{metered:>11.3f}s{(metered / plain - 1):>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Compares the cost of running a short script:
+#   cold process      - python luma.py file.luma for every run
+#   client process    - python Client.py file.luma against a warm server (python luma.py serve)
+#   client.run()      - one Client connection reused for every run
+#   local call        - luma.compile(source).run() in this process, for reference
+#
+# Usage: python Benchmarks/serve_bench.py [runs]
+import io
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import luma
+from Client import Client
+
+SOURCE = """
+total = 0
+for x in range(100) {
+  total = total + x
+}
+print "total: {total}"
+"""
+
+
+def timed(label, runs, function, baseline=None):
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    per_run = (time.perf_counter() - start) / runs
+    note = f"  ({baseline / per_run:.1f}x faster than cold)" if baseline else ""
+    print(f"{label:<18}{per_run * 1000:>9.2f} ms/run{note}")
+    return per_run
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "job.luma")
+        socket_path = os.path.join(folder, "luma.sock")
+        with open(path, "w") as file:
+            file.write(SOURCE)
+
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "luma.py"), "serve", "--socket", socket_path],
+                                  stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()  # Wait until the server is listening
+        try:
+            process_runs = max(1, runs // 50)  # Starting processes is slow, so use fewer runs
+            cold = timed("cold process", process_runs, lambda: subprocess.run(
+                [sys.executable, os.path.join(ROOT, "luma.py"), path], check=True, stdout=subprocess.DEVNULL))
+            timed("client process", process_runs, lambda: subprocess.run(
+                [sys.executable, os.path.join(ROOT, "Client.py"), "--socket", socket_path, path],
+                check=True, stdout=subprocess.DEVNULL), cold)
+
+            with Client(socket_path) as client:
+                assert client.run(source=SOURCE)["stdout"] == "total: 4950\n"
+                timed("client.run()", runs, lambda: client.run(source=SOURCE), cold)
+
+            timed("local call", runs, lambda: luma.compile(SOURCE).run(stdout=io.StringIO()), cold)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
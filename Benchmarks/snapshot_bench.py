@@ -0,0 +1,70 @@
+# Startup cost of a shared prelude (functions, classes, instances and lookup lists):
+#   run prelude    - the prelude compiled and run, as every script does without snapshots
+#   load snapshot  - its variables loaded from a snapshot saved after running it once
+#
+# Usage: python Benchmarks/snapshot_bench.py [functions] [table_size]
+import gc
+import io
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+import Snapshot
+from Environment import Environment
+
+
+def prelude(functions, table_size):
+    parts = []
+    for i in range(functions):
+        parts.append(f"fun helper_{i}(x, y) {{\n  if (x > y) {{\n    return x - y * {i}\n  }}\n"
+                     f"  total = 0\n  for j in range(y) {{\n    total = total + j % {i + 1}\n  }}\n  return total\n}}\n")
+    for i in range(functions // 4):
+        parts.append(f"class Shape_{i} {{ name = \"shape {i}\" sides = {i % 8} scale = {i / 10} }}\n")
+    parts.append(f"squares = [i * i for i in range({table_size})]\n")
+    parts.append(f"names = [\"item {{i}}\" for i in range({table_size})]\n")
+    parts.append("fun shape(i) {\n  s = Shape_0()\n  s.sides = i\n  return s\n}\n")
+    parts.append(f"shapes = [shape(i) for i in range({table_size // 10})]\n")
+    return "".join(parts)
+
+
+# Best of a few timed calls of work()
+def best(work, count=5):
+    times = []
+    for _ in range(count):
+        gc.collect()
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    table_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    source = prelude(functions, table_size)
+
+    def run_prelude():
+        return luma.compile(source).run(stdout=io.StringIO()).globals
+
+    env = Environment()
+    for name, value in run_prelude().items():
+        env.define(name, value)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prelude.snap")
+        Snapshot.save(env, path)
+        assert Snapshot.load(path).keys() == env.variables.keys()
+        print(f"{functions} functions, {functions // 4} classes, lookup lists of {table_size:,} items "
+              f"({len(env.variables)} variables, snapshot {os.path.getsize(path) / 1024:.0f} KB)\n")
+        ran = best(run_prelude)
+        loaded = best(lambda: Snapshot.load(path))
+        print(f"{'run prelude':<16}{ran * 1000:>10.1f} ms")
+        print(f"{'load snapshot':<16}{loaded * 1000:>10.1f} ms  ({ran / loaded:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
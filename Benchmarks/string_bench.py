@@ -0,0 +1,67 @@
+# Times building a large report string in a Luma loop three ways:
+#   naive    - s = (s) + piece; the grouping hides the self-append, so every step copies s
+#   append   - s = s + piece; the loop collects the pieces in a rope behind the scenes
+#   builder  - b.add(piece) on a builder() value, then b.build()
+# The naive loop is quadratic, so it is only run for the smaller sizes.
+#
+# Usage: python Benchmarks/string_bench.py [megabytes]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from AST import AST
+from Environment import Environment
+from Scanner import Scanner
+
+PIECE = "report line: all checks passed;"  # 32 characters per iteration
+
+PROGRAMS = {
+    "naive": """
+s = ""
+for i in range(0, {count}) {{
+  s = (s) + "{piece}"
+}}
+""",
+    "append": """
+s = ""
+for i in range(0, {count}) {{
+  s = s + "{piece}"
+}}
+""",
+    "builder": """
+b = builder()
+for i in range(0, {count}) {{
+  b.add("{piece}")
+}}
+s = b.build()
+""",
+}
+
+NAIVE_LIMIT_MB = 1  # Larger naive runs take minutes
+
+
+def run(name, count):
+    ast = AST(Scanner(PROGRAMS[name].format(count=count, piece=PIECE)).scan_tokens())
+    env = Environment()
+    start = time.perf_counter()
+    for stmt in ast.tree.statements:  # Run the statements directly in env, so s can be read back
+        stmt.evaluate(env, False)
+    elapsed = time.perf_counter() - start
+    assert len(env.get("s")) == count * len(PIECE)
+    return elapsed
+
+
+def main():
+    target_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    sizes = sorted({0.25, 0.5, 1, target_mb})
+    print(f"{'size':>8}{'naive':>12}{'append':>12}{'builder':>12}")
+    for size in sizes:
+        count = int(size * 1024 * 1024) // len(PIECE)
+        naive = f"{run('naive', count):.3f}s" if size <= NAIVE_LIMIT_MB else "skipped"
+        print(f"{size:>6g}MB{naive:>12}{run('append', count):>11.3f}s{run('builder', count):>11.3f}s")
+
+
+if __name__ == "__main__":
+    main()
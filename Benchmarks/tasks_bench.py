@@ -0,0 +1,100 @@
+# A producer/consumer pipeline with thousands of tasks, run on each task backend:
+#   greenlet - every task is a greenlet inside one OS thread (needs the greenlet package)
+#   threads  - every task is an OS thread that waits for its turn
+# Half of the tasks are producers that send numbers into a shared channel, the other half are
+# consumers that add them up; the main program collects the totals and checks the sum.
+# Each backend runs in its own process, so its peak memory can be reported as well.
+#
+# Usage: python Benchmarks/tasks_bench.py [tasks] [items_per_producer]
+import io
+import os
+import sys
+import time
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PIPELINE = """
+fun producer(out, finished, n) {
+  for (i = 0; i < n; i = i + 1) {
+    send(out, i)
+  }
+  send(finished, 1)
+}
+
+fun closer(out, finished, producers) {
+  for (i = 0; i < producers; i = i + 1) {
+    recv(finished)
+  }
+  close(out)
+}
+
+fun consumer(inp, results) {
+  total = 0
+  for x in inp {
+    total = total + x
+  }
+  send(results, total)
+}
+
+work = channel(64)
+finished = channel()
+results = channel()
+for (i = 0; i < pairs; i = i + 1) {
+  spawn producer(work, finished, items)
+  spawn consumer(work, results)
+}
+spawn closer(work, finished, pairs)
+
+grand = 0
+for (i = 0; i < pairs; i = i + 1) {
+  grand = grand + recv(results)
+}
+"""
+
+
+# Runs the pipeline once with one backend (inside a child process) and prints seconds and peak memory
+def child(backend, tasks, items):
+    import Tasks
+    import luma
+    Tasks.BACKEND = backend
+    pairs = tasks // 2
+    program = luma.compile(PIPELINE)
+    start = time.perf_counter()
+    result = program.run(globals={"pairs": pairs, "items": items}, stdout=io.StringIO())
+    seconds = time.perf_counter() - start
+    expected = pairs * items * (items - 1) // 2
+    assert result.globals["grand"] == expected, (result.globals["grand"], expected)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{seconds} {peak_kb}")
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        return
+
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{tasks} tasks + 1, {tasks // 2 * items} messages\n")
+    print(f"{'backend':<10}{'seconds':>10}{'messages/s':>14}{'peak memory':>14}")
+    for backend in ("greenlet", "threads"):
+        if backend == "greenlet":
+            try:
+                import greenlet  # noqa: F401
+            except ImportError:
+                print(f"{backend:<10}{'(greenlet is not installed)':>38}")
+                continue
+        completed = subprocess.run([sys.executable, __file__, "--child", backend, str(tasks), str(items)],
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend:<10}  failed: {completed.stderr.strip().splitlines()[-1]}")
+            continue
+        seconds, peak_kb = completed.stdout.split()
+        seconds = float(seconds)
+        print(f"{backend:<10}{seconds:>9.2f}s{tasks // 2 * items / seconds:>14,.0f}{int(peak_kb) / 1024:>11.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# CPU-bound tasks with spawn/join, cooperative and on 1..N OS threads (luma.py --threads N).
+# On a normal CPython build the GIL lets only one thread run Python code at a time, so extra
+# threads cannot help; on a free-threaded build (python3.13t and later) they should scale with
+# the number of cores. Run it with both interpreters to compare, e.g.
+#   python3 Benchmarks/threads_bench.py
+#   python3.13t Benchmarks/threads_bench.py
+#
+# Usage: python Benchmarks/threads_bench.py [max_threads] [tasks]
+import io
+import os
+import sys
+import time
+import sysconfig
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import luma
+import Tasks
+
+WORKERS = """
+fun fib(n) {
+  if (n < 2) { return n }
+  return fib(n - 1) + fib(n - 2)
+}
+
+tasks = []
+for i in range(count) {
+  tasks = tasks + [spawn fib(18)]
+}
+total = 0
+for t in tasks {
+  total = total + join(t)
+}
+"""
+
+
+def timed(program, count):
+    start = time.perf_counter()
+    result = program.run(globals={"count": count}, stdout=io.StringIO())
+    seconds = time.perf_counter() - start
+    assert result.globals["total"] == 2584 * count
+    return seconds
+
+
+def thread_counts(max_threads):
+    counts, threads = [], 1
+    while threads < max_threads:
+        counts.append(threads)
+        threads *= 2
+    return counts + [max_threads]
+
+
+def main():
+    max_threads = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, os.cpu_count() or 1)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(f"Python {sys.version.split()[0]}, {'free-threaded' if free_threaded else 'GIL'} build, "
+          f"GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPU(s), {count} tasks of fib(18)\n")
+
+    program = luma.compile(WORKERS)
+    Tasks.set_threads(0)
+    cooperative = timed(program, count)
+    print(f"{'cooperative':<14}{cooperative:>8.3f}s")
+
+    baseline = None
+    for threads in thread_counts(max_threads):
+        Tasks.set_threads(threads)
+        timed(program, threads)  # Start the pool's threads before timing
+        seconds = timed(program, count)
+        baseline = baseline or seconds
+        print(f"{threads:>2} thread(s)   {seconds:>8.3f}s  speedup {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import inspect
+import itertools
+import re
+import time
+from Generators import Generator
+from ListView import ListView
+from Sandbox import current_meter
+from StringBuilder import StringBuilder
+from Vector import Vector
+
+
+# A Python callable exposed to Luma code as a built-in function
+# The number of arguments it accepts is worked out once, when it is registered,
+# so a call only has to compare two integers before running the Python code
+class NativeFunction:
+    __slots__ = ("name", "function", "min_args", "max_args", "pure", "needs_env")
+
+    def __init__(self, name: str, function, min_args: int, max_args, pure: bool = False, needs_env: bool = False):
+        self.name = name            # Name used in Luma code
+        self.function = function    # The Python callable
+        self.min_args = min_args    # Required number of arguments
+        self.max_args = max_args    # Largest number of arguments, or None for any number
+        self.pure = pure            # False if it has side effects or depends on the outside world (not allowed in pmap)
+        self.needs_env = needs_env  # True if the callable takes the calling Environment first (to call Luma functions)
+
+    #   env: the environment of the caller, handed on to natives that call Luma functions
+    def call(self, args: list, env=None):
+        if len(args) < self.min_args or (self.max_args is not None and len(args) > self.max_args):
+            raise TypeError(f"Function '{self.name}' expects {self._arity_text()} argument(s), got {len(args)}.")
+        if self.needs_env:
+            return self.function(env, *args)
+        return self.function(*args)
+
+    def _arity_text(self) -> str:
+        if self.max_args == self.min_args:
+            return str(self.min_args)
+        if self.max_args is None:
+            return f"at least {self.min_args}"
+        return f"{self.min_args} to {self.max_args}"
+
+    def __str__(self):
+        return f"<native function {self.name}>"
+
+
+# All registered native functions by name. Environment.get() falls back to this table,
+# so a Luma variable or function with the same name always takes precedence
+NATIVES = {}
+
+
+# Registers a Python callable as a Luma built-in. Works as a plain call or as a decorator:
+#   register("double", lambda x: x * 2)
+#   @register("greet")
+#   def greet(name): ...
+# Only functions registered with pure=True may run in pmap and parallel for: pass it for functions
+# whose result depends on nothing but their arguments and that change nothing outside themselves.
+# Pass needs_env=True for functions that call Luma functions: they get the caller's Environment
+# as their first parameter (Luma functions see the variables of the scope they are called from)
+def register(name: str, function=None, pure: bool = False, needs_env: bool = False):
+    if function is None:
+        return lambda f: register(name, f, pure, needs_env)
+
+    # Count the positional parameters once, here, instead of on every call
+    min_args, max_args = 0, 0
+    parameters = list(inspect.signature(function).parameters.values())
+    for parameter in parameters[1:] if needs_env else parameters:
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            max_args = None
+        elif parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+            if parameter.default is parameter.empty:
+                min_args += 1
+            if max_args is not None:
+                max_args += 1
+
+    NATIVES[name] = NativeFunction(name, function, min_args, max_args, pure, needs_env)
+    return function
+
+
+# Checks that a value is a plain Luma number (booleans are not numbers in Luma)
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Returns the items of a list-like value, or raises a TypeError naming the builtin
+def _items(name: str, value):
+    if isinstance(value, (list, ListView, range)):
+        return value
+    if isinstance(value, Generator):
+        return _read_all(value)
+    raise TypeError(f"{name}() expects a list, got {type(value).__name__}.")
+
+
+# Rejects a list or vector of the given length before it is built, when the run has limits
+def _check_length(length: int) -> None:
+    meter = current_meter()
+    if meter is not None:
+        meter.check_list_length(length)
+
+
+# Reads every item of a generator into a list. With a list length limit it stops reading
+# as soon as there is one item too many, so an endless or huge generator is never built up
+def _read_all(values) -> list:
+    meter = current_meter()
+    limit = None if meter is None else meter.limits.max_list_length
+    if limit is None:
+        return list(values)
+    items = list(itertools.islice(values, limit + 1))
+    meter.check_list_length(len(items))
+    return items
+
+
+#--------------------
+# Standard library  |
+#--------------------
+
+@register("len", pure=True)
+def _len(value):
+    if isinstance(value, (list, ListView, Vector, str, range)):
+        return len(value)
+    if isinstance(value, StringBuilder):
+        return len(value.build())
+    raise TypeError(f"len() expects a list, vector or string, got {type(value).__name__}.")
+
+
+@register("sort", pure=True)
+def _sort(values):
+    values = _items("sort", values)
+    _check_length(len(values))
+    return sorted(values)  # Returns a new list, the original is left untouched
+
+
+@register("sum", pure=True)
+def _sum(values):
+    if isinstance(values, Vector):
+        return values.sum()
+    if isinstance(values, Generator):
+        return _sum_streamed(values)
+    values = _items("sum", values)
+    for value in values:
+        if not _is_number(value):
+            raise TypeError(f"sum() expects a list of numbers, found {type(value).__name__}.")
+    return sum(values)
+
+
+# Adds up a generator one item at a time, so its items are never all in memory
+def _sum_streamed(values):
+    total = 0
+    for value in values:
+        if not _is_number(value):
+            raise TypeError(f"sum() expects a list of numbers, found {type(value).__name__}.")
+        total += value
+    return total
+
+
+# min(list), min(vector) or min(a, b, ...)
+@register("min", pure=True)
+def _min(*values):
+    return _extreme("min", min, values)
+
+
+# max(list), max(vector) or max(a, b, ...)
+@register("max", pure=True)
+def _max(*values):
+    return _extreme("max", max, values)
+
+
+def _extreme(name, function, values):
+    if not values:
+        raise TypeError(f"{name}() expects at least 1 argument, got 0.")
+    if len(values) == 1:
+        if isinstance(values[0], Vector):
+            return values[0].min() if function is min else values[0].max()
+        values = _items(name, values[0])
+    if len(values) == 0:
+        raise ValueError(f"{name}() of an empty list.")
+    return function(values)
+
+
+@register("join", pure=True)
+def _join(values, separator=""):
+    if not isinstance(separator, str):
+        raise TypeError("join() separator must be a string.")
+    return separator.join([value if type(value) is str else str(value) for value in _items("join", values)])
+
+
+@register("split", pure=True)
+def _split(text, separator=None):
+    if not isinstance(text, str) or not (separator is None or isinstance(separator, str)):
+        raise TypeError("split() expects strings.")
+    if separator == "":
+        raise ValueError("split() separator cannot be empty.")
+    meter = current_meter()
+    if meter is not None and meter.limits.max_list_length is not None:
+        # Count the pieces first, so a huge split is refused before any of them is made
+        meter.check_list_length(text.count(separator) + 1 if separator is not None else _count_words(text))
+    return text.split(separator)
+
+
+# The number of items text.split() gives: runs of characters that are not whitespace
+def _count_words(text: str) -> int:
+    return sum(1 for _ in re.finditer(r"\S+", text))
+
+
+@register("abs", pure=True)
+def _abs(value):
+    if isinstance(value, Vector):
+        return value.absolute()
+    if not _is_number(value):
+        raise TypeError(f"abs() expects a number, got {type(value).__name__}.")
+    return abs(value)
+
+
+# round(x) gives a whole number, round(x, digits) keeps that many decimal places
+@register("round", pure=True)
+def _round(value, digits=None):
+    if not _is_number(value) or not (digits is None or _is_number(digits)):
+        raise TypeError("round() expects numbers.")
+    return round(value) if digits is None else round(value, int(digits))
+
+
+# Seconds from a high-resolution clock, for timing parts of a program
+@register("clock", pure=False)
+def _clock():
+    return time.perf_counter()
+
+
+# range(stop), range(start, stop) or range(start, stop, step)
+# Returns a lazy Python range, so looping over it never builds a list
+@register("range", pure=True)
+def _range(first, stop=None, step=None):
+    bounds = [value for value in (first, stop, step) if value is not None]
+    whole = []
+    for value in bounds:
+        if not _is_number(value) or value != int(value):
+            raise TypeError(f"range() expects whole numbers, got {value}.")
+        whole.append(int(value))
+    if len(whole) == 3 and whole[2] == 0:
+        raise ValueError("range() step cannot be zero.")
+    return range(*whole)
+
+
+# take(xs, n) gives the first n items of a list or generator, lazily: nothing after them is read
+@register("take", pure=True)
+def _take(values, count):
+    if not isinstance(values, (list, ListView, Vector, range, str, Generator)):
+        raise TypeError(f"take() cannot read items from {type(values).__name__}.")
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+        raise TypeError("take() expects a count of 0 or more.")
+    return Generator(itertools.islice(values, count))
+
+
+# list(xs) reads every item of a generator, range, string or vector into a new list
+@register("list", pure=True)
+def _list(values):
+    if isinstance(values, Vector):
+        _check_length(len(values))
+        return values.tolist()
+    if not isinstance(values, (list, ListView, range, str, Generator)):
+        raise TypeError(f"list() cannot read items from {type(values).__name__}.")
+    if isinstance(values, Generator):
+        return _read_all(values)
+    _check_length(len(values))
+    return list(values)
+
+
+# builder() creates an empty string builder
+@register("builder", pure=True)
+def _builder():
+    return StringBuilder()
+
+
+#-------------------
+# Vector builtins  |
+#-------------------
+
+@register("vec", pure=True)
+def _vec(values):
+    if isinstance(values, (list, ListView, range, Vector)):
+        _check_length(len(values))
+    if isinstance(values, Vector):
+        return Vector.from_values(values.tolist())  # vec(v) makes a copy
+    if isinstance(values, (ListView, range)):
+        values = list(values)
+    if not isinstance(values, list):
+        raise TypeError(f"vec() expects a list, got {type(values).__name__}.")
+    return Vector.from_values(values)
+
+
+@register("zeros", pure=True)
+def _zeros(n):
+    if _is_number(n) and n > 0:
+        _check_length(int(n))
+    return Vector.zeros(n)
+
+
+@register("dot", pure=True)
+def _dot(left, right):
+    if not isinstance(left, Vector) or not isinstance(right, Vector):
+        raise TypeError("dot() expects two vectors.")
+    return left.dot(right)
@@ -0,0 +1,89 @@
+# Thin client for the Luma job server (python luma.py serve)
+# It only uses the standard library and never imports the interpreter, so starting it is cheap,
+# and a Client object keeps its connection open so each job costs a single round trip.
+#
+# Usage: python Client.py [--socket PATH] [--input FILE] [--timeout SECONDS] file.luma
+import os
+import sys
+import json
+import socket
+import argparse
+
+DEFAULT_SOCKET = "/tmp/luma.sock"
+
+
+# Messages are one JSON object per line, in both directions
+def send_message(stream, message: dict) -> None:
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+# Reads one message, or returns None when the other side has closed the connection
+def read_message(stream):
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+# A connection to a running job server
+class Client:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._stream = self._socket.makefile("rwb")
+
+    # Runs a program on the server and returns its result as a dict with the keys
+    # ok, stdout, stderr, error and seconds. Give either source or path (read by the server)
+    #   input:   list of answers for ask
+    #   timeout: seconds the program may run before it is stopped (default: the server's limit)
+    def run(self, source: str = None, path: str = None, input: list = None, timeout: float = None) -> dict:
+        if (source is None) == (path is None):
+            raise ValueError("Give exactly one of source or path")
+        request = {"source": source} if source is not None else {"path": os.path.abspath(path)}
+        if input is not None:
+            request["input"] = list(input)
+        if timeout is not None:
+            request["timeout"] = timeout
+        send_message(self._stream, request)
+        response = read_message(self._stream)
+        if response is None:
+            raise ConnectionError("The Luma server closed the connection")
+        return response
+
+    def close(self) -> None:
+        self._stream.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a Luma program on a running job server (python luma.py serve).")
+    parser.add_argument("file", help="the .luma program to run")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"server socket (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--input", metavar="FILE", help="answer ask prompts from FILE, one answer per line")
+    parser.add_argument("--timeout", type=float, help="stop the program after this many seconds")
+    args = parser.parse_args()
+
+    answers = None
+    if args.input is not None:
+        with open(args.input, "r") as file:
+            answers = file.read().splitlines()
+
+    try:
+        with Client(args.socket) as client:
+            result = client.run(path=args.file, input=answers, timeout=args.timeout)
+    except OSError as e:
+        print(f"Error: Could not reach the Luma server at '{args.socket}': {e}")
+        sys.exit(2)
+
+    sys.stdout.write(result["stdout"])
+    sys.stderr.write(result["stderr"])
+    if not result["ok"]:
+        print(f"\nError: {result['error']}\n")
+        sys.exit(1)
@@ -0,0 +1,144 @@
+import re
+import csv
+import json
+from Builtins import register
+from Expression import Instance
+from Files import open_text
+from Generators import Generator
+from ListView import ListView
+from Sandbox import current_meter
+from Vector import Vector
+
+# Loading and saving structured data, so it never has to be written into a program as literals:
+#   rows = load_csv("scores.csv")                a list of rows, each a list of values
+#   people = load_csv("people.csv", true)        the first line names the fields: a list of instances
+#   for row in csv_rows("huge.csv", true) {...}  the same rows one at a time, for files of any size
+#   data = load_json("config.json")              objects become instances, arrays become lists
+#   dump_csv("out.csv", rows), dump_json("out.json", value)
+# Python's C parsers do the reading and the Luma values are built straight from their results.
+# CSV cells that look like numbers become numbers, everything else stays a string.
+
+
+# Gives a JSON object or a named CSV row to Luma code as an instance, so obj.name reads a field
+def _instance(fields: dict) -> Instance:
+    instance = Instance()
+    instance.fields = fields
+    return instance
+
+
+# Plain decimal numbers only, so text like "007", "1_000" or "inf" is left as it is
+_NUMBER = re.compile(r"[-+]?(?:0|[1-9][0-9]*)?(?:\.[0-9]*)?(?:[eE][-+]?[0-9]+)?")
+
+
+# A CSV cell as a Luma value: whole numbers, then decimals, then the text itself
+def _cell(text: str):
+    if not text or _NUMBER.fullmatch(text) is None:
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text  # A lone sign, point or exponent
+
+
+def _csv_rows(path, header):
+    with open_text(path) as file:
+        reader = csv.reader(file)
+        if not header:
+            for row in reader:
+                yield [_cell(text) for text in row]
+            return
+        names = next(reader, None)
+        if names is None:
+            return
+        for row in reader:
+            yield _instance(dict(zip(names, [_cell(text) for text in row])))
+
+
+def _expect_header(name, header):
+    if not isinstance(header, bool):
+        raise TypeError(f"{name}() header must be true or false.")
+
+
+#--------------------
+# Data builtins     |
+#--------------------
+
+# load_csv(path) reads every row of a CSV file; load_csv(path, true) turns rows into instances
+@register("load_csv", pure=False)
+def _load_csv(path, header=False):
+    _expect_header("load_csv", header)
+    rows = list(_csv_rows(path, header))
+    meter = current_meter()
+    if meter is not None:
+        meter.check_list_length(len(rows))
+    return rows
+
+
+# csv_rows(path) gives the same rows as load_csv lazily, one at a time
+@register("csv_rows", pure=False)
+def _csv_rows_lazily(path, header=False):
+    _expect_header("csv_rows", header)
+    open_text(path).close()  # Report a missing file now rather than at the first row
+    return Generator(_csv_rows(path, header))
+
+
+@register("load_json", pure=False)
+def _load_json(path):
+    with open_text(path) as file:
+        try:
+            value = json.load(file, object_hook=_instance)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Invalid JSON in '{path}': {error}.") from error
+    meter = current_meter()
+    if meter is not None:
+        meter.check_size(value)
+    return value
+
+
+# dump_csv(path, rows) writes a list (or generator) of rows. Rows of instances get a header line
+# with the fields of the first one
+@register("dump_csv", pure=False)
+def _dump_csv(path, rows):
+    if not isinstance(rows, (list, ListView, Generator)):
+        raise TypeError(f"dump_csv() expects a list of rows, got {type(rows).__name__}.")
+    with open_text(path, "w") as file:
+        writer = csv.writer(file)
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        names = list(first.fields) if isinstance(first, Instance) else None
+        if names is not None:
+            writer.writerow(names)
+        writer.writerow(_csv_row(first, names))
+        writer.writerows(_csv_row(row, names) for row in rows)
+
+
+def _csv_row(row, names):
+    if names is not None and isinstance(row, Instance):
+        return [row.fields.get(name, "") for name in names]
+    if isinstance(row, (list, ListView)):
+        return row
+    if isinstance(row, Vector):
+        return row.tolist()
+    raise TypeError(f"dump_csv() rows must be lists or instances, got {type(row).__name__}.")
+
+
+@register("dump_json", pure=False)
+def _dump_json(path, value):
+    with open_text(path, "w") as file:
+        json.dump(value, file, default=_json_value)
+
+
+# Luma values that json does not know, as the lists and objects it does
+def _json_value(value):
+    if isinstance(value, Instance):
+        return value.fields
+    if isinstance(value, (ListView, Generator, range)):
+        return list(value)
+    if isinstance(value, Vector):
+        return value.tolist()
+    raise TypeError(f"dump_json() cannot write a {type(value).__name__}.")
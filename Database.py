@@ -0,0 +1,193 @@
+import os
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+from Builtins import register
+from Data import _instance
+from Expression import Instance
+from Files import _check_access
+from Generators import Generator
+from Sandbox import current_meter
+from ListView import ListView
+from Vector import Vector
+
+# Local SQLite databases from Luma code, using Python's built-in sqlite3:
+#   d = db("results.db")                                   db() gives a private in-memory database
+#   d.execute("CREATE TABLE scores (name, score)")
+#   d.execute("INSERT INTO scores VALUES (?, ?)", ["Ann", 91])
+#   d.execute_many("INSERT INTO scores VALUES (?, ?)", rows)  all rows in one transaction
+#   for row in d.query("SELECT * FROM scores WHERE score > ?", [50]) { print row.name }
+#   d.close()
+# Rows come back one at a time as instances with a field per column. Parameters are lists for
+# ? placeholders, or instances for :name placeholders (so rows from load_csv(path, true) fit).
+# Statements run straight away unless d.begin() started a transaction (ended by commit/rollback).
+#
+# In a run without file access (--no-files) only in-memory databases can be opened, and they
+# are kept from reaching the file system through SQL as well: ATTACH is refused.
+#
+# Connections are pooled: close() hands a connection back for the next db() of the same file,
+# so programs run one after another (REPL lines, server jobs) skip reconnecting. Each connection
+# keeps its prepared statements by SQL text, so a statement run again is not parsed again.
+
+POOL_SIZE = 4                  # Idle connections kept per database file
+STATEMENT_CACHE_SIZE = 256     # Prepared statements kept per connection, by SQL text
+MEMORY = ":memory:"
+
+_pool = {}                     # Absolute path -> idle connections
+_pool_lock = threading.Lock()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != MEMORY:
+        with _pool_lock:
+            idle = _pool.get(path)
+            if idle:
+                return idle.pop()
+    # isolation_level=None: sqlite3 starts no transactions of its own, only d.begin() does.
+    # A pooled connection may be used by another thread later, one user at a time
+    return sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+
+
+def _release(path: str, connection: sqlite3.Connection) -> None:
+    if connection.in_transaction:
+        connection.rollback()  # Never hand on a half-finished transaction
+    if path != MEMORY:  # Every in-memory database is private, so it cannot be reused
+        with _pool_lock:
+            idle = _pool.setdefault(path, [])
+            if len(idle) < POOL_SIZE:
+                idle.append(connection)
+                return
+    connection.close()
+
+
+@atexit.register
+def _close_pool() -> None:
+    with _pool_lock:
+        for idle in _pool.values():
+            for connection in idle:
+                connection.close()
+        _pool.clear()
+
+
+# SQLite's messages for a statement the authorizer refused (ATTACH, VACUUM INTO)
+_DENIED = ("not authorized", "authorization denied")
+
+
+# Turns sqlite3 errors into runtime errors that name the database
+@contextmanager
+def _errors(path):
+    try:
+        yield
+    except sqlite3.Error as error:
+        if str(error) in _DENIED:
+            _check_access()  # Refused by _authorize because file access is off: report the sandbox limit
+        raise RuntimeError(f"Database error in '{path}': {error}.") from error
+
+
+# Authorizer of in-memory databases in runs without file access. ATTACH opens or creates a
+# database file, and VACUUM INTO (which writes a copy to a file) attaches it first
+def _authorize(action, *_):
+    return sqlite3.SQLITE_DENY if action == sqlite3.SQLITE_ATTACH else sqlite3.SQLITE_OK
+
+
+# Query parameters as sqlite3 takes them: a sequence for ?, a dict for :name
+def _parameters(values):
+    if values is None:
+        return ()
+    if isinstance(values, Instance):
+        return values.fields
+    if isinstance(values, (list, ListView)):
+        return values
+    if isinstance(values, Vector):
+        return values.tolist()
+    raise TypeError(f"Query parameters must be a list or an instance, got {type(values).__name__}.")
+
+
+# An open database. Its methods are called from Luma code as d.query(...), d.close(), ...
+class Database:
+    __slots__ = ("path", "_connection")
+
+    METHODS = ("execute", "execute_many", "query", "begin", "commit", "rollback", "close")
+
+    #   files: False in a run without file access, so SQL statements may not open files either
+    def __init__(self, path: str, files: bool = True):
+        self.path = path if path == MEMORY else os.path.abspath(path)
+        with _errors(path):
+            self._connection = _connect(self.path)
+            if not files:
+                self._connection.set_authorizer(_authorize)  # Never pooled: only in-memory databases get here
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise ValueError(f"Cannot use database '{self.path}': it is closed.")
+        return self._connection
+
+    # Runs one statement and gives the number of rows it changed
+    def execute(self, sql, parameters=None):
+        with _errors(self.path):
+            return self._open().execute(sql, _parameters(parameters)).rowcount
+
+    # Runs one statement for every row of parameters (a list or generator), all in one transaction
+    # (or in the current one, if d.begin() was called), and gives the number of rows changed
+    def execute_many(self, sql, rows):
+        connection = self._open()
+        if not isinstance(rows, (list, ListView, Generator)):
+            raise TypeError(f"execute_many() expects a list of rows, got {type(rows).__name__}.")
+        rows = (_parameters(row) for row in rows)
+        with _errors(self.path):
+            if connection.in_transaction:
+                return connection.executemany(sql, rows).rowcount
+            connection.execute("BEGIN")
+            try:
+                count = connection.executemany(sql, rows).rowcount
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+            return count
+
+    # Gives the rows of a query lazily, each as an instance with a field per column
+    def query(self, sql, parameters=None):
+        with _errors(self.path):
+            cursor = self._open().execute(sql, _parameters(parameters))
+        return Generator(self._rows(cursor))
+
+    def _rows(self, cursor):
+        names = [column[0] for column in cursor.description or ()]
+        with _errors(self.path):
+            for row in cursor:
+                yield _instance(dict(zip(names, row)))
+
+    def begin(self):
+        with _errors(self.path):
+            self._open().execute("BEGIN")
+
+    def commit(self):
+        with _errors(self.path):
+            self._open().commit()
+
+    def rollback(self):
+        with _errors(self.path):
+            self._open().rollback()
+
+    # Hands the connection back to the pool. An open transaction is rolled back
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            _release(self.path, connection)
+
+    def __str__(self):
+        return f"<database {self.path}{' closed' if self._connection is None else ''}>"
+
+
+# db(path) opens (or creates) a SQLite database file; db() gives a new in-memory database
+@register("db", pure=False)
+def _db(path=MEMORY):
+    if not isinstance(path, str):
+        raise TypeError(f"db() expects a path string, got {type(path).__name__}.")
+    if path != MEMORY:
+        _check_access()
+    meter = current_meter()
+    return Database(path, files=meter is None or meter.limits.files)
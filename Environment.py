@@ -1,3 +1,6 @@
+from Builtins import NATIVES
+
+
 class Environment:
     def __init__(self, enclosing=None):
         self.variables = {}  # Dictionary to store variables in the current scope
@@ -19,6 +22,8 @@ class Environment:
             return self.variables[name]  # Return variable from current scope
         elif self.enclosing:
             return self.enclosing.get(name)  # Look for variable in parent environment
+        elif name in NATIVES:
+            return NATIVES[name]  # Fall back to built-ins like len and sort, so user names shadow them
         else:
             raise NameError(f"Undefined variable '{name}'")  # Variable not found
 
@@ -0,0 +1,87 @@
+# Typed errors raised by the embedding API (luma.compile and Program.run)
+# Each one keeps the original Python exception as its __cause__
+
+
+# Base class for every error a Luma program can raise
+class LumaError(Exception):
+    def __init__(self, message: str, line: int = None):
+        super().__init__(message)
+        self.message = message  # Error message without the line prefix
+        self.line = line        # Source line if known, otherwise None
+
+
+# The source could not be scanned or parsed (e.g. a missing ')')
+class LumaSyntaxError(LumaError):
+    pass
+
+
+# An operation was applied to the wrong types (e.g. "a" - 1)
+class LumaTypeError(LumaError):
+    pass
+
+
+# A variable or field was used before it was defined
+class LumaNameError(LumaError):
+    pass
+
+
+# Division or modulo by zero
+class LumaMathError(LumaError):
+    pass
+
+
+# A number got too large to compute
+class LumaOverflowError(LumaError):
+    pass
+
+
+# Any other failure while running (e.g. an index out of bounds or running out of input)
+class LumaRuntimeError(LumaError):
+    pass
+
+
+# A sandbox limit was reached (see Sandbox.py). Each limit has its own subclass
+class LumaLimitError(LumaError):
+    pass
+
+
+# The program ran more loop iterations and function calls than its step budget allows
+class LumaStepLimitError(LumaLimitError):
+    pass
+
+
+# The program ran past its wall-clock time limit
+class LumaTimeoutError(LumaLimitError):
+    pass
+
+
+# The program built a list or string larger than allowed
+class LumaMemoryError(LumaLimitError):
+    pass
+
+
+# Function calls were nested deeper than allowed (or deeper than Python itself can go)
+class LumaRecursionError(LumaLimitError):
+    pass
+
+
+# Python exception types and the Luma error each one becomes
+_ERROR_TYPES = [
+    (SyntaxError, LumaSyntaxError),
+    (TypeError, LumaTypeError),
+    (NameError, LumaNameError),
+    (ZeroDivisionError, LumaMathError),
+    (OverflowError, LumaOverflowError),
+    (RecursionError, LumaRecursionError),
+    (MemoryError, LumaMemoryError),
+]
+
+
+# Wraps a Python exception raised by the interpreter in the matching Luma error
+def translate_error(error: Exception, line: int = None) -> LumaError:
+    if isinstance(error, LumaError):
+        return error
+    for python_type, luma_type in _ERROR_TYPES:
+        if isinstance(error, python_type):
+            return luma_type(str(error), line)
+    return LumaRuntimeError(str(error), line)
@@ -1,7 +1,32 @@
 from abc import ABC, abstractmethod 
+import math
+import sys
 from Token import Token, TokenType
 from typing import List
 from Environment import Environment
+from Vector import Vector
+from Builtins import NativeFunction, register
+from ListView import ListView, as_list, slice_list
+from Output import current_output, flush_output
+from Input import current_input
+from StringBuilder import Rope
+from types import MethodType
+import operator
+from Sandbox import current_meter
+from Tasks import Channel, spawn_task, tasks_started
+from Generators import Generator, resumable, yield_value
+from Files import File
+
+# Largest result (in bits) that ** may produce for integers. The size of an integer power
+# is known before computing it, so oversized results are rejected without doing the work.
+MAX_POWER_BITS = 1_000_000
+
+# Python refuses to turn integers of more than a few thousand digits into strings (and back),
+# so the limit is raised to the size of the largest power: every integer ** gives can be printed.
+# It is only ever raised, and Pythons older than 3.11 (without the limit) are left alone
+MAX_INTEGER_DIGITS = int(MAX_POWER_BITS * math.log10(2)) + 1
+if 0 < getattr(sys, "get_int_max_str_digits", lambda: 0)() < MAX_INTEGER_DIGITS:
+    sys.set_int_max_str_digits(MAX_INTEGER_DIGITS)
 
 
 
@@ -22,7 +47,10 @@ class Binary(Expression):
         # Recursively evaluate the left and right sides of the expression
         left_value = self.left.evaluate(env, verbose)
         right_value = self.right.evaluate(env, verbose)
+        return self.apply(left_value, right_value, verbose)
 
+    # Applies the operator to two already evaluated operands
+    def apply(self, left_value, right_value, verbose=True):
         # Debug print to show what's being evaluated
         if verbose:
             print(f"Evaluating: {left_value} {self.operator.lexeme} {right_value}")
@@ -37,6 +65,12 @@ class Binary(Expression):
                 return left_value or right_value
             raise TypeError(f"Cannot use 'or' between {type(left_value).__name__} and {type(right_value).__name__}.")
 
+        # Vector arithmetic and comparisons are element-wise
+        if isinstance(left_value, Vector):
+            return left_value.binary(self.operator, right_value)
+        if isinstance(right_value, Vector):
+            return right_value.binary(self.operator, left_value, reflected=True)
+
         # Equality checks (== and !=) work on any types
         if self.operator.type == TokenType.EQUAL_EQUAL:
             return left_value == right_value  # e.g. 5 == 5, "hi" == "hi"
@@ -60,13 +94,19 @@ class Binary(Expression):
         if self.operator.type == TokenType.PLUS:
             # String concatenation
             if isinstance(left_value, str) and isinstance(right_value, str):
+                meter = current_meter()
+                if meter is not None:
+                    meter.check_string_length(len(left_value) + len(right_value))  # Check before building it
                 return left_value + right_value  # "hello" + "world" => "helloworld"
             # Numeric addition
             elif isinstance(left_value, (int, float)) and isinstance(right_value, (int, float)):
                 return left_value + right_value  # 5 + 3 => 8
-            # List concatenation
-            elif isinstance(left_value, list) and isinstance(right_value, list):
-                return left_value + right_value  # [1,2] + [3,4] => [1,2,3,4]
+            # List concatenation (slice views are copied into the new list here)
+            elif isinstance(left_value, (list, ListView)) and isinstance(right_value, (list, ListView)):
+                meter = current_meter()
+                if meter is not None:
+                    meter.check_list_length(len(left_value) + len(right_value))  # Check before building it
+                return as_list(left_value) + as_list(right_value)  # [1,2] + [3,4] => [1,2,3,4]
             # Invalid types for +
             else:
                 raise TypeError(f"Cannot use '+' between {type(left_value).__name__} and {type(right_value).__name__}.")
@@ -81,18 +121,28 @@ class Binary(Expression):
         # Multiplication
         elif self.operator.type == TokenType.TIMES:
             return left_value * right_value
-        # Division (check for division by zero)
+        # Division (check for division by zero). Always true division, so 7 / 2 => 3.5
         elif self.operator.type == TokenType.DIV:
             if right_value == 0:
                 raise ZeroDivisionError("Division by zero is not allowed.")
             return left_value / right_value
+        # Integer division, rounding down. 7 // 2 => 3 (an int when both sides are ints)
+        elif self.operator.type == TokenType.FLOOR_DIV:
+            if right_value == 0:
+                raise ZeroDivisionError("Division by zero is not allowed.")
+            return left_value // right_value
         # Modulo
         elif self.operator.type == TokenType.MOD:
+            if right_value == 0:
+                raise ZeroDivisionError("Modulo by zero is not allowed.")
             return left_value % right_value
         # Exponentiation with overflow protection
         elif self.operator.type == TokenType.EXP:
-            if abs(left_value) > 999 or abs(right_value) > 999:
-                raise OverflowError("Number too large to compute.")
+            # An integer power has about bit_length(base) * exponent bits, so check that up front.
+            # Float powers cost the same for any size and raise OverflowError on their own.
+            if isinstance(left_value, int) and isinstance(right_value, int) and abs(left_value) > 1:
+                if abs(left_value).bit_length() * right_value > MAX_POWER_BITS:
+                    raise OverflowError("Number too large to compute.")
             return left_value ** right_value
 
         # Fallback for unrecognized operators
@@ -119,6 +169,10 @@ class Unary(Expression):
                 return not operand_value
             raise TypeError(f"Cannot apply '!' to {type(operand_value).__name__}.")
 
+        # Negate every element of a vector
+        if isinstance(operand_value, Vector):
+            return operand_value.negate() if self.operator.type == TokenType.MINUS else operand_value
+
         if not isinstance(operand_value, (int, float)):
             raise TypeError(f"Invalid unary operation: Cannot apply '{self.operator.lexeme}' to {type(operand_value).__name__}.")
         
@@ -149,6 +203,23 @@ class Literal(Expression):
     def __str__(self) -> str:
         return f"{self.value}"
 
+# Represents an interpolated string like "score: {x} of {y}"
+# The parts were split and parsed once by the scanner and parser, so evaluating it
+# is a single join over the literal text and the values of the embedded expressions
+class Interpolation(Expression):
+    def __init__(self, parts: list):
+        self.parts = parts  # Literal strings and Expression nodes, in order
+
+    def evaluate(self, env, verbose=True):
+        pieces = [part if type(part) is str else str(part.evaluate(env, verbose)) for part in self.parts]
+        meter = current_meter()
+        if meter is not None:
+            meter.check_string_length(sum(map(len, pieces)))  # Check before joining them
+        return "".join(pieces)
+
+    def __str__(self) -> str:
+        return '"' + "".join(part if type(part) is str else f"{{{part}}}" for part in self.parts) + '"'
+
 #Used to control the precedence of expressions.
 class Grouping(Expression):
 
@@ -200,11 +271,9 @@ class Print(Expression):
         self.expressions = expressions  # List of expressions to print
 
     def evaluate(self, env, verbose=True):
-        result = ""
-        for expr in self.expressions:
-            value = expr.evaluate(env, verbose)  # Evaluate each expression
-            result += str(value)  # Convert each to string and concatenate
-        print(result)  # Print the final output
+        # Evaluate each expression, convert it to a string and join them all in one go
+        result = "".join([str(expr.evaluate(env, verbose)) for expr in self.expressions])
+        current_output().write_line(result)  # Hand the line to the buffered output writer
         return None  # Print does not return a value
 
 # Handles input from the user using ask "Prompt"
@@ -216,7 +285,8 @@ class Ask(Expression):
         prompt = self.prompt_expr.evaluate(env, verbose)  # Evaluate prompt expression
         if not isinstance(prompt, str):
             raise TypeError("ask expects a string prompt")
-        return input(prompt).strip()  # Prompt the user and return stripped input
+        flush_output()  # Make sure everything printed so far is visible before the prompt
+        return current_input().read_line(prompt).strip()  # Prompt the user and return stripped input
 
     def __str__(self) -> str:
         return f"(ask {self.prompt_expr})"
@@ -314,12 +384,17 @@ class Block(Expression):
         self.statements = statements  # List of expressions/statements in the block
 
     def evaluate(self, env, verbose=True):
-        result = None
         local_env = Environment(env)  # Create a new local scope for the block
+        return self.evaluate_in(local_env, verbose)
+
+    # Runs the statements directly in the given environment, without a new scope.
+    # Used for the top level of a program, so its variables stay in the caller's environment
+    def evaluate_in(self, env, verbose=True):
+        result = None
 
         for stmt in self.statements:
             try:
-                result = stmt.evaluate(local_env, verbose)
+                result = stmt.evaluate(env, verbose)
             except ReturnException as ret:
                 return ret.value  # Return immediately on return
 
@@ -329,14 +404,167 @@ class Block(Expression):
         return "\n".join(str(stmt) for stmt in self.statements)
 
 
+# Yields every expression node inside the given nodes, including nested ones.
+# Function and class bodies are skipped unless into_functions is True
+def _walk_nodes(nodes, into_functions=False):
+    for node in nodes:
+        if isinstance(node, (list, tuple)):
+            yield from _walk_nodes(node, into_functions)
+        elif isinstance(node, Expression):
+            yield node
+            if into_functions or not isinstance(node, (Function, Class)):
+                yield from _walk_nodes(vars(node).values(), into_functions)
+
+
+# Yields every list inside the given value (statement lists of nested ifs and loops included)
+def _each_list(value):
+    if isinstance(value, list):
+        yield value
+        for item in value:
+            yield from _each_list(item)
+    elif isinstance(value, tuple):
+        for item in value:
+            yield from _each_list(item)
+    elif isinstance(value, Expression) and not isinstance(value, (Function, Class)):
+        for attr in vars(value).values():
+            yield from _each_list(attr)
+
+
+# Returns the variable name if the node is a self-append like s = s + piece
+# (SelfAppend nodes are found through the assignment they wrap)
+def _self_append_name(node):
+    if isinstance(node, Assignment) and isinstance(node.value_expr, Binary):
+        binary = node.value_expr
+        if (binary.operator.type == TokenType.PLUS and isinstance(binary.left, Variable)
+                and binary.left.name.lexeme == node.name.lexeme):
+            return node.name.lexeme
+    return None
+
+
+# Finds s = s + piece statements in a loop body that can safely accumulate into a Rope,
+# replaces them with SelfAppend nodes and returns the names involved.
+# It is only safe when nothing else can look at s while the loop runs: the loop never reads s
+# apart from the appends themselves, and it calls and spawns no functions (which could read s
+# through the calling scope) and has no inner for-in loops (which could resume a generator that
+# reads it). The loop variable itself is never optimised.
+# Tasks spawned before the loop, and generators the loop itself reads from, are handled when
+# it runs (see SelfAppend and ForEach).
+def _optimise_self_appends(body, header, loop_var=None):
+    nodes = list(_walk_nodes([body, header]))
+    if any(isinstance(node, (FunctionCall, Spawn, Yield, ForEach)) for node in nodes):
+        return []
+
+    # Count how often each name is read, and how many of those reads are the appends themselves
+    reads, appends = {}, {}
+    for node in nodes:
+        if isinstance(node, Variable):
+            reads[node.name.lexeme] = reads.get(node.name.lexeme, 0) + 1
+        name = _self_append_name(node)
+        if name is not None:
+            appends[name] = appends.get(name, 0) + 1
+
+    names = [name for name, count in appends.items() if reads.get(name) == count and name != loop_var]
+    if not names:
+        return []
+
+    for statements in _each_list(body):
+        for index, stmt in enumerate(statements):
+            if isinstance(stmt, Assignment) and _self_append_name(stmt) in names:
+                statements[index] = SelfAppend(stmt)
+    return names
+
+
+# Turns any Rope left in the named variables back into a plain string once the loop is over
+def _finish_self_appends(names, env):
+    for name in names:
+        try:
+            value = env.get(name)
+        except NameError:
+            continue  # The variable only existed inside the loop
+        if type(value) is Rope:
+            env.assign(name, value.build())
+
+
+# Gives the items of iterable, turning any Rope in the named variables back into a plain
+# string before each item is asked for
+def _finishing_each(iterable, names, env):
+    items = iter(iterable)
+    while True:
+        _finish_self_appends(names, env)
+        try:
+            value = next(items)
+        except StopIteration:
+            return
+        yield value
+
+
+# Returns the plain string for a Rope, any other value unchanged
+def _built(value):
+    return value.build() if type(value) is Rope else value
+
+
+# Handles s = s + piece inside a loop that was found safe to optimise.
+# While s holds a string, appended strings are collected in a Rope instead of copying
+# the whole string on every iteration. Any other operands (numbers, lists, errors) go
+# through the normal '+' rules in Binary.
+class SelfAppend(Expression):
+    def __init__(self, assignment: Assignment):
+        self.assignment = assignment        # The original assignment node (its value is s + piece)
+        self.name = assignment.name.lexeme  # The variable being appended to
+
+    def evaluate(self, env, verbose=True):
+        # Keep the debug trace of the plain assignment. Once the run has tasks, any of them may
+        # read s between two steps of the loop, so s has to stay a plain string
+        if verbose or tasks_started():
+            return self.assignment.evaluate(env, verbose)
+
+        binary = self.assignment.value_expr
+        current = env.get(self.name)
+        piece = binary.right.evaluate(env, verbose)
+
+        if type(piece) is str:
+            if type(current) is Rope:
+                current.parts.append(piece)  # The rope is already stored in the variable
+                current.size += len(piece)
+                meter = current_meter()
+                if meter is not None:
+                    meter.check_string_length(current.size)
+                return current
+            if type(current) is str:
+                rope = Rope([current, piece])
+                meter = current_meter()
+                if meter is not None:
+                    meter.check_string_length(rope.size)
+                env.assign(self.name, rope)
+                return rope
+
+        # Not a string append: fall back to the normal rules for '+'
+        value = binary.apply(_built(current), piece, verbose)
+        env.assign(self.name, value)
+        return value
+
+    def __str__(self):
+        return str(self.assignment)
+
+
 # Handles while loops like: while (condition) { ... }
 class While(Expression):
     def __init__(self, condition: Expression, body: List[Expression]):
         self.condition = condition  # Expression to evaluate before each loop iteration
         self.body = body  # List of statements to execute in the loop body
+        self.appended_names = _optimise_self_appends(body, [condition])  # Strings built with s = s + x
 
     def evaluate(self, env, verbose=True):
+        if not self.appended_names:
+            return self._run(env, verbose)
+        try:
+            return _built(self._run(env, verbose))
+        finally:
+            _finish_self_appends(self.appended_names, env)
+
+    def _run(self, env, verbose):
         result = None
+        meter = current_meter()  # Only set when the run has limits (see Sandbox.py)
         while True:
             local_env = Environment(env)  # New scope for each iteration (ensures block-local variables)
             cond_value = self.condition.evaluate(local_env, verbose)
@@ -346,6 +574,8 @@ class While(Expression):
 
             if not cond_value:
                 break  # Exit the loop if condition is false
+            if meter is not None:
+                meter.tick()  # Count the iteration against the sandbox step budget
 
             for stmt in self.body:
                 result = stmt.evaluate(local_env, verbose)  # Execute loop body
@@ -372,6 +602,22 @@ class ToFloat(Expression):
         return f"(float {self.expression})"
 
 
+# Converts a value to a whole number using int() built-in function (e.g., int(3.7) => 3)
+class ToInt(Expression):
+    def __init__(self, expression: Expression):
+        self.expression = expression  # The expression whose value we want to convert
+
+    def evaluate(self, env, verbose=True):
+        value = self.expression.evaluate(env, verbose)
+        try:
+            return int(value)  # Attempt conversion to int
+        except (ValueError, OverflowError):
+            raise TypeError(f"Cannot convert to int: {value}")
+
+    def __str__(self) -> str:
+        return f"(int {self.expression})"
+
+
 # Converts a value to a string using str() built-in function
 class ToString(Expression):
     def __init__(self, expression: Expression):
@@ -390,6 +636,24 @@ class ToString(Expression):
 
     
 
+# Returns True if any of the given nodes (or the nodes nested inside them) assigns to the variable name
+def _assigns_variable(nodes, name) -> bool:
+    for node in _walk_nodes(nodes, into_functions=True):
+        if isinstance(node, Assignment) and node.name.lexeme == name:
+            return True
+    return False
+
+
+# Native comparisons used by counted for loops, keyed by the condition's operator
+# (functions from the operator module, so parsed loops can be pickled and sent to pmap workers)
+_COUNTED_COMPARISONS = {
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+}
+
+
 # Handles 'for' loops like: for (i = 0; i < 10; i = i + 1) { ... }
 class For(Expression):
     def __init__(self, initializer, condition, increment, body):
@@ -397,8 +661,63 @@ class For(Expression):
         self.condition = condition      # The loop condition (e.g., i < 10)
         self.increment = increment      # The increment expression (e.g., i = i + 1)
         self.body = body                # List of statements to execute in each iteration
+        self.counted = self._counted_pattern()  # (compare, limit_expr, limit_is_constant, step) or None
+        loop_var = initializer.name.lexeme if isinstance(initializer, Assignment) else None
+        self.appended_names = _optimise_self_appends(body, [initializer, condition, increment], loop_var)
+
+    # Detects the canonical counted loop: for (i = a; i < n; i = i + step)
+    # where the comparison is <, <=, > or >=, step is a number literal moving towards the limit
+    # and the body never assigns i. Such loops run on a native Python counter instead of
+    # evaluating the condition and increment nodes on every iteration.
+    def _counted_pattern(self):
+        if not isinstance(self.initializer, Assignment) or not isinstance(self.increment, Assignment):
+            return None
+        name = self.initializer.name.lexeme
+
+        # Condition must be: i <op> limit
+        condition = self.condition
+        if not (isinstance(condition, Binary) and condition.operator.type in _COUNTED_COMPARISONS
+                and isinstance(condition.left, Variable) and condition.left.name.lexeme == name):
+            return None
+
+        # Increment must be: i = i + step, i = step + i or i = i - step
+        step_expr = self.increment.value_expr
+        if self.increment.name.lexeme != name or not isinstance(step_expr, Binary):
+            return None
+        left, right = step_expr.left, step_expr.right
+        is_var = lambda expr: isinstance(expr, Variable) and expr.name.lexeme == name
+        is_step = lambda expr: (isinstance(expr, Literal) and isinstance(expr.value, (int, float))
+                                and not isinstance(expr.value, bool) and expr.value != 0)
+        if step_expr.operator.type == TokenType.PLUS and is_var(left) and is_step(right):
+            step = right.value
+        elif step_expr.operator.type == TokenType.PLUS and is_step(left) and is_var(right):
+            step = left.value
+        elif step_expr.operator.type == TokenType.MINUS and is_var(left) and is_step(right):
+            step = -right.value
+        else:
+            return None
+
+        # The step has to move towards the limit, otherwise leave the loop to the general path
+        upward = condition.operator.type in (TokenType.LESS, TokenType.LESS_EQUAL)
+        if (step > 0) != upward:
+            return None
+
+        if _assigns_variable(self.body, name):
+            return None
+
+        # A literal limit is evaluated once, anything else is re-checked every iteration
+        limit_is_constant = isinstance(condition.right, Literal)
+        return (_COUNTED_COMPARISONS[condition.operator.type], condition.right, limit_is_constant, step)
 
     def evaluate(self, env, verbose=True):
+        if not self.appended_names:
+            return self._run(env, verbose)
+        try:
+            return self._run(env, verbose)
+        finally:
+            _finish_self_appends(self.appended_names, env)
+
+    def _run(self, env, verbose):
         # Make sure initializer is an assignment (e.g., i = 0)
         if not isinstance(self.initializer, Assignment):
             raise TypeError("For loop initializer must be an assignment.")
@@ -410,6 +729,15 @@ class For(Expression):
         # Define the loop variable in the loop's environment using its evaluated value
         loop_env.define(loop_var_name, self.initializer.value_expr.evaluate(env, verbose))
 
+        # Counted loops skip the condition and increment nodes (verbose mode keeps the debug output)
+        if self.counted is not None and not verbose:
+            self._evaluate_counted(loop_env, loop_var_name)
+        else:
+            self._evaluate_general(loop_env, verbose)
+
+    # Runs the loop by evaluating the condition and increment nodes each iteration
+    def _evaluate_general(self, loop_env, verbose):
+        meter = current_meter()
         while True:
             # Evaluate the loop condition in the current loop environment
             cond = self.condition.evaluate(loop_env, verbose)
@@ -418,6 +746,8 @@ class For(Expression):
 
             if not cond:
                 break  # Exit the loop when condition becomes false
+            if meter is not None:
+                meter.tick()
 
             # Create a new nested environment for the body in each iteration
             body_env = Environment(loop_env)
@@ -429,10 +759,102 @@ class For(Expression):
             # Apply the increment expression after executing the body
             self.increment.evaluate(loop_env, verbose)
 
+    # Runs a counted loop on a native Python counter
+    def _evaluate_counted(self, loop_env, name):
+        compare, limit_expr, limit_is_constant, step = self.counted
+        loop_vars = loop_env.variables
+        counter = loop_vars[name]
+        # A literal limit is evaluated here once; any other limit only inside the loop, once per
+        # check, so a limit with side effects (i < next_limit()) runs as often as on the general path
+        limit = limit_expr.evaluate(loop_env, False) if limit_is_constant else None
+        meter = current_meter()
+
+        while True:
+            if not limit_is_constant:
+                limit = limit_expr.evaluate(loop_env, False)  # Cheap re-check of a variable limit
+
+            if isinstance(counter, (int, float)) and isinstance(limit, (int, float)):
+                cond = compare(counter, limit)
+            else:
+                # Non-numeric operands: report the error exactly as the general path does,
+                # from the values already evaluated
+                cond = self.condition.apply(counter, limit, False)
+                if not isinstance(cond, bool):
+                    raise TypeError("For loop condition must be a boolean.")
+
+            if not cond:
+                break  # Exit the loop when condition becomes false
+            if meter is not None:
+                meter.tick()
+
+            # Create a new nested environment for the body in each iteration
+            body_env = Environment(loop_env)
+
+            # Evaluate all statements in the loop body
+            for stmt in self.body:
+                stmt.evaluate(body_env, False)
+
+            # A called function can still rebind the loop variable through the calling scope.
+            # If that happened, finish the loop on the general path from the current state.
+            if loop_vars[name] is not counter:
+                self.increment.evaluate(loop_env, False)
+                return self._evaluate_general(loop_env, False)
+
+            counter = counter + step
+            loop_vars[name] = counter
+
     def __str__(self):
         return f"(for {self.initializer}; {self.condition}; {self.increment} {{ {'; '.join(str(stmt) for stmt in self.body)} }})"
 
 
+# Handles iterator loops like: for x in xs { ... } or for i in range(0, 10, 2) { ... }
+# The loop is driven by native Python iteration, so no condition, increment or index
+# expressions are evaluated per iteration
+class ForEach(Expression):
+    def __init__(self, var_name: str, iterable_expr: Expression, body: List[Expression]):
+        self.var_name = var_name            # Name of the loop variable (e.g., x)
+        self.iterable_expr = iterable_expr  # Expression producing a list, vector, string or range
+        self.body = body                    # List of statements to execute in each iteration
+        # The iterable is evaluated once, before anything is appended, so it is not part of the check
+        self.appended_names = _optimise_self_appends(body, [], var_name)
+
+    def evaluate(self, env, verbose=True):
+        if not self.appended_names:
+            return self._run(env, verbose)
+        try:
+            return self._run(env, verbose)
+        finally:
+            _finish_self_appends(self.appended_names, env)
+
+    def _run(self, env, verbose):
+        iterable = self.iterable_expr.evaluate(env, verbose)
+        if not isinstance(iterable, _ITERABLES):
+            raise TypeError(f"Cannot loop over {type(iterable).__name__}.")
+
+        # The loop variable lives in its own scope, just like in the C-style for loop
+        loop_env = Environment(env)
+        loop_vars = loop_env.variables  # Bind the loop variable directly, skipping the scope chain
+        meter = current_meter()
+
+        # Generators and channels run other code to give each item, and that code may read
+        # the strings this loop appends to, so they are made plain again before every item
+        if self.appended_names and isinstance(iterable, (Generator, Channel)):
+            iterable = _finishing_each(iterable, self.appended_names, env)
+
+        for value in iterable:
+            if meter is not None:
+                meter.tick()
+            loop_vars[self.var_name] = value
+
+            # Create a new nested environment for the body in each iteration
+            body_env = Environment(loop_env)
+            for stmt in self.body:
+                stmt.evaluate(body_env, verbose)
+
+    def __str__(self):
+        return f"(for {self.var_name} in {self.iterable_expr} {{ {'; '.join(str(stmt) for stmt in self.body)} }})"
+
+
 # Handles function declarations like:
 # fun greet(name) { print "Hello, ", name }
 class Function(Expression):
@@ -440,6 +862,7 @@ class Function(Expression):
         self.name = name                      # Name of the function
         self.param_names = param_names        # List of parameter names
         self.body = body                      # List of statements in the function body
+        self.is_generator = any(isinstance(node, Yield) for node in _walk_nodes(body))  # Uses yield
 
     def evaluate(self, env, verbose=True):
         # Store the function in the current environment using its name
@@ -458,6 +881,15 @@ class Function(Expression):
         for name, value in zip(self.param_names, args):
             local_env.define(name, value)
 
+        # A function that uses yield gives a generator; its body only runs as items are read
+        if self.is_generator:
+            return resumable(lambda: self._generate(local_env))
+
+        # Count the call and its depth when the run has limits
+        meter = current_meter()
+        if meter is not None:
+            meter.enter_call(self.name)
+
         try:
             result = None
             # Evaluate each statement in the function body
@@ -467,6 +899,17 @@ class Function(Expression):
         # If a return statement was hit, return its value
         except ReturnException as ret:
             return ret.value
+        finally:
+            if meter is not None:
+                meter.leave_call()
+
+    # Runs the body of a generator function (yield statements hand out its items)
+    def _generate(self, local_env) -> None:
+        try:
+            for stmt in self.body:
+                stmt.evaluate(local_env, False)
+        except ReturnException:
+            pass  # return ends the generator
 
     def __str__(self):
         return f"<function {self.name}({', '.join(self.param_names)})>"
@@ -489,6 +932,18 @@ class FunctionCall(Expression):
         if isinstance(target, Function):
             return target.call(arg_values, env, verbose)
 
+        # If it's a native (Python) built-in like len or sort, call it directly
+        if isinstance(target, NativeFunction):
+            result = target.call(arg_values, env)
+            meter = current_meter()
+            if meter is not None:
+                meter.check_size(result)  # e.g. split() or sort() of a large input in a sandboxed run
+            return result
+
+        # If it's a method of a built-in value like a string builder (b.add(x)), call it directly
+        if isinstance(target, MethodType):
+            return target(*arg_values)
+
         # If it's a class, instantiate it (no args supported for now)
         if isinstance(target, ClassDefinition):
             if len(arg_values) > 0:
@@ -501,8 +956,84 @@ class FunctionCall(Expression):
     def __str__(self):
         return f"{self.callee}({', '.join(str(arg) for arg in self.arguments)})"
 
+
+# Handles spawn f(args): starts the call as a separate task and returns the task straight away.
+# The arguments are evaluated now; the call runs whenever the scheduler gives it a turn (see Tasks.py)
+class Spawn(Expression):
+    def __init__(self, callee: Expression, arguments: list[Expression]):
+        self.callee = callee          # The function to run as a task
+        self.arguments = arguments    # List of argument expressions passed to it
+
+    def evaluate(self, env, verbose=True):
+        target = self.callee.evaluate(env, verbose)
+        arg_values = [arg.evaluate(env, verbose) for arg in self.arguments]
+
+        if isinstance(target, Function):
+            return spawn_task(lambda: target.call(arg_values, env, False))
+        if isinstance(target, NativeFunction):
+            return spawn_task(lambda: target.call(arg_values, env))
+        raise TypeError(f"Cannot spawn '{self.callee}': it is not a function.")
+
+    def __str__(self):
+        return f"(spawn {self.callee}({', '.join(str(arg) for arg in self.arguments)}))"
+
     
 
+# Handles yield value inside a function: hands value to the loop reading from the
+# generator and waits until the next item is asked for
+class Yield(Expression):
+    def __init__(self, value_expr: Expression):
+        self.value_expr = value_expr  # The expression giving the item
+
+    def evaluate(self, env, verbose=True):
+        yield_value(self.value_expr.evaluate(env, verbose))
+        return None
+
+    def __str__(self):
+        return f"(yield {self.value_expr})"
+
+
+# The things map, filter and for loops can read items from (a file gives its lines)
+_ITERABLES = (list, ListView, Vector, range, str, Channel, Generator, File)
+
+
+# Calls a function or native function on one item, the way FunctionCall would
+def _call_on(function, item, env):
+    if isinstance(function, Function):
+        return function.call([item], env, False)
+    return function.call([item], env)
+
+
+# map(f, xs): a generator giving f(x) for every item x of xs, computed as it is read
+@register("map", pure=True, needs_env=True)
+def _map(env, function, items):
+    _check_lazy_arguments("map", function, items)
+    return Generator(_call_on(function, item, env) for item in items)
+
+
+# filter(f, xs): a generator giving the items of xs for which f returns true
+@register("filter", pure=True, needs_env=True)
+def _filter(env, function, items):
+    _check_lazy_arguments("filter", function, items)
+    return Generator(_kept(function, items, env))
+
+
+def _check_lazy_arguments(name, function, items):
+    if not isinstance(function, (Function, NativeFunction)):
+        raise TypeError(f"{name}() expects a function, got {type(function).__name__}.")
+    if not isinstance(items, _ITERABLES):
+        raise TypeError(f"{name}() cannot read items from {type(items).__name__}.")
+
+
+def _kept(function, items, env):
+    for item in items:
+        keep = _call_on(function, item, env)
+        if not isinstance(keep, bool):
+            raise TypeError("filter() function must return a boolean.")
+        if keep:
+            yield item
+
+
 #Handles return statements inside functions
 class Return(Expression):
     def __init__(self, value_expr):
@@ -529,11 +1060,59 @@ class ListLiteral(Expression):
 
     def evaluate(self, env, verbose=True):
         # Evaluate each element and return the fully evaluated list
+        meter = current_meter()
+        if meter is not None:
+            meter.check_list_length(len(self.elements))
         return [el.evaluate(env, verbose) for el in self.elements]
 
     def __str__(self):
         return "[" + ", ".join(str(el) for el in self.elements) + "]"
 
+
+# Handles list comprehensions like [x * x for x in xs if x > 0]
+# The whole loop runs natively: the variable is rebound in one reused scope for every item
+class ListComprehension(Expression):
+    def __init__(self, element_expr: Expression, var_name: str, iterable_expr: Expression,
+                 condition: Expression = None):
+        self.element_expr = element_expr    # Expression giving each element of the new list
+        self.var_name = var_name            # Name of the loop variable (e.g., x)
+        self.iterable_expr = iterable_expr  # Expression producing the items to loop over
+        self.condition = condition          # Optional filter; must evaluate to a boolean
+
+    def evaluate(self, env, verbose=True):
+        iterable = self.iterable_expr.evaluate(env, verbose)
+        if not isinstance(iterable, _ITERABLES):
+            raise TypeError(f"Cannot loop over {type(iterable).__name__}.")
+
+        loop_env = Environment(env)
+        loop_vars = loop_env.variables
+        name = self.var_name
+        element = self.element_expr.evaluate
+        condition = self.condition.evaluate if self.condition is not None else None
+        meter = current_meter()
+        result = []
+        append = result.append
+
+        for value in iterable:
+            if meter is not None:
+                meter.tick()
+            loop_vars[name] = value
+            if condition is not None:
+                keep = condition(loop_env, verbose)
+                if not isinstance(keep, bool):
+                    raise TypeError("Condition in list comprehension must evaluate to a Boolean.")
+                if not keep:
+                    continue
+            append(element(loop_env, verbose))
+            if meter is not None:
+                meter.check_list_length(len(result))  # Only kept items count towards the limit
+        return result
+
+    def __str__(self):
+        condition = f" if {self.condition}" if self.condition is not None else ""
+        return f"[{self.element_expr} for {self.var_name} in {self.iterable_expr}{condition}]"
+
+
 # Handles accessing elements from a list by index like arr[0]
 class IndexAccess(Expression):
     def __init__(self, collection_expr, index_expr):
@@ -544,23 +1123,66 @@ class IndexAccess(Expression):
         collection = self.collection_expr.evaluate(env, verbose)  # Evaluate the list
         index = self.index_expr.evaluate(env, verbose)  # Evaluate the index
 
-        if not isinstance(collection, list):
-            raise TypeError("Indexing is only supported on lists.")  # Must be a list
+        if not isinstance(collection, (list, ListView, Vector)):
+            raise TypeError("Indexing is only supported on lists and vectors.")  # Must be a list or vector
 
         if not isinstance(index, (int, float)):
             raise TypeError("List index must be a number.")  # Must be int or float (converted later)
 
-        index = int(index)  # Convert float to int if needed
+        if not isinstance(index, int):
+            index = int(index)  # Convert float to int if needed
 
         if index < 0 or index >= len(collection):
             raise IndexError("List index out of bounds.")  # Prevent out-of-range access
 
+        if isinstance(collection, Vector):
+            return collection.get(index)  # Vector elements come back as Python floats
+
         return collection[index]  # Return the value at the index
 
     def __str__(self):
         return f"{self.collection_expr}[{self.index_expr}]"  # ToString format for debug printing
 
 
+# Handles slices like xs[1:3], xs[:2] or xs[2:]
+# Slicing a list returns a ListView that shares the list's storage instead of copying it
+class SliceAccess(Expression):
+    def __init__(self, collection_expr, start_expr, stop_expr):
+        self.collection_expr = collection_expr  # Expression that evaluates to a list or vector
+        self.start_expr = start_expr  # Optional start index (defaults to 0)
+        self.stop_expr = stop_expr  # Optional stop index (defaults to the length)
+
+    def evaluate(self, env, verbose=True):
+        collection = self.collection_expr.evaluate(env, verbose)
+
+        if not isinstance(collection, (list, ListView, Vector)):
+            raise TypeError("Slicing is only supported on lists and vectors.")
+
+        start = self._bound(self.start_expr, 0, env, verbose)
+        stop = self._bound(self.stop_expr, len(collection), env, verbose)
+
+        if start < 0 or stop > len(collection) or start > stop:
+            raise IndexError("Slice bounds out of range.")
+
+        if isinstance(collection, Vector):
+            return collection.slice(start, stop)
+        return slice_list(collection, start, stop)
+
+    # Evaluates one side of the slice, using the default when it was left out
+    def _bound(self, expr, default, env, verbose):
+        if expr is None:
+            return default
+        value = expr.evaluate(env, verbose)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise TypeError("Slice bounds must be numbers.")
+        return int(value)
+
+    def __str__(self):
+        start = "" if self.start_expr is None else str(self.start_expr)
+        stop = "" if self.stop_expr is None else str(self.stop_expr)
+        return f"{self.collection_expr}[{start}:{stop}]"
+
+
 # Handles class declarations like:
 # class Dog { name = "Rex" age = 5 }
 class Class(Expression):
@@ -616,6 +1238,8 @@ class GetField(Expression):
         obj = self.object_expr.evaluate(env, verbose)  # Evaluate object expression
         if isinstance(obj, Instance):  # Ensure it's an instance
             return obj.get(self.field_name.lexeme)  # Retrieve the field value
+        if self.field_name.lexeme in getattr(type(obj), "METHODS", ()):
+            return getattr(obj, self.field_name.lexeme)  # Methods of built-in values like b.add or d.query
         raise TypeError("Only instances have fields")  # Disallow field access on non-objects
 
     def __str__(self):
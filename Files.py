@@ -0,0 +1,234 @@
+import os
+import mmap
+import codecs
+import operator
+from Builtins import NATIVES, register
+from Generators import Generator
+from Sandbox import current_meter
+from Tasks import Channel
+
+# Files: reading and writing text files from Luma code.
+#   f = open("data.txt")            open("out.txt", "w") or open("log.txt", "a") to write
+#   for line in lines("big.log")    reads one line at a time, without its line break
+#   chunk = read_chunk(f, 65536)    up to that many bytes of text ("" at the end of the file)
+#   write(f, x), write_line(f, x)   buffered; close(f) writes out whatever is left
+# Large files opened for reading are memory-mapped, so lines and chunks are cut straight out of
+# the operating system's page cache instead of being copied through a read buffer first.
+
+MMAP_MIN_BYTES = 1 << 20        # Files at least this large are memory-mapped when read
+LINE_BLOCK_BYTES = 1 << 20      # Bytes read at a time when splitting a file into lines
+WRITE_BUFFER_BYTES = 1 << 16    # Text written is kept until this much has built up (or close)
+_MODES = ("r", "w", "a")
+_MADV_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)  # Not available on Windows
+
+
+# An open file. Reading files give bytes from a memory map (or a plain file when they are
+# small, empty or not mappable, like a pipe) and decode them as UTF-8 one line or chunk at a time
+class File:
+    __slots__ = ("path", "mode", "_file", "_map", "_released", "closed")
+
+    def __init__(self, path: str, mode: str):
+        self.path = path      # Path it was opened with
+        self.mode = mode      # "r", "w" or "a"
+        self._map = None      # Memory map of the whole file, for large files opened for reading
+        self._released = 0    # Bytes at the start of the map already handed back to the OS
+        self.closed = False
+        try:
+            if mode == "r":
+                self._file = open(path, "rb")
+                self._map = self._map_file()
+            else:
+                self._file = open(path, mode, encoding="utf-8", newline="", buffering=WRITE_BUFFER_BYTES)
+        except OSError as error:
+            raise RuntimeError(f"Cannot open '{path}': {error.strerror or error}.") from error
+
+    def _map_file(self):
+        try:
+            if os.fstat(self._file.fileno()).st_size < MMAP_MIN_BYTES:
+                return None
+            return mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None  # Not a regular file (e.g. a pipe): read it the ordinary way
+
+    # Drops the pages of the map that have been read from this process's memory, so a long file
+    # read from start to end never takes more than a block or two (they stay in the OS page cache)
+    def _release_read_pages(self) -> None:
+        if self._map is None or _MADV_DONTNEED is None:
+            return
+        end = self._map.tell() // mmap.PAGESIZE * mmap.PAGESIZE
+        if end - self._released >= LINE_BLOCK_BYTES:
+            self._map.madvise(_MADV_DONTNEED, self._released, end - self._released)
+            self._released = end
+
+    # Where reads come from: both the map and the file have readline() and read(size)
+    def _source(self):
+        if self.closed:
+            raise ValueError(f"Cannot read from '{self.path}': the file is closed.")
+        if self.mode != "r":
+            raise ValueError(f"Cannot read from '{self.path}': it was opened for writing.")
+        return self._map if self._map is not None else self._file
+
+    # Gives the remaining lines one at a time, without their line breaks.
+    # Lines are cut from large blocks, decoded and split in one go; when the reader stops early
+    # the file is moved back to just after the last line given out, so reading can carry on there
+    def lines(self):
+        source = self._source()
+        position = source.tell()  # Byte offset of the start of the current block
+        block_lines = []          # Decoded lines of the current block
+        remaining = iter(())      # Those not given out yet
+        tail = b""                # Start of a line that continues in the next block
+        try:
+            while True:
+                block = source.read(LINE_BLOCK_BYTES)
+                if not block:
+                    break
+                self._release_read_pages()
+                if tail:
+                    block = tail + block
+                end = block.rfind(b"\n") + 1
+                tail = block[end:]
+                if end == 0:
+                    continue  # No line break yet: the whole block belongs to one long line
+                text = block[:end - 1].decode("utf-8")
+                block_lines = text.split("\n")
+                if "\r" in text:  # Windows line breaks
+                    remaining = iter([line[:-1] if line.endswith("\r") else line for line in block_lines])
+                else:
+                    remaining = iter(block_lines)
+                yield from remaining
+                position += end
+                block_lines = []
+            if tail:  # The last line has no line break
+                block_lines = [tail.decode("utf-8")]
+                remaining = iter(block_lines)
+                yield from remaining
+        finally:
+            if not self.closed:
+                given = len(block_lines) - operator.length_hint(remaining)
+                done = len("\n".join(block_lines[:given]).encode("utf-8")) + 1 if given else 0
+                source.seek(min(position + done, self._size()))
+
+    def _size(self) -> int:
+        return len(self._map) if self._map is not None else os.fstat(self._file.fileno()).st_size
+
+    # Reads up to size bytes (a few more if that would cut a character in two) as text
+    def read_chunk(self, size: int) -> str:
+        source = self._source()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        text = decoder.decode(source.read(size))
+        while decoder.getstate()[0]:  # The chunk ended inside a character: finish it
+            byte = source.read(1)
+            text += decoder.decode(byte, final=not byte)
+        self._release_read_pages()
+        return text
+
+    def write(self, text: str) -> None:
+        if self.closed:
+            raise ValueError(f"Cannot write to '{self.path}': the file is closed.")
+        if self.mode == "r":
+            raise ValueError(f"Cannot write to '{self.path}': it was opened for reading.")
+        self._file.write(text)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._map is not None:
+            self._map.close()
+        self._file.close()  # Writes out anything still in the buffer
+
+    def __iter__(self):
+        return self.lines()
+
+    def __str__(self):
+        return f"<file {self.path}{' closed' if self.closed else ''}>"
+
+
+# Refuses file access when the sandbox turned it off (Limits(files=False), luma.py --no-files)
+def _check_access() -> None:
+    meter = current_meter()
+    if meter is not None:
+        meter.check_files()
+
+
+# Opens a file with Python's own text I/O, for the csv and json readers and writers in Data.py
+def open_text(path, mode: str = "r"):
+    if not isinstance(path, str):
+        raise TypeError(f"Expected a path string, got {type(path).__name__}.")
+    _check_access()
+    try:
+        return open(path, mode, encoding="utf-8", newline="")
+    except OSError as error:
+        raise RuntimeError(f"Cannot open '{path}': {error.strerror or error}.") from error
+
+
+def _expect_file(name: str, value) -> File:
+    if not isinstance(value, File):
+        raise TypeError(f"{name}() expects a file, got {type(value).__name__}.")
+    return value
+
+
+#--------------------
+# File builtins     |
+#--------------------
+
+# open(path) opens a file for reading, open(path, "w") or open(path, "a") for writing
+@register("open", pure=False)
+def _open(path, mode="r"):
+    if not isinstance(path, str):
+        raise TypeError(f"open() expects a path string, got {type(path).__name__}.")
+    if mode not in _MODES:
+        raise ValueError("open() mode must be 'r', 'w' or 'a'.")
+    _check_access()
+    return File(path, mode)
+
+
+# lines(path) or lines(file) gives the lines of a file lazily, so only one is in memory at a time.
+# A file opened from a path here is closed when the last line has been read
+@register("lines", pure=False)
+def _lines(source):
+    if isinstance(source, File):
+        return Generator(source.lines())
+    if not isinstance(source, str):
+        raise TypeError(f"lines() expects a path or a file, got {type(source).__name__}.")
+    _check_access()
+    return Generator(_lines_of_path(source))
+
+
+def _lines_of_path(path):
+    file = File(path, "r")
+    try:
+        yield from file.lines()
+    finally:
+        file.close()
+
+
+@register("read_chunk", pure=False)
+def _read_chunk(file, size=WRITE_BUFFER_BYTES):
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise TypeError("read_chunk() expects a size of 1 or more bytes.")
+    return _expect_file("read_chunk", file).read_chunk(size)
+
+
+# write(file, value) writes a value as print would show it, write_line(file, value) adds a line break
+@register("write", pure=False)
+def _write(file, value):
+    _expect_file("write", file).write(value if type(value) is str else str(value))
+
+
+@register("write_line", pure=False)
+def _write_line(file, value=""):
+    _expect_file("write_line", file).write((value if type(value) is str else str(value)) + "\n")
+
+
+_close_channel = NATIVES["close"].function
+
+
+# close(file) writes out and closes a file; close(channel) is handled by Tasks.py
+@register("close", pure=False)
+def _close(value):
+    if isinstance(value, File):
+        return value.close()
+    if not isinstance(value, Channel):
+        raise TypeError(f"close() expects a file or a channel, got {type(value).__name__}.")
+    return _close_channel(value)
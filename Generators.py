@@ -0,0 +1,125 @@
+import threading
+import contextvars
+from contextvars import ContextVar
+
+# Generators: functions that use yield, and the lazy sequences made from them (and from lists)
+# by map, filter and take. Nothing is computed until a for loop (or list(), sum(), ...) asks for
+# the next item, so a pipeline of several stages only ever holds one item at a time.
+# A generator's body runs on the ordinary recursive evaluator and is suspended at each yield.
+# With greenlet installed the body runs in its own greenlet; otherwise in its own OS thread,
+# which takes turns with the loop reading from it.
+
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+
+# A lazy sequence of values. It can be looped over once, like a Python iterator
+class Generator:
+    __slots__ = ("_values",)
+
+    def __init__(self, values):
+        self._values = values  # Python iterator giving the values
+
+    def __iter__(self):
+        return self._values
+
+    def __str__(self):
+        return "<generator>"
+
+
+# Function that hands a yielded value to the loop reading from the running generator
+_current_yield = ContextVar("luma_yield", default=None)
+
+
+def yield_value(value) -> None:
+    give = _current_yield.get()
+    if give is None:
+        raise RuntimeError("'yield' can only be used inside a function.")
+    give(value)
+
+
+# Runs run() (the body of a generator function) lazily, giving every value it yields
+def resumable(run) -> Generator:
+    return Generator(_greenlet_values(run) if greenlet is not None else _thread_values(run))
+
+
+#--------------------
+# Greenlet backend  |
+#--------------------
+
+def _greenlet_values(run):
+    def body():
+        _current_yield.set(_switch_to_reader)
+        run()
+
+    worker = greenlet.greenlet(body)
+    worker.gr_context = contextvars.copy_context()  # A new greenlet would start with an empty context
+    while True:
+        worker.parent = greenlet.getcurrent()  # Whoever reads next is resumed at the next yield
+        value = worker.switch()
+        if worker.dead:
+            return
+        yield value
+
+
+def _switch_to_reader(value) -> None:
+    greenlet.getcurrent().parent.switch(value)
+
+
+#--------------------
+# Thread backend    |
+#--------------------
+
+# Raised at a yield when the loop reading from the generator stopped early, so its thread unwinds
+class GeneratorCancelled(BaseException):
+    pass
+
+
+_VALUE, _DONE, _ERROR = range(3)  # What the worker thread handed back
+
+
+def _thread_values(run):
+    to_worker = threading.Semaphore(0)
+    to_reader = threading.Semaphore(0)
+    handed = [None, None]  # (kind, value)
+    cancelled = threading.Event()
+
+    def give(value):
+        handed[:] = [_VALUE, value]
+        to_reader.release()
+        to_worker.acquire()
+        if cancelled.is_set():
+            raise GeneratorCancelled
+
+    def body():
+        to_worker.acquire()
+        _current_yield.set(give)
+        try:
+            run()
+            handed[:] = [_DONE, None]
+        except GeneratorCancelled:
+            return
+        except BaseException as e:
+            handed[:] = [_ERROR, e]
+        to_reader.release()
+
+    context = contextvars.copy_context()
+    worker = threading.Thread(target=context.run, args=(body,), daemon=True)
+    worker.start()
+    try:
+        while True:
+            to_worker.release()
+            to_reader.acquire()
+            kind, value = handed
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        if worker.is_alive():
+            cancelled.set()
+            to_worker.release()
+            worker.join()
@@ -0,0 +1,73 @@
+import sys
+from collections import deque
+from contextvars import ContextVar
+from Output import current_output
+
+
+# Reads answers for ask from the terminal, one blocking input() call per prompt (the default)
+class ConsoleInput:
+    def read_line(self, prompt: str) -> str:
+        return input(prompt)
+
+
+# Serves answers for ask from lines that were read in bulk up front (a file, a pipe or a list)
+# so interactive programs can run in batch jobs and load tests without a terminal
+class BufferedInput:
+    def __init__(self, lines, echo: bool = False):
+        self._lines = deque(lines)  # Answers still to be served, in order
+        self.echo = echo            # If True, print each prompt and answer like a terminal session would
+
+    @classmethod
+    def from_file(cls, path: str, echo: bool = False):
+        with open(path, "r") as file:
+            return cls(file.read().splitlines(), echo)
+
+    @classmethod
+    def from_stream(cls, stream, echo: bool = False):
+        return cls(stream.read().splitlines(), echo)
+
+    def read_line(self, prompt: str) -> str:
+        if not self._lines:
+            raise EOFError(f"No more input available for ask \"{prompt}\"")
+        answer = self._lines.popleft()
+        if self.echo:
+            current_output().write_line(prompt + answer)
+        return answer
+
+
+# Wraps another input source and saves every answer it gives, one per line.
+# The saved file can be passed back as input to replay the session exactly.
+class RecordingInput:
+    def __init__(self, source, path: str):
+        self.source = source            # Where the answers really come from
+        self._file = open(path, "w")    # Recording, written as the session goes
+
+    def read_line(self, prompt: str) -> str:
+        answer = self.source.read_line(prompt)
+        self._file.write(answer + "\n")
+        self._file.flush()  # Keep the recording complete even if the program crashes later
+        return answer
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# The input source used by ask. A context variable, like the output writer
+_current_input = ContextVar("luma_input", default=ConsoleInput())
+
+
+# Returns the source that ask currently reads from
+def current_input():
+    return _current_input.get()
+
+
+# Replaces the source that ask reads from (used by the luma.py --input and --record options)
+def set_input(source) -> None:
+    _current_input.set(source)
+
+
+# Builds the input source for a path given on the command line ('-' means standard input)
+def input_from_path(path: str, echo: bool = False) -> BufferedInput:
+    if path == "-":
+        return BufferedInput.from_stream(sys.stdin, echo)
+    return BufferedInput.from_file(path, echo)
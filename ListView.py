@@ -0,0 +1,58 @@
+# A read-only window onto part of a list, created by slices like xs[1:3]
+# The view shares the original list's storage, so slicing costs O(1) however big the window is.
+# Luma never changes a list in place (xs = xs + [v] builds a new list), so the shared storage
+# can never change under the view. Operations that build a new list copy the window at that point.
+class ListView:
+    __slots__ = ("source", "start", "stop")
+
+    def __init__(self, source: list, start: int, stop: int):
+        self.source = source  # The underlying Python list (never a view)
+        self.start = start    # First index in source that belongs to the view
+        self.stop = stop      # One past the last index in source that belongs to the view
+
+    def __len__(self):
+        return self.stop - self.start
+
+    # Indexes relative to the start of the view (bounds are checked by IndexAccess)
+    def __getitem__(self, index):
+        return self.source[self.start + index]
+
+    def __iter__(self):
+        return map(self.source.__getitem__, range(self.start, self.stop))
+
+    # Slicing a view gives another view onto the same list
+    def slice(self, start, stop):
+        return ListView(self.source, self.start + start, self.start + stop)
+
+    # Copies the window into a new Python list
+    def tolist(self):
+        return self.source[self.start:self.stop]
+
+    def __eq__(self, other):
+        if isinstance(other, ListView):
+            other = other.tolist()
+        if not isinstance(other, list):
+            return NotImplemented
+        return self.tolist() == other
+
+    __hash__ = None  # Lists are not hashable, so views are not either
+
+    def __str__(self):
+        return str(self.tolist())  # Prints exactly like the equivalent list
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+
+# Returns a real Python list for a list or a view (lists are returned as they are)
+def as_list(value):
+    if isinstance(value, ListView):
+        return value.tolist()
+    return value
+
+
+# Slices a list or a view without copying any elements
+def slice_list(collection, start, stop):
+    if isinstance(collection, ListView):
+        return collection.slice(start, stop)
+    return ListView(collection, start, stop)
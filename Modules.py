@@ -0,0 +1,206 @@
+import os
+import threading
+from contextvars import ContextVar
+from contextlib import contextmanager
+import Scanner
+from Environment import Environment
+from Expression import Expression, _walk_nodes
+from Errors import LumaLimitError
+from Files import _check_access
+from Parallel import _get_pool
+
+# Modules: import "lib/helpers.luma" runs another file and defines everything it defined at its
+# top level (functions, classes, variables) in the importing scope.
+#   - Paths are relative to the directory of the importing file (or the current directory)
+#   - A module is scanned and parsed once per process. The tree is cached by path and checked
+#     against the file's modification time, so an edited module is parsed again. The cache is shared
+#     by every run in the process: REPL lines, Program.run() calls, batch jobs
+#   - A module is run once per run (importing it again in the same run gives the same values), so
+#     the lists and instances it defines are never shared with other runs
+#   - When a program is compiled, the modules it imports (and theirs) are parsed straight away,
+#     in worker processes when there are several large ones
+#   - A module that imports itself, directly or through others, is an error
+#   - Without file access (--no-files) import is refused like open()
+
+PARALLEL_PARSE_BYTES = 1 << 16  # Modules are parsed in worker processes when there is at least this much source
+
+
+# A module's parsed tree
+class Module:
+    __slots__ = ("path", "stamp", "tree")
+
+    def __init__(self, path: str, stamp: tuple, tree):
+        self.path = path          # Absolute path of the file
+        self.stamp = stamp        # (modification time, size) of the file when it was parsed
+        self.tree = tree          # Its Block of statements
+
+
+# The modules one run has imported so far
+class _Run:
+    __slots__ = ("exports", "lock")
+
+    def __init__(self):
+        self.exports = {}                # Absolute path -> top-level variables of the module, by name
+        self.lock = threading.RLock()    # Held while a module runs, so tasks on other threads wait for it
+
+
+_modules = {}  # Absolute path -> Module
+_lock = threading.Lock()  # Guards _modules, and is held while a module is parsed so it is parsed once
+
+# Directory that relative import paths start from (None: the current directory)
+_directory = ContextVar("luma_import_directory", default=None)
+# Modules being run right now, outermost first, to catch circular imports
+_loading = ContextVar("luma_loading", default=())
+# The modules imported by the current run (None outside importing_from: every import runs the module)
+_run = ContextVar("luma_run_modules", default=None)
+
+
+# Starts a run whose imports are relative to the file at path: the code in the with block
+# counts that file as being loaded (so a module importing it back is a circular import), and
+# the modules it imports run again instead of reusing what another run made of them
+@contextmanager
+def importing_from(path):
+    path = os.path.abspath(path) if path is not None else None
+    directory_token = _directory.set(os.path.dirname(path) if path is not None else None)
+    loading_token = _loading.set((path,) if path is not None else ())
+    run_token = _run.set(_Run())
+    try:
+        yield
+    finally:
+        _run.reset(run_token)
+        _loading.reset(loading_token)
+        _directory.reset(directory_token)
+
+
+def _resolve(path: str, directory) -> str:
+    return os.path.normpath(os.path.join(directory or os.getcwd(), path))
+
+
+def _stamp(path: str) -> tuple:
+    try:
+        info = os.stat(path)
+    except OSError as error:
+        raise RuntimeError(f"Cannot import '{path}': {error.strerror or error}.") from error
+    return info.st_mtime_ns, info.st_size
+
+
+# Scans and parses one module file. Also runs in worker processes, so it returns plain values
+def _parse_file(path: str):
+    from AST import AST  # AST imports this module, so import it here
+    _check_access()
+    stamp = _stamp(path)
+    with open(path, "r", encoding="utf-8") as file:
+        source = file.read()
+    try:
+        tree = AST(Scanner.Scanner(source).scan_tokens()).tree
+    except SyntaxError as error:
+        raise SyntaxError(f"In module '{path}': {error}") from error
+    return stamp, tree
+
+
+# Gives the cached module for path, parsing it first if it is new or its file has changed
+def _module(path: str) -> Module:
+    stamp = _stamp(path)
+    with _lock:
+        module = _modules.get(path)
+        if module is None or module.stamp != stamp:
+            stamp, tree = _parse_file(path)
+            module = _modules[path] = Module(path, stamp, tree)
+    return module
+
+
+# Runs the module at path (once per run) and gives the names it defined
+def import_module(path: str) -> dict:
+    _check_access()
+    path = _resolve(path, _directory.get())
+    loading = _loading.get()
+    if path in loading:
+        chain = loading[loading.index(path):] + (path,)
+        raise RuntimeError("Circular import: " + " -> ".join(os.path.basename(p) for p in chain) + ".")
+
+    run = _run.get() or _Run()
+    with run.lock:
+        exports = run.exports.get(path)
+        if exports is None:
+            module = _module(path)
+            env = Environment()
+            loading_token = _loading.set(loading + (path,))
+            directory_token = _directory.set(os.path.dirname(path))
+            try:
+                module.tree.evaluate_in(env, False)
+            finally:
+                _directory.reset(directory_token)
+                _loading.reset(loading_token)
+            exports = run.exports[path] = dict(env.variables)
+    return exports
+
+
+# The absolute paths of the modules a tree imports with a literal path
+def _imports_of(tree, directory) -> list:
+    return [_resolve(node.path, directory) for node in _walk_nodes([tree], into_functions=True)
+            if isinstance(node, Import)]
+
+
+# Parses every module a program imports, and every module those import, before the program runs.
+# Modules already cached (and unchanged) are skipped; files that cannot be read are left for the
+# import statement itself to report when it runs, and so is a run without file access
+def preload(tree, path=None) -> None:
+    try:
+        _check_access()
+    except LumaLimitError:
+        return
+    directory = os.path.dirname(os.path.abspath(path)) if path is not None else None
+    pending, seen = _imports_of(tree, directory), set()
+    while pending:
+        wanted = []
+        for module_path in dict.fromkeys(pending):
+            if module_path in seen:
+                continue
+            seen.add(module_path)
+            try:
+                stamp = _stamp(module_path)
+            except RuntimeError:
+                continue
+            with _lock:
+                module = _modules.get(module_path)
+            if module is None or module.stamp != stamp:
+                wanted.append((module_path, stamp[1]))
+
+        pending = []
+        for module_path, (stamp, tree) in _parse_all(wanted):
+            with _lock:
+                _modules[module_path] = Module(module_path, stamp, tree)
+            pending += _imports_of(tree, os.path.dirname(module_path))
+
+
+# Parses modules side by side in the worker processes of the pmap pool when there are several,
+# enough source to make up for sending the trees back, and more than one CPU; otherwise here
+def _parse_all(wanted):
+    paths = [path for path, size in wanted]
+    if (len(paths) > 1 and sum(size for path, size in wanted) >= PARALLEL_PARSE_BYTES
+            and (os.cpu_count() or 1) > 1):
+        pool = _get_pool()
+        parsing = [(path, pool.submit(_parse_file, path)) for path in paths]
+    else:
+        parsing = [(path, None) for path in paths]
+    results = []
+    for path, future in parsing:
+        try:
+            results.append((path, future.result() if future is not None else _parse_file(path)))
+        except Exception:
+            pass  # A missing file or syntax error is reported by the import statement when it runs
+    return results
+
+
+# Handles import "path/lib.luma": defines the module's top-level names in the current scope
+class Import(Expression):
+    def __init__(self, path: str):
+        self.path = path  # Path as written, relative to the importing file
+
+    def evaluate(self, env, verbose=True):
+        for name, value in import_module(self.path).items():
+            env.define(name, value)
+        return None
+
+    def __str__(self):
+        return f'(import "{self.path}")'
@@ -0,0 +1,104 @@
+import atexit
+import sys
+import threading
+from contextvars import ContextVar
+
+# Flush modes for the output writer
+FLUSH_LINE = "line"    # Flush after every printed line (interactive use)
+FLUSH_BYTES = "bytes"  # Flush whenever flush_bytes characters are waiting
+FLUSH_EXIT = "exit"    # Flush only at exit, before ask, and when the buffer limit is reached
+
+DEFAULT_FLUSH_BYTES = 64 * 1024      # Default threshold for FLUSH_BYTES
+EXIT_BUFFER_LIMIT = 8 * 1024 * 1024  # Upper bound on buffered output in FLUSH_EXIT mode
+
+
+# Collects printed lines and writes them to the stream in large chunks
+# Writing one joined chunk instead of one print() per line keeps batch jobs
+# that print millions of lines from being bound by per-line call and syscall overhead
+class OutputWriter:
+    def __init__(self, stream=None, flush_mode=None, flush_bytes=DEFAULT_FLUSH_BYTES):
+        self.stream = stream  # Target stream, or None to always use the current sys.stdout
+        if flush_mode is None:
+            flush_mode = FLUSH_LINE if self._is_interactive() else FLUSH_BYTES
+        self.configure(flush_mode, flush_bytes)
+        self._pending = []      # Lines waiting to be written (without their newlines)
+        self._pending_size = 0  # Number of characters waiting to be written
+        self._lock = threading.Lock()  # Tasks on several threads may print at once (luma.py --threads)
+
+    # Changes how often buffered output is flushed
+    def configure(self, flush_mode, flush_bytes=DEFAULT_FLUSH_BYTES):
+        if flush_mode not in (FLUSH_LINE, FLUSH_BYTES, FLUSH_EXIT):
+            raise ValueError(f"Unknown flush mode '{flush_mode}'")
+        if flush_bytes <= 0:
+            raise ValueError("flush_bytes must be positive")
+        self.flush_mode = flush_mode
+        self.flush_bytes = flush_bytes
+        # Number of waiting characters that triggers a flush. Line mode flushes on every write,
+        # exit mode only spills when the buffer limit is reached
+        if flush_mode == FLUSH_LINE:
+            self._flush_at = 0
+        elif flush_mode == FLUSH_EXIT:
+            self._flush_at = EXIT_BUFFER_LIMIT
+        else:
+            self._flush_at = flush_bytes
+
+    def _target(self):
+        return self.stream if self.stream is not None else sys.stdout
+
+    def _is_interactive(self):
+        try:
+            return self._target().isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    # Queues one line of output (the newline is added here)
+    def write_line(self, text: str) -> None:
+        with self._lock:
+            self._pending.append(text)
+            self._pending_size += len(text) + 1
+            if self._pending_size >= self._flush_at:
+                self._write_pending()
+
+    # Writes everything that is waiting in one call and flushes the stream
+    def flush(self) -> None:
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._pending.append("")  # Gives the last line its newline in the join below
+            text = "\n".join(self._pending)
+            self._pending.clear()
+            self._pending_size = 0
+            target = self._target()
+            target.write(text)
+            target.flush()
+
+
+# The writer used by print. A context variable, so code running in another
+# context (e.g. a separate thread) can use its own writer
+_default_writer = OutputWriter()
+_current_writer = ContextVar("luma_output", default=_default_writer)
+
+# Make sure buffered output is not lost when the interpreter exits
+atexit.register(_default_writer.flush)
+
+
+# Returns the writer that print statements currently write to
+def current_output() -> OutputWriter:
+    return _current_writer.get()
+
+
+# Replaces the writer that print statements write to in the current context
+def set_output(writer: OutputWriter) -> None:
+    _current_writer.set(writer)
+
+
+# Sets the flush mode of the current writer (used by the luma.py --flush option)
+def configure_output(flush_mode, flush_bytes=DEFAULT_FLUSH_BYTES) -> None:
+    current_output().configure(flush_mode, flush_bytes)
+
+
+# Flushes the current writer (called before ask and when errors are reported)
+def flush_output() -> None:
+    current_output().flush()
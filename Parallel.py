@@ -0,0 +1,297 @@
+import os
+import time
+import atexit
+from array import array
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory, resource_tracker
+from Expression import (Expression, Variable, Assignment, Print, Ask, SetField, Function, ForEach,
+                        ListComprehension, ClassDefinition, _walk_nodes)
+from Environment import Environment
+from Builtins import NATIVES, NativeFunction, register
+from ListView import ListView
+from Vector import Vector
+from Sandbox import current_meter, set_limits
+from Errors import LumaTimeoutError
+
+# Data-parallel evaluation on a pool of worker processes: pmap(f, xs) and parallel for x in xs { ... }
+# The function's tree is pickled and sent to the workers together with a chunk of the items, every
+# chunk runs in a fresh Environment, and the results are put back together in order.
+# Only pure code may run this way: it must not print, ask, change objects or read or write
+# variables from outside, because each worker only has a copy of what it was sent.
+
+CHUNKS_PER_WORKER = 4             # More chunks than workers, so a slow chunk does not hold up the rest
+SHARED_MEMORY_MIN_ITEMS = 50_000  # Numeric lists at least this long go through shared memory instead of pickling
+
+_workers = os.cpu_count() or 1  # Size of the pool (1 runs everything in this process)
+_pool = None
+_pool_natives = {}  # The natives as they were when the pool's workers were started (forked)
+
+
+# Sets how many worker processes pmap and parallel for use (luma.py --workers)
+def set_workers(count: int) -> None:
+    global _workers, _pool
+    if count != _workers and _pool is not None:
+        _pool.shutdown()
+        _pool = None
+    _workers = count
+
+
+# The pool, started if there is none yet. uses: the natives the work calls. The workers only have
+# the natives that were registered when they were started, so a pool that lacks one of them (it was
+# registered, or registered again, after the pool started) is replaced with a new one
+def _get_pool(uses=()) -> ProcessPoolExecutor:
+    global _pool, _pool_natives
+    if _pool is not None and any(_pool_natives.get(name) is not NATIVES[name] for name in uses):
+        _pool.shutdown()
+        _pool = None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_workers)
+        _pool_natives = dict(NATIVES)
+    return _pool
+
+
+# Shuts down whichever pool is current when the interpreter exits
+@atexit.register
+def _shutdown_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+# Stops the pool's workers straight away, even in the middle of a chunk (a run's time limit
+# passed while they were working). The next pmap starts a new pool
+def _kill_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is None:
+        return
+    processes = list((pool._processes or {}).values())
+    for process in processes:
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+    # Wait for the pool's own thread to notice and finish, so nothing of the old pool is left
+    # running (and writing to its closed pipes) when the interpreter exits
+    manager = getattr(pool, "_executor_manager_thread", None)
+    if manager is not None:
+        manager.join()
+    for process in processes:
+        process.join()
+
+
+#--------------------
+# Purity checks     |
+#--------------------
+
+# Checks that a function can run in a worker and returns the named functions and classes it uses,
+# which are sent along with it. The names of the natives it calls are added to natives.
+# Raises a TypeError naming the first thing that is not allowed
+def _dependencies(function: Function, env, natives: set, found=None) -> dict:
+    found = {} if found is None else found
+    found[function.name] = function
+
+    local_names = set(function.param_names)
+    for node in _walk_nodes(function.body, into_functions=True):
+        if isinstance(node, Assignment):
+            local_names.add(node.name.lexeme)
+        elif isinstance(node, (ForEach, ListComprehension)):
+            local_names.add(node.var_name)
+        elif isinstance(node, Function):
+            local_names.add(node.name)
+            local_names.update(node.param_names)
+
+    where = "The parallel for body" if function.name == _PARALLEL_FOR else f"Function '{function.name}'"
+    if function.is_generator:
+        raise TypeError(f"{where} cannot run in parallel: it uses yield.")
+    for node in _walk_nodes(function.body, into_functions=True):
+        if isinstance(node, (Print, Ask)):
+            raise TypeError(f"{where} cannot run in parallel: it uses {'print' if isinstance(node, Print) else 'ask'}.")
+        if isinstance(node, SetField):
+            raise TypeError(f"{where} cannot run in parallel: it changes the field '{node.field_name.lexeme}'.")
+        if isinstance(node, Assignment) and node.name.lexeme not in function.param_names and node.name.lexeme in env:
+            raise TypeError(f"{where} cannot run in parallel: it assigns to the outside variable '{node.name.lexeme}'.")
+        if isinstance(node, Variable):
+            name = node.name.lexeme
+            if name in local_names or name in found:
+                continue
+            if name not in env:
+                native = NATIVES.get(name)
+                if native is None:
+                    continue  # Undefined everywhere: the worker reports it like a normal run would
+                if not native.pure:
+                    raise TypeError(f"{where} cannot run in parallel: it calls '{name}', which is not pure.")
+                natives.add(name)
+                continue
+            value = env.get(name)
+            if isinstance(value, Function):
+                _dependencies(value, env, natives, found)  # Helper functions are checked and sent along
+            elif isinstance(value, ClassDefinition):
+                found[name] = value
+            else:
+                raise TypeError(f"{where} cannot run in parallel: it reads the outside variable '{name}'.")
+    return found
+
+
+#--------------------
+# Shared memory     |
+#--------------------
+
+# Copies a long list of numbers (or a vector) into shared memory, so workers can read their
+# chunk straight from it instead of receiving it pickled. Returns None when that does not apply
+def _share(values):
+    if len(values) < SHARED_MEMORY_MIN_ITEMS:
+        return None
+    if isinstance(values, Vector):
+        data = array("d", values.tolist()) if not isinstance(values.data, array) else values.data
+    elif all(type(value) is int for value in values):
+        try:
+            data = array("q", values)
+        except OverflowError:
+            return None  # Integers too large for 64 bits are pickled as they are
+    elif all(type(value) is float for value in values):
+        data = array("d", values)
+    else:
+        return None
+    memory = shared_memory.SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+    memory.buf[:len(data) * data.itemsize] = data.tobytes()
+    return memory, data.typecode
+
+
+# Reads items [start, stop) from shared memory inside a worker
+def _read_shared(name: str, typecode: str, start: int, stop: int) -> list:
+    memory = shared_memory.SharedMemory(name=name)
+    # The parent owns the block and removes it, so this process must not track it as well
+    resource_tracker.unregister(memory._name, "shared_memory")
+    try:
+        view = memory.buf.cast(typecode)
+        values = view[start:stop].tolist()
+        view.release()
+    finally:
+        memory.close()
+    return values
+
+
+#--------------------
+# Running           |
+#--------------------
+
+# Runs one chunk in a worker process under the sandbox limits of the run that sent it.
+# Workers outlive runs, so the meter is set for every chunk (None: the run has no limits):
+#   steps:   steps the run had already taken, counted against the same budget
+#   seconds: time left before the run's deadline
+def _run_chunk_limited(name: str, definitions: dict, chunk, limits, steps: int, seconds) -> list:
+    set_limits(limits)
+    meter = current_meter()
+    if meter is not None:
+        meter.resume(steps, seconds)
+    return _run_chunk(name, definitions, chunk)
+
+
+# Runs one chunk of items. The chunk is either a list of items or a slice of shared memory
+def _run_chunk(name: str, definitions: dict, chunk) -> list:
+    if isinstance(chunk, tuple):
+        chunk = _read_shared(*chunk)
+    if name in NATIVES and not definitions:
+        native = NATIVES[name]
+        return [native.call([item]) for item in chunk]
+
+    env = Environment()
+    for definition_name, definition in definitions.items():
+        env.define(definition_name, definition)
+    function = definitions[name]
+    return [function.call([item], env, False) for item in chunk]
+
+
+# Calls a function (or pure native) on every item and returns the results in order
+def parallel_map(function, items, env) -> list:
+    natives = set()  # Natives the workers will call
+    if isinstance(function, NativeFunction):
+        if not function.pure:
+            raise TypeError(f"Cannot run '{function.name}' in parallel: it is not pure.")
+        name, definitions = function.name, {}
+        natives.add(name)
+    elif isinstance(function, Function):
+        if len(function.param_names) != 1:
+            raise TypeError(f"pmap() needs a function of 1 argument, '{function.name}' takes {len(function.param_names)}.")
+        name, definitions = function.name, _dependencies(function, env, natives)
+    else:
+        raise TypeError(f"pmap() expects a function, got {type(function).__name__}.")
+
+    if isinstance(items, (ListView, range, str)):
+        items = list(items)
+    if not isinstance(items, (list, Vector)):
+        raise TypeError(f"pmap() expects a list, got {type(items).__name__}.")
+    if len(items) == 0:
+        return []
+
+    # A single worker gains nothing from a pool, so run in this process
+    if _workers == 1:
+        return _run_chunk(name, definitions, list(items))
+
+    size = max(1, -(-len(items) // (_workers * CHUNKS_PER_WORKER)))  # Ceiling division
+    bounds = [(start, min(start + size, len(items))) for start in range(0, len(items), size)]
+
+    shared = _share(items)
+    try:
+        if shared is not None:
+            memory, typecode = shared
+            chunks = [(memory.name, typecode, start, stop) for start, stop in bounds]
+        else:
+            values = items.tolist() if isinstance(items, Vector) else items
+            chunks = [values[start:stop] for start, stop in bounds]
+
+        # Workers get this run's limits with every chunk, and the wait for results ends at its deadline
+        meter = current_meter()
+        limits = meter.limits if meter is not None else None
+        steps = meter.steps if meter is not None else 0
+        deadline = meter.deadline if meter is not None else None
+        seconds = None if deadline is None else max(0.0, deadline - time.perf_counter())
+
+        pool = _get_pool(natives)
+        futures = [pool.submit(_run_chunk_limited, name, definitions, chunk, limits, steps, seconds)
+                   for chunk in chunks]
+        results = []
+        for future in futures:
+            try:
+                results.extend(future.result(None if deadline is None else max(0.0, deadline - time.perf_counter())))
+            except FutureTimeoutError:
+                _kill_pool()  # Workers stuck in a chunk would otherwise hold up every later pmap
+                raise LumaTimeoutError(f"Time limit of {limits.timeout:g} seconds reached.") from None
+        return results
+    finally:
+        if shared is not None:
+            shared[0].close()
+            shared[0].unlink()
+
+
+#--------------------
+# Expression nodes  |
+#--------------------
+
+_PARALLEL_FOR = "<parallel for>"  # Name of the function made from a parallel for body
+
+
+# pmap(f, xs): calls f on every item of xs in worker processes and returns the list of results.
+# Whether f may run there is checked on every call, against the variables of the calling scope.
+# It starts worker processes, so it cannot itself be called from code running in parallel
+@register("pmap", pure=False, needs_env=True)
+def _pmap(env, function, items):
+    return parallel_map(function, items, env)
+
+
+# Handles parallel for x in xs { ... }: runs the body for every item in worker processes
+# and returns a list with the value of the body's last statement for each item, in order:
+# squares = parallel for x in xs { x * x }
+class ParallelFor(Expression):
+    def __init__(self, var_name: str, iterable_expr: Expression, body: list):
+        self.var_name = var_name            # Name of the loop variable
+        self.iterable_expr = iterable_expr  # Expression producing the list, vector or range
+        self.body = body                    # Statements run for each item
+        self.function = Function(_PARALLEL_FOR, [var_name], body)  # The body as a function of the loop variable
+
+    def evaluate(self, env, verbose=True):
+        items = self.iterable_expr.evaluate(env, verbose)
+        return parallel_map(self.function, items, env)
+
+    def __str__(self):
+        return f"(parallel for {self.var_name} in {self.iterable_expr} {{ {'; '.join(str(stmt) for stmt in self.body)} }})"
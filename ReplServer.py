@@ -0,0 +1,241 @@
+import time
+import asyncio
+import argparse
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import luma
+from Errors import LumaError
+from Input import set_input
+from Sandbox import Limits
+
+# An asyncio server that runs many independent REPL sessions at once (python luma.py serve-repl).
+# Each connection gets its own session with its own variables, so users never see each other's state.
+# Connect with any line-based client, e.g. nc 127.0.0.1 7733
+# Every line sent is run as Luma code; its output (and its value, if any) is sent back followed by the prompt.
+# script() ... end() sends several lines as one program, :stats shows this session's latencies, exit() quits.
+# Anyone who can connect can run code, so every evaluation runs in the sandbox: by default with a time
+# limit and without file access (see main for the options that change this).
+
+PROMPT = ">>> "
+LATENCY_SAMPLES = 1000  # Latencies kept per session for the percentiles
+BACKLOG = 1024          # Connections the OS may queue before accepting, so a burst of users is not refused
+EVALUATION_TIMEOUT = 10.0  # Default seconds one evaluation may run
+
+
+# Sends text written by print to the session's socket as soon as the output writer flushes it.
+# Called from an executor thread, so the write is handed to the event loop
+class _SessionStream:
+    def __init__(self, loop, writer):
+        self._loop = loop
+        self._writer = writer
+
+    def write(self, text: str) -> None:
+        self._loop.call_soon_threadsafe(self._writer.write, text.encode())
+
+    def flush(self) -> None:
+        pass
+
+
+# Answers ask by sending the prompt to the client and waiting for its next line.
+# Called from an executor thread, so the read runs on the event loop and the thread waits for it
+class _SessionInput:
+    def __init__(self, session):
+        self._session = session
+
+    def read_line(self, prompt: str) -> str:
+        future = asyncio.run_coroutine_threadsafe(self._session.ask(prompt), self._session.loop)
+        answer = future.result()
+        if answer is None:
+            raise EOFError(f"The session closed while waiting for ask \"{prompt}\"")
+        return answer
+
+
+# Latency of every evaluation in one session, from receiving the line to sending the reply
+class SessionMetrics:
+    def __init__(self):
+        self.evaluations = 0
+        self.total = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # Most recent latencies in seconds
+
+    def record(self, seconds: float) -> None:
+        self.evaluations += 1
+        self.total += seconds
+        self.latencies.append(seconds)
+
+    # Adds another session's numbers to these ones
+    def merge(self, other) -> None:
+        self.evaluations += other.evaluations
+        self.total += other.total
+        self.latencies.extend(other.latencies)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def __str__(self):
+        if not self.evaluations:
+            return "0 evaluations"
+        return (f"{self.evaluations} evaluations, mean {self.total / self.evaluations * 1000:.2f} ms, "
+                f"p50 {self.percentile(0.5) * 1000:.2f} ms, p95 {self.percentile(0.95) * 1000:.2f} ms, "
+                f"max {max(self.latencies) * 1000:.2f} ms")
+
+
+# One connected user: their variables, their connection and their latency metrics
+class Session:
+    def __init__(self, number: int, reader, writer, executor, limits: Limits = None):
+        self.number = number
+        self.reader = reader
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.executor = executor
+        self.limits = limits  # Sandbox limits for each evaluation (None runs without limits)
+        self.globals = {}  # Top-level variables and functions, carried from one evaluation to the next
+        self.metrics = SessionMetrics()
+
+    async def ask(self, prompt: str):
+        self.writer.write(prompt.encode())
+        line = await self.reader.readline()
+        return line.decode().rstrip("\r\n") if line else None
+
+    # Reads lines until end(), for script() mode
+    async def read_script(self):
+        lines = []
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return None
+            line = line.decode().rstrip("\r\n")
+            if line.strip().lower() == "end()":
+                return "\n".join(lines)
+            if line.strip():
+                lines.append(line)
+
+    # Runs one piece of source in the executor, so a long evaluation only blocks this session
+    async def evaluate(self, source: str) -> None:
+        reply = await self.loop.run_in_executor(self.executor, contextvars.copy_context().run, self._run, source)
+        if reply:
+            self.writer.write(reply.encode())
+
+    # Runs in an executor thread. Returns the text to send after the program's own output
+    def _run(self, source: str) -> str:
+        set_input(_SessionInput(self))
+        try:
+            program = luma.compile(source)
+            result = program.run(globals=self.globals, stdout=_SessionStream(self.loop, self.writer),
+                                 limits=self.limits)
+        except LumaError as e:
+            where = f" on line {e.line}" if e.line is not None else ""
+            return f"\nError{where}: {type(e).__name__}: {e.message}\n\n"
+        self.globals = result.globals
+        return f"{result.value}\n" if result.value is not None else ""
+
+    async def serve(self) -> None:
+        self.writer.write(b"Luma session started. Type 'script()' for multi-line mode, ':stats' for latencies, "
+                          b"'exit()' to quit.\n" + PROMPT.encode())
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            start = time.perf_counter()
+            line = line.decode().strip()
+            if line.lower() == "exit()":
+                break
+            if line == ":stats":
+                self.writer.write(f"{self.metrics}\n".encode())
+            elif line.lower() == "script()":
+                source = await self.read_script()
+                if source is None:
+                    break
+                start = time.perf_counter()  # Time the run, not how long the user took to type the script
+                if source.strip():
+                    await self.evaluate(source)
+            elif line:
+                await self.evaluate(line)
+            self.writer.write(PROMPT.encode())
+            await self.writer.drain()
+            self.metrics.record(time.perf_counter() - start)
+
+
+# Accepts connections and gives each one a Session.
+# limits are the sandbox limits of every evaluation; the default is a time limit and no file access
+class ReplServer:
+    def __init__(self, threads: int = 32, log=print, limits: Limits = None):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="luma-session")
+        self.limits = limits if limits is not None else Limits(timeout=EVALUATION_TIMEOUT, files=False)
+        self.sessions = {}  # Open sessions by number
+        self.closed = SessionMetrics()  # Sessions that have ended, combined (keeps the most recent latencies)
+        self._log = log
+        self._next_number = 1
+
+    async def handle(self, reader, writer) -> None:
+        session = Session(self._next_number, reader, writer, self.executor, self.limits)
+        self._next_number += 1
+        self.sessions[session.number] = session
+        try:
+            await session.serve()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self.sessions[session.number]
+            self.closed.merge(session.metrics)
+            if self._log is not None:
+                self._log(f"session {session.number} closed: {session.metrics}")
+            writer.close()
+
+    # Combined metrics for every session, open or closed
+    def metrics(self) -> SessionMetrics:
+        combined = SessionMetrics()
+        for metrics in [self.closed] + [session.metrics for session in self.sessions.values()]:
+            combined.merge(metrics)
+        return combined
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7733, socket_path: str = None):
+        if socket_path is not None:
+            return await asyncio.start_unix_server(self.handle, path=socket_path, backlog=BACKLOG)
+        return await asyncio.start_server(self.handle, host, port, backlog=BACKLOG)
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 7733, socket_path: str = None) -> None:
+        server = await self.start(host, port, socket_path)
+        where = socket_path or f"{host}:{server.sockets[0].getsockname()[1]}"
+        print(f"Luma REPL server listening on {where}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+# Command line for python luma.py serve-repl
+def main(argv) -> None:
+    parser = argparse.ArgumentParser(prog="luma.py serve-repl",
+                                     description="Serve independent Luma REPL sessions to many clients at once.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=7733, help="TCP port to listen on (default: 7733)")
+    parser.add_argument("--socket", metavar="PATH", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--threads", type=int, default=32,
+                        help="evaluations that may run at the same time (default: 32)")
+    parser.add_argument("--timeout", type=float, default=EVALUATION_TIMEOUT, metavar="SECONDS",
+                        help=f"sandbox: stop an evaluation that runs longer than SECONDS "
+                             f"(default: {EVALUATION_TIMEOUT:g})")
+    parser.add_argument("--max-steps", type=luma.parse_count_option, metavar="N",
+                        help="sandbox: stop an evaluation after N loop iterations and function calls")
+    parser.add_argument("--max-list", type=luma.parse_count_option, metavar="N",
+                        help="sandbox: refuse to build lists or vectors longer than N items")
+    parser.add_argument("--max-string", type=luma.parse_count_option, metavar="N",
+                        help="sandbox: refuse to build strings longer than N characters")
+    parser.add_argument("--max-depth", type=luma.parse_count_option, metavar="N",
+                        help="sandbox: refuse to nest function calls deeper than N")
+    parser.add_argument("--allow-files", action="store_true",
+                        help="let sessions open, read and write files and databases (off by default, "
+                             "since anyone who can connect can run code)")
+    args = parser.parse_args(argv)
+
+    limits = Limits(args.max_steps, args.timeout, args.max_list, args.max_string, args.max_depth,
+                    files=args.allow_files)
+    server = ReplServer(args.threads, limits=limits)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        print(f"\nLuma REPL server stopped. All sessions: {server.metrics()}")
+    finally:
+        server.executor.shutdown(wait=False)
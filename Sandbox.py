@@ -0,0 +1,149 @@
+import time
+import threading
+from contextvars import ContextVar
+from ListView import ListView
+from Vector import Vector
+from Errors import LumaLimitError, LumaStepLimitError, LumaTimeoutError, LumaMemoryError, LumaRecursionError
+
+# Resource limits for running untrusted programs (luma.py --max-steps/--timeout/..., Program.run(limits=...))
+# A step is one loop iteration or one function call. Loops and calls tick the meter of the
+# current context; when no limits are set there is no meter and the checks cost one None test.
+
+CHECK_INTERVAL = 1024  # Steps between looks at the clock, so the deadline costs almost nothing per step
+
+
+# The limits for one run. Any limit left as None is not enforced
+class Limits:
+    def __init__(self, max_steps: int = None, timeout: float = None, max_list_length: int = None,
+                 max_string_length: int = None, max_call_depth: int = None, files: bool = True):
+        self.max_steps = max_steps                  # Loop iterations plus function calls
+        self.timeout = timeout                      # Wall-clock seconds for the whole run
+        self.max_list_length = max_list_length      # Largest list or vector a program may build
+        self.max_string_length = max_string_length  # Longest string a program may build
+        self.max_call_depth = max_call_depth        # Deepest chain of nested function calls
+        self.files = files                          # Whether open, lines, ... may touch the file system
+
+
+# Keeps track of one run against its Limits
+class Meter:
+    __slots__ = ("limits", "steps", "depth", "deadline", "scheduler", "parent", "_lock", "_interval", "_countdown")
+
+    def __init__(self, limits: Limits):
+        self.limits = limits
+        self.steps = 0  # Steps counted so far (brought up to date at every check)
+        self.depth = 0  # Current number of nested function calls
+        self.deadline = None if limits.timeout is None else time.perf_counter() + limits.timeout
+        self.scheduler = None  # Task scheduler to give a turn to at every check (see Tasks.py)
+        self.parent = None     # The meter whose step count this one adds to (see fork)
+        self._lock = threading.Lock()  # Guards steps while other threads add to them
+        self._countdown = self._next_interval()  # Steps left before the next check
+
+    # Called on every loop iteration and function call
+    def tick(self) -> None:
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._check()
+
+    # Counts the steps since the last check and enforces the step budget and the deadline
+    def _check(self) -> None:
+        if self.parent is None:
+            self.steps += self._interval
+        else:
+            self.steps = self.parent._add_steps(self._interval)
+        max_steps = self.limits.max_steps
+        if max_steps is not None and self.steps > max_steps:
+            raise LumaStepLimitError(f"Step limit of {max_steps} reached (loop iterations and function calls).")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise LumaTimeoutError(f"Time limit of {self.limits.timeout:g} seconds reached.")
+        self._countdown = self._next_interval()
+        if self.scheduler is not None:
+            self.scheduler.preempt()  # The end of a time slice: let the next task run
+
+    # The next check comes after CHECK_INTERVAL steps, or exactly one step past the budget if that is sooner
+    def _next_interval(self) -> int:
+        interval = CHECK_INTERVAL
+        if self.limits.max_steps is not None:
+            interval = max(1, min(interval, self.limits.max_steps - self.steps + 1))
+        self._interval = interval
+        return interval
+
+    def _add_steps(self, steps: int) -> int:
+        with self._lock:
+            self.steps += steps
+            return self.steps
+
+    # A meter for another thread of the same run: the same limits and deadline and a shared
+    # step count, but its own call depth and countdown, so threads never touch each other's
+    def fork(self) -> "Meter":
+        root = self.parent or self
+        child = Meter(self.limits)
+        child.deadline = self.deadline
+        child.scheduler = self.scheduler
+        child.parent = root
+        child.steps = root.steps
+        return child
+
+    # Carries on from a run metered in another process (a pmap worker's chunk): the steps it
+    # had already taken and the seconds it had left before its deadline (None: no deadline)
+    def resume(self, steps: int, seconds) -> None:
+        self.steps = steps
+        self.deadline = None if seconds is None else time.perf_counter() + seconds
+        self._countdown = self._next_interval()
+
+    # Called when a function starts. The caller must call leave_call() when it finishes
+    def enter_call(self, name: str) -> None:
+        self.tick()
+        self.depth += 1
+        max_depth = self.limits.max_call_depth
+        if max_depth is not None and self.depth > max_depth:
+            self.depth -= 1
+            raise LumaRecursionError(f"Call depth limit of {max_depth} reached in function '{name}'.")
+
+    def leave_call(self) -> None:
+        self.depth -= 1
+
+    # Rejects a list, vector or string that is larger than allowed
+    def check_size(self, value) -> None:
+        if isinstance(value, str):
+            self.check_string_length(len(value))
+        elif isinstance(value, (list, ListView, Vector)):
+            self.check_list_length(len(value))
+
+    # The same checks for a list or string of the given length, before it is built
+    def check_list_length(self, length: int) -> None:
+        limit = self.limits.max_list_length
+        if limit is not None and length > limit:
+            raise LumaMemoryError(f"List length limit of {limit} reached (got {length}).")
+
+    def check_string_length(self, length: int) -> None:
+        limit = self.limits.max_string_length
+        if limit is not None and length > limit:
+            raise LumaMemoryError(f"String length limit of {limit} reached (got {length}).")
+
+    # Rejects opening a file when file access is turned off (see Files.py)
+    def check_files(self) -> None:
+        if not self.limits.files:
+            raise LumaLimitError("File access is turned off in this sandbox.")
+
+
+# The meter for the current run, or None when it runs without limits
+_current_meter = ContextVar("luma_meter", default=None)
+
+
+def current_meter():
+    return _current_meter.get()
+
+
+# Starts metering the current context against limits (None turns metering off)
+def set_limits(limits: Limits) -> None:
+    _current_meter.set(Meter(limits) if limits is not None else None)
+
+
+# Gives the current thread its own fork of the current meter. Pass the result to restore_meter()
+def fork_meter():
+    meter = _current_meter.get()
+    return _current_meter.set(meter.fork() if meter is not None else None)
+
+
+def restore_meter(token) -> None:
+    _current_meter.reset(token)
@@ -34,19 +34,22 @@ class Scanner:
         #Return the next character without advancing the index
         return self.source[self._cur_char_index]
     
-    #Detect and process numbers both floats and decimals
-    def _scan_float(self) -> None:
-        fl = self._cur_char #Store the curnent character
+    #Detect and process numbers, both integers (5) and decimals (3.14)
+    def _scan_number(self) -> None:
+        num = self._cur_char #Store the curnent character
 
         #Loop through the input as long as:
         # - The next char is a digit
         # - Or the next char is a decimal point (.)
         while self.peek().isdigit() or self.peek() == ".":
-            fl += self.advance() #Append each valid character using advance()
+            num += self.advance() #Append each valid character using advance()
 
-        #Create a FLOAT token and add it to self.tokens
-        #Also converts the fl to a float    
-        self.tokens.append(Token(TokenType.FLOAT, fl, float(fl), self._line, self._col))
+        #A number with a decimal point becomes a FLOAT token holding a float,
+        #otherwise it becomes an INTEGER token holding an int
+        if "." in num:
+            self.tokens.append(Token(TokenType.FLOAT, num, float(num), self._line, self._col))
+        else:
+            self.tokens.append(Token(TokenType.INTEGER, num, int(num), self._line, self._col))
 
     #Scans strings(Text inside "")
     def _scan_string(self) -> None:
@@ -65,8 +68,59 @@ class Scanner:
         #Consume the closing "
         self.advance()
 
+        #A string with {expressions} inside becomes an INTERPOLATED_STRING token whose literal
+        #is the list of parts, split once here so nothing is re-scanned at runtime.
+        #Braces around no expression are plain text, so such a string stays a STRING
+        if "{" in string_value or "}" in string_value:
+            parts = self._split_interpolation(string_value)
+            if any(type(part) is list for part in parts):
+                self.tokens.append(Token(TokenType.INTERPOLATED_STRING, string_value, parts, self._line, self._col))
+                return
+            string_value = "".join(parts)
+
         #Create a STRING token and add it to self.tokens
         self.tokens.append(Token(TokenType.STRING, string_value, string_value, self._line, self._col))
+
+    #Splits "score: {x} of {y}" into ["score: ", [tokens of x], " of ", [tokens of y]]
+    #Literal text stays a string, each {expression} becomes its own list of tokens.
+    #{{ and }} stand for literal braces. A brace without a partner, and {} with nothing
+    #(or only spaces) inside, are kept as they are, so strings like "{}" or "a } b" still work
+    def _split_interpolation(self, text: str) -> list:
+        parts = []
+        literal = ""
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c in "{}" and text[i + 1:i + 2] == c:
+                literal += c  #Escaped brace
+                i += 2
+            elif c == "{":
+                end = text.find("}", i)
+                if end == -1:
+                    literal += text[i:]  #No closing brace: the rest is plain text
+                    break
+                source = text[i + 1:end]
+                if not source.strip():
+                    literal += text[i:end + 1]  #Nothing to evaluate: keep the braces
+                    i = end + 1
+                    continue
+
+                #Scan the embedded expression and move its tokens to the string's line
+                tokens = Scanner(source).scan_tokens()
+                for token in tokens:
+                    token.line = self._line
+
+                if literal:
+                    parts.append(literal)
+                    literal = ""
+                parts.append(tokens)
+                i = end + 1
+            else:
+                literal += c
+                i += 1
+        if literal:
+            parts.append(literal)
+        return parts
     
     #Hanldes newlines
     def _scan_newline(self) -> None:
@@ -93,9 +147,14 @@ class Scanner:
 
             "while": TokenType.WHILE,
             "for": TokenType.FOR,
+            "in": TokenType.IN,
+            "parallel": TokenType.PARALLEL,
+            "spawn": TokenType.SPAWN,
 
             "fun": TokenType.FUN,
             "return": TokenType.RETURN,
+            "yield": TokenType.YIELD,
+            "import": TokenType.IMPORT,
             
             "class": TokenType.CLASS
         }
@@ -117,6 +176,9 @@ class Scanner:
                 self.tokens.append(Token(TokenType.EXP, "**", None, self._line, self._col))
             elif c == "*":  
                 self.tokens.append(Token(TokenType.TIMES, c, None, self._line, self._col))
+            elif c == "/" and self.peek() == "/":
+                self.advance()  #Consume the 2nd /
+                self.tokens.append(Token(TokenType.FLOOR_DIV, "//", None, self._line, self._col))
             elif c == "/":  
                 self.tokens.append(Token(TokenType.DIV, c, None, self._line, self._col))
             elif c == "%":  
@@ -139,6 +201,8 @@ class Scanner:
                 self.tokens.append(Token(TokenType.SEMICOLON, c, None, self._line, self._col))
             elif c == ".":
                 self.tokens.append(Token(TokenType.DOT, c, None, self._line, self._col))
+            elif c == ":":
+                self.tokens.append(Token(TokenType.COLON, c, None, self._line, self._col))
             elif c == "!":
                 # Handle '!=' (not equal) operator if followed by '='
                 if self.peek() == "=":
@@ -177,7 +241,7 @@ class Scanner:
 
             elif c.isdigit():
                 # Start of a numeric value (float or int)
-                self._scan_float()
+                self._scan_number()
 
             elif c == '"':
                 # Start of a string literal
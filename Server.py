@@ -0,0 +1,258 @@
+import os
+import sys
+import queue
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+import multiprocessing
+from Batch import BatchResult, run_source
+from Sandbox import Limits
+from Client import DEFAULT_SOCKET, send_message, read_message
+
+# A long-lived job server (python luma.py serve) that keeps warm worker processes with the
+# interpreter already imported, so running a short script does not pay for Python startup.
+# Clients send run requests over a Unix domain socket (see Client.py):
+#   {"source": "print 1"} or {"path": "/abs/file.luma"}, plus optional "input": [...] and "timeout": seconds
+# and get back {"ok", "stdout", "stderr", "error", "seconds", "path"}.
+
+KILL_GRACE = 1.0  # Extra seconds a job gets to stop on its own time limit before its worker is killed
+
+
+# Builds a failed result without running anything
+def _failure(message: str, path: str = None, seconds: float = 0.0) -> dict:
+    return BatchResult(path, False, seconds, "", "", message).to_dict()
+
+
+# Runs one request inside a worker process
+def _execute(request: dict) -> dict:
+    path = request.get("path")
+    source = request.get("source")
+    if source is None:
+        try:
+            with open(path, "r") as file:
+                source = file.read()
+        except (OSError, UnicodeDecodeError) as e:
+            return _failure(f"Could not read '{path}': {e}", path)
+    # The time limit is enforced inside the interpreter first, so a runaway loop normally ends
+    # with a LumaTimeoutError and the worker stays warm
+    return run_source(source, request.get("input") or [], path, Limits(timeout=request["timeout"])).to_dict()
+
+
+# Main loop of a worker process: run requests until the pipe is closed
+def _worker_main(connection) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the server, which stops the workers
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        connection.send(_execute(request))
+
+
+# Workers are forked from a process that has already imported the interpreter,
+# so starting or replacing one is cheap. Falls back to the default start method on other platforms
+def _process_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["Batch"])
+        return context
+    return multiprocessing.get_context()
+
+
+# One warm worker process and the pipe used to talk to it
+class Worker:
+    def __init__(self, context):
+        self._context = context
+        self._start()
+
+    def _start(self) -> None:
+        self.connection, child = self._context.Pipe()
+        self.process = self._context.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs_done = 0  # Jobs run by this process, used for recycling
+
+    # Sends a request and waits for the result. A worker that does not answer soon after the
+    # job's time limit (e.g. stuck in one huge native call) or dies is replaced,
+    # so one bad program cannot block the server
+    def run(self, request: dict, timeout: float) -> dict:
+        self.connection.send(dict(request, timeout=timeout))
+        if not self.connection.poll(timeout + KILL_GRACE):
+            self.restart()
+            return _failure(f"Timed out after {timeout:g} seconds", request.get("path"), timeout)
+        try:
+            result = self.connection.recv()
+        except EOFError:
+            self.restart()
+            return _failure("The worker process crashed", request.get("path"))
+        self.jobs_done += 1
+        return result
+
+    def restart(self) -> None:
+        self.stop()
+        self._start()
+
+    def stop(self) -> None:
+        self.connection.close()
+        self.process.terminate()
+        self.process.join()
+
+
+# A request waiting in the queue, and the result once a worker has run it
+class Job:
+    def __init__(self, request: dict):
+        self.request = request
+        self.result = None
+        self.done = threading.Event()
+
+
+# Owns the worker processes and the bounded job queue
+# Each worker has a dispatcher thread that takes the next job from the queue and hands it over
+class JobServer:
+    def __init__(self, workers: int = None, queue_size: int = 64, timeout: float = 30.0, max_jobs: int = 1000):
+        self.timeout = timeout    # Longest time a job may run (requests can only ask for less)
+        self.max_jobs = max_jobs  # Jobs a worker runs before it is replaced with a fresh process
+        self.jobs = queue.Queue(maxsize=queue_size)  # Jobs waiting for a worker; full means busy
+        context = _process_context()
+        self.workers = [Worker(context) for _ in range(workers or os.cpu_count() or 1)]
+        self._threads = [threading.Thread(target=self._dispatch, args=(worker,), daemon=True) for worker in self.workers]
+        for thread in self._threads:
+            thread.start()
+
+    # Queues a request and waits for its result. Fails straight away if the queue is full,
+    # so clients see back-pressure instead of waiting without limit
+    def submit(self, request) -> dict:
+        error = self._check(request)
+        if error is not None:
+            return _failure(error)
+        job = Job(request)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            return _failure("Server busy: the job queue is full", request.get("path"))
+        job.done.wait()
+        return job.result
+
+    def _check(self, request):
+        if not isinstance(request, dict) or (request.get("source") is None) == (request.get("path") is None):
+            return "A request needs exactly one of 'source' or 'path'"
+        if not isinstance(request.get("input", []), list):
+            return "'input' must be a list of lines"
+        timeout = request.get("timeout", self.timeout)
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+            return "'timeout' must be a positive number of seconds"
+        return None
+
+    def _dispatch(self, worker: Worker) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            timeout = min(job.request.get("timeout", self.timeout), self.timeout)
+            job.result = worker.run(job.request, timeout)
+            job.done.set()
+            # Replace the worker after the reply is sent, so recycling never delays a client
+            if worker.jobs_done >= self.max_jobs:
+                worker.restart()
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        for worker in self.workers:
+            worker.stop()
+
+
+# Handles one client connection: any number of requests, one response each
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = read_message(self.rfile)
+            except ValueError:
+                send_message(self.wfile, _failure("The request is not valid JSON"))
+                continue
+            if request is None:
+                break
+            send_message(self.wfile, self.server.job_server.submit(request))
+
+
+class _SocketServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+# Removes a socket file left behind by a server that did not shut down cleanly.
+# Refuses to start if another server is still listening on it
+def _claim_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"A Luma server is already listening on '{path}'")
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+# Starts the server and runs until Ctrl+C or SIGTERM
+def serve(socket_path: str = DEFAULT_SOCKET, workers: int = None, queue_size: int = 64,
+          timeout: float = 30.0, max_jobs: int = 1000) -> None:
+    _claim_socket(socket_path)
+    job_server = JobServer(workers, queue_size, timeout, max_jobs)
+    server = _SocketServer(socket_path, _RequestHandler)
+    server.job_server = job_server
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"Luma server listening on {socket_path} with {len(job_server.workers)} worker(s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        job_server.stop()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("Luma server stopped", flush=True)
+
+
+def _positive(kind):
+    def parse(value):
+        try:
+            number = kind(value)
+        except ValueError:
+            number = 0
+        if number <= 0:
+            raise argparse.ArgumentTypeError("expected a positive number")
+        return number
+    return parse
+
+
+# Command line for python luma.py serve
+def main(argv) -> None:
+    parser = argparse.ArgumentParser(prog="luma.py serve",
+                                     description="Keep warm Luma worker processes and run jobs sent by Client.py.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Unix socket to listen on (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--workers", type=_positive(int), default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--queue", type=_positive(int), default=64,
+                        help="jobs that may wait for a worker before new ones are refused (default: 64)")
+    parser.add_argument("--timeout", type=_positive(float), default=30.0,
+                        help="seconds a job may run before its worker is killed and replaced (default: 30)")
+    parser.add_argument("--max-jobs", type=_positive(int), default=1000,
+                        help="jobs a worker runs before it is replaced with a fresh process (default: 1000)")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.socket, args.workers, args.queue, args.timeout, args.max_jobs)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,158 @@
+import gc
+import hashlib
+import io
+import pickle
+import AST       # Loads every node class before the layout is worked out
+import Data      # Registers the built-ins a snapshot may name that the parser does not load
+import Database
+from Builtins import NATIVES, NativeFunction
+from Environment import Environment
+from Expression import Expression, ClassDefinition, Instance
+from ListView import ListView
+from StringBuilder import StringBuilder
+from Token import Token, TokenType
+from Vector import Vector, numpy
+
+# Snapshots: the top-level variables of an Environment saved to a file, so a program can start
+# from them instead of running the code that made them again.
+#   python luma.py prelude.luma --save-snapshot prelude.snap   run the prelude, then save its variables
+#   python luma.py main.luma --snapshot prelude.snap           start main.luma with them already defined
+#   luma.compile(source).run(globals=Snapshot.load("prelude.snap"))
+# Functions, classes, instances, lists, vectors and plain values are saved, with objects shared
+# between variables still shared after loading. Built-in functions are saved by name. Open files,
+# databases, channels and generators cannot be saved.
+#
+# Functions and classes are saved as their parsed trees, so a snapshot only fits the interpreter
+# that made it: the file starts with a fingerprint of the node classes (their names and the fields
+# their constructors set) and of the token types, and one that does not match is refused.
+#
+# Loading only ever creates the interpreter's own classes and the plain Python types its values
+# are made of; a file naming anything else (a function pickle would call) is refused.
+
+MAGIC = b"LUMA SNAPSHOT 1\n"  # First line of every snapshot file (the number is the file format)
+
+_layout = None   # Fingerprint of this interpreter's node layout, worked out on first use
+_allowed = None  # (module, name) of every class and function a snapshot may name, worked out on first use
+
+# The Python types (and the functions pickle rebuilds them with) that saved values are made of
+_PYTHON_NAMES = [("builtins", name) for name in ("list", "dict", "set", "frozenset", "tuple", "int", "float",
+                                                 "complex", "str", "bytes", "bytearray", "bool", "range", "slice")]
+_PYTHON_NAMES += [("array", "array"), ("array", "_array_reconstructor")]
+_NUMPY_NAMES = [("numpy", "dtype"), ("numpy", "ndarray")]
+_NUMPY_NAMES += [(module, name) for module in ("numpy.core.multiarray", "numpy._core.multiarray")
+                 for name in ("_reconstruct", "scalar")]
+_NUMPY_NAMES += [(module, "_frombuffer") for module in ("numpy.core.numeric", "numpy._core.numeric")]
+
+
+# Every class whose objects can be part of a saved tree or value, besides Python's own types
+def _snapshot_classes() -> list:
+    classes, pending = [], [Expression]
+    while pending:
+        cls = pending.pop()
+        classes.append(cls)
+        pending += cls.__subclasses__()
+    classes += [ClassDefinition, Instance, Token, ListView, Vector, StringBuilder]
+    return sorted(set(classes), key=lambda cls: (cls.__module__, cls.__qualname__))
+
+
+# One line describing a class's fields: its slots, or the parameters and names of its own constructor
+def _describe(cls) -> str:
+    init = cls.__dict__.get("__init__")
+    code = getattr(init, "__code__", None)
+    names = code.co_varnames[:code.co_argcount] + code.co_names if code is not None else ()
+    return f"{cls.__module__}.{cls.__qualname__} {cls.__dict__.get('__slots__', ())} {' '.join(names)}"
+
+
+# Fingerprint (a SHA-256 hex string) of the node classes and token types of this interpreter
+def layout() -> str:
+    global _layout
+    if _layout is None:
+        lines = [_describe(cls) for cls in _snapshot_classes()]
+        lines += [f"{member.name}={member.value}" for member in TokenType]
+        lines.append("vectors=" + ("numpy" if numpy is not None else "array"))
+        _layout = hashlib.sha256("\n".join(lines).encode()).hexdigest()
+    return _layout
+
+
+# Pickles built-in functions as their names: they are registered again by every interpreter
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, value):
+        return value.name if isinstance(value, NativeFunction) else None
+
+
+# The (module, name) pairs find_class accepts
+def _allowed_names() -> set:
+    global _allowed
+    if _allowed is None:
+        classes = _snapshot_classes() + [Environment, TokenType]
+        _allowed = {(cls.__module__, cls.__qualname__) for cls in classes}
+        _allowed.update(_PYTHON_NAMES)
+        if numpy is not None:
+            _allowed.update(_NUMPY_NAMES)
+    return _allowed
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, name):
+        if name not in NATIVES:
+            raise ValueError(f"Snapshot uses the built-in function '{name}', which this interpreter does not have.")
+        return NATIVES[name]
+
+    def find_class(self, module, name):
+        if (module, name) not in _allowed_names():
+            raise ValueError(f"Snapshot names '{module}.{name}', which is not a Luma value.")
+        return super().find_class(module, name)
+
+
+def _dump(value, file) -> None:
+    _Pickler(file, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+
+
+# Saves the variables defined in env's own scope to a snapshot file. Nothing is written
+# unless every variable can be saved, so a failed save never leaves half a snapshot behind
+def save(env, path: str) -> None:
+    variables = dict(env.variables)
+    buffer = io.BytesIO()
+    try:
+        _dump(variables, buffer)
+    except (TypeError, AttributeError, pickle.PicklingError, RecursionError) as error:
+        raise TypeError(_unsaveable(variables, error)) from error
+    with open(path, "wb") as file:
+        file.write(MAGIC + layout().encode() + b"\n")
+        file.write(buffer.getbuffer())
+
+
+# Names the first variable that cannot be saved, to explain why saving failed
+def _unsaveable(variables: dict, error) -> str:
+    for name, value in variables.items():
+        try:
+            _dump(value, io.BytesIO())
+        except Exception:
+            return f"Cannot save variable '{name}' in a snapshot: a {type(value).__name__} value cannot be saved."
+    return f"Cannot save the snapshot: {error}."
+
+
+# Gives the variables saved in a snapshot file, by name. Every call gives new objects,
+# so runs started from the same snapshot never see each other's changes
+def load(path: str) -> dict:
+    with open(path, "rb") as file:
+        if file.readline() != MAGIC:
+            raise ValueError(f"'{path}' is not a Luma snapshot.")
+        if file.readline().rstrip(b"\n").decode("ascii", "replace") != layout():
+            raise ValueError(f"Snapshot '{path}' was made by a different version of the interpreter. "
+                             "Run the code that made it again to make a new one.")
+        # A snapshot is many small objects that all live on, so collecting garbage while
+        # they are created only walks them over and over
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return _Unpickler(file).load()
+        finally:
+            if enabled:
+                gc.enable()
+
+
+# Defines the variables saved in a snapshot file in env
+def restore(path: str, env) -> None:
+    for name, value in load(path).items():
+        env.define(name, value)
@@ -0,0 +1,41 @@
+# A mutable string buffer created with builder()
+# b.add(x) appends x (converted with str(), like print does) and b.build() returns the joined string.
+# Appending costs O(1), so building a large string in a loop is linear instead of quadratic.
+from Sandbox import current_meter
+
+
+class StringBuilder:
+    __slots__ = ("parts", "size")
+
+    METHODS = ("add", "build")  # Methods Luma code may call on a builder
+
+    def __init__(self, parts=None):
+        self.parts = parts if parts is not None else []  # Pieces appended so far, in order
+        self.size = sum(len(part) for part in self.parts)  # Total length, checked against the sandbox string limit
+
+    # Appends a value and returns the builder, so calls can be chained: b.add("a").add("b")
+    def add(self, value):
+        piece = value if type(value) is str else str(value)
+        meter = current_meter()
+        if meter is not None:
+            meter.check_string_length(self.size + len(piece))
+        self.parts.append(piece)
+        self.size += len(piece)
+        return self
+
+    # Joins the pieces into one string. The result replaces the pieces, so building twice is cheap
+    def build(self) -> str:
+        if len(self.parts) > 1:
+            self.parts = ["".join(self.parts)]
+        return self.parts[0] if self.parts else ""
+
+    def __str__(self):
+        return self.build()
+
+
+# The accumulator used behind the scenes when a loop appends to a string with s = s + piece.
+# It is a separate type so it is never confused with a builder the program created itself,
+# and it is turned back into a plain string as soon as the loop finishes.
+# SelfAppend keeps its size up to date itself.
+class Rope(StringBuilder):
+    __slots__ = ()
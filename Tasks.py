@@ -0,0 +1,653 @@
+import threading
+import contextvars
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from Builtins import NATIVES, register
+from Sandbox import Limits, current_meter, set_limits, fork_meter, restore_meter
+
+# Lightweight tasks and channels: spawn f(args), join(task), channel(), send(ch, v), recv(ch), close(ch)
+# Tasks are cooperative: only one runs at a time, and the scheduler switches to the next one when
+# the running task blocks on a channel or has used up its time slice. Time slices are counted by the
+# sandbox meter (see Sandbox.py), so switches happen at the same points it ticks: loop back-edges and
+# function calls. A task is suspended in the middle of the ordinary recursive evaluator; with greenlet
+# installed each task is a greenlet (a few KB), otherwise it falls back to one OS thread per task
+# passing a baton, which behaves the same but is much heavier.
+# With set_threads(n) (luma.py --threads N) tasks run for real on OS threads instead, n at a time,
+# which lets CPU-bound tasks use several cores on a free-threaded (no-GIL) Python build.
+
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+BACKEND = "greenlet" if greenlet is not None else "threads"  # How cooperative tasks are suspended
+
+_threads = 0  # Most threaded tasks running at the same time (0 runs tasks cooperatively)
+
+
+# Sets how many spawned tasks run at the same time on OS threads (luma.py --threads).
+# 0 goes back to cooperative tasks
+def set_threads(count: int) -> None:
+    global _threads
+    _threads = count
+
+
+# Raised inside a task that is still suspended when its run ends early (e.g. after an error),
+# so it unwinds without running any more Luma code
+class TaskCancelled(BaseException):
+    pass
+
+
+_CLOSED = object()  # Received from a channel that is closed and empty
+
+
+# A spawned function call
+class Task:
+    __slots__ = ("number", "handle", "started", "done", "depth", "value", "result", "error", "waiters")
+
+    def __init__(self, number: int):
+        self.number = number  # 0 is the main program, spawned tasks count from 1
+        self.handle = None    # The greenlet, (thread, event) or threading.Condition behind it
+        self.started = False
+        self.done = False
+        self.depth = 0        # Call depth saved while it is suspended (the meter counts per task)
+        self.value = None     # Value handed over by a channel while it was blocked
+        self.result = None    # What the function returned, given by join(task)
+        self.error = None     # Error the function raised (threaded tasks)
+        self.waiters = []     # Tasks blocked in join(task)
+
+    def __str__(self):
+        return f"<task {self.number}>"
+
+
+#--------------------
+# Backends          |
+#--------------------
+
+# Each task is a greenlet; switching is a stack switch inside this OS thread.
+# A new greenlet starts at the Python recursion depth of the greenlet that starts it, so new tasks
+# are started from a hub greenlet that stays shallow, instead of from deep inside another task.
+# A task may be suspended inside a generator's greenlet (see Generators.py), so each task
+# remembers the greenlet it was last running in and is resumed there
+class _GreenletBackend:
+    def __init__(self):
+        self._hub = greenlet.greenlet(self._run_hub)
+        self._exit_to = None  # Task the hub starts when the finishing task's greenlet returns
+        self._points = {}     # Task -> greenlet to resume it in
+
+    def _run_hub(self, task: Task) -> None:
+        while True:
+            task = task.handle.switch()
+
+    def adopt(self, task: Task) -> None:
+        task.handle = greenlet.getcurrent()
+        task.started = True
+
+    def create(self, task: Task, run) -> None:
+        def start():
+            run()
+            return self._exit_to
+
+        task.handle = greenlet.greenlet(start)
+        task.handle.gr_context = contextvars.copy_context()  # A new greenlet would start with an empty context
+
+    def switch(self, current: Task, task: Task) -> None:
+        self._points[current] = greenlet.getcurrent()
+        if task.started:
+            self._points.pop(task).switch()
+        else:
+            task.started = True
+            self._hub.switch(task)
+
+    # Called as the last thing a finished task does: when its greenlet returns, control goes to its parent
+    def exit(self, current: Task, task: Task) -> None:
+        if task.started:
+            current.handle.parent = self._points.pop(task)
+            self._exit_to = None
+        else:
+            task.started = True
+            current.handle.parent = self._hub
+            self._exit_to = task
+
+    def cancel(self, task: Task) -> None:
+        task.handle.parent = greenlet.getcurrent()
+        self._points.pop(task, task.handle).throw(TaskCancelled)
+
+
+# Each task is an OS thread that only runs while it holds the baton (its event is set)
+class _ThreadBackend:
+    def adopt(self, task: Task) -> None:
+        task.handle = (threading.current_thread(), threading.Event())
+        task.started = True
+
+    def create(self, task: Task, run) -> None:
+        event = threading.Event()
+
+        def start():
+            event.wait()
+            event.clear()
+            run()
+
+        context = contextvars.copy_context()
+        task.handle = (threading.Thread(target=context.run, args=(start,), daemon=True), event)
+
+    def _resume(self, task: Task) -> None:
+        thread, event = task.handle
+        event.set()
+        if not task.started:
+            task.started = True
+            thread.start()
+
+    def switch(self, current: Task, task: Task) -> None:
+        self._resume(task)
+        event = current.handle[1]
+        event.wait()
+        event.clear()
+
+    def exit(self, current: Task, task: Task) -> None:
+        self._resume(task)
+
+    def cancel(self, task: Task) -> None:
+        task.handle[1].set()
+        task.handle[0].join()
+
+
+#--------------------
+# Scheduler         |
+#--------------------
+
+# Runs the tasks of one program run, round-robin
+class Scheduler:
+    lock = nullcontext()  # Only one task runs at a time, so channels need no locking
+
+    def __init__(self):
+        self._backend = _GreenletBackend() if BACKEND == "greenlet" else _ThreadBackend()
+        self.main = Task(0)  # The program itself, which keeps running in the caller
+        self._backend.adopt(self.main)
+        self.current = self.main
+        self.ready = deque()       # Tasks waiting for their turn
+        self.tasks = set()         # Spawned tasks that have not finished
+        self.spawned = 0
+        self.joining = False       # True while the main program waits for the tasks at its end
+        self.error = None          # Error raised by a task, re-raised in the main program
+        self.closed = False
+
+        # Time slices come from the meter's periodic check, so make sure there is one
+        self._own_meter = current_meter() is None
+        if self._own_meter:
+            set_limits(Limits())
+        self.meter = current_meter()
+        self.meter.scheduler = self
+
+    def spawn(self, run) -> Task:
+        self.spawned += 1
+        task = Task(self.spawned)
+        self._backend.create(task, lambda: self._run_task(task, run))
+        self.tasks.add(task)
+        self.ready.append(task)
+        return task
+
+    def _run_task(self, task: Task, run) -> None:
+        try:
+            task.result = run()
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+        finally:
+            task.done = True
+            self.tasks.discard(task)
+            for waiter in task.waiters:
+                self.wake(waiter)
+            if not self.closed:
+                self._exit(task)
+
+    # Called by the meter at the end of each time slice
+    def preempt(self) -> None:
+        if self.ready:
+            self.ready.append(self.current)
+            self._transfer(self.ready.popleft())
+
+    # Suspends the current task until something puts it back in the ready queue (see wake)
+    def block(self) -> None:
+        self._transfer(self._next_task())
+
+    def wake(self, task: Task) -> None:
+        self.ready.append(task)
+
+    # Waits until task has finished and returns its result
+    def join(self, task: Task):
+        while not task.done:
+            task.waiters.append(self.current)
+            self.block()
+        return task.result
+
+    # Runs the spawned tasks until they have all finished. Called by the main program at its end
+    def join_all(self) -> None:
+        while self.tasks:
+            self.joining = True
+            self._transfer(self._next_task())
+
+    # The task to run when the current one stops. When nothing can run, the main program is
+    # resumed with an error, since every task waits on a channel or task that nothing will wake
+    def _next_task(self) -> Task:
+        if self.error is not None:
+            if self.main in self.ready:
+                self.ready.remove(self.main)
+            return self.main
+        if self.ready:
+            return self.ready.popleft()
+        if self.joining and not self.tasks:
+            self.joining = False
+            return self.main
+        blocked = len(self.tasks) + (0 if self.joining else 1)
+        self.error = RuntimeError(f"Deadlock: all {blocked} task(s) are waiting on channels or joins.")
+        return self.main
+
+    # Hands control from the current task to task, returning when the current task is resumed
+    def _transfer(self, task: Task) -> None:
+        current = self.current
+        if task is not current:
+            current.depth = self.meter.depth
+            self.meter.depth = task.depth
+            self.current = task
+            self._backend.switch(current, task)
+        if self.closed and current is not self.main:
+            raise TaskCancelled
+        if current is self.main and self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    # Hands control to the next task for good, as a task finishes
+    def _exit(self, current: Task) -> None:
+        task = self._next_task()
+        self.meter.depth = task.depth
+        self.current = task
+        self._backend.exit(current, task)
+
+    # Ends the run: suspended tasks are unwound and the meter goes back to how it was
+    def close(self) -> None:
+        self.closed = True
+        for task in list(self.tasks):
+            if task.started and not task.done:
+                self._backend.cancel(task)
+        self.tasks.clear()
+        self.ready.clear()
+        self.meter.scheduler = None
+        if self._own_meter:
+            set_limits(None)
+
+
+# Runs the tasks of one program run on OS threads, up to _threads of them at the same time.
+# Every task has its own Python stack, Environment chain and meter (see Sandbox.fork_meter), so the
+# only state they share is what the program shares: variables, fields and lists, whose single reads
+# and writes Python already makes atomic (per-object locks on free-threaded builds). Channels and
+# joins are guarded by one lock, and a blocked task waits on its own condition.
+# A running task holds one of the _threads slots. While it waits on a channel or join it gives its
+# slot up, so another task can start (on a new thread) or carry on: a task waiting for another one
+# never keeps that one from running, however few threads there are. A thread whose task finishes
+# keeps its slot for the next task that has not started yet
+class ThreadScheduler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._local = threading.local()  # The task running in each thread, and whether it holds a slot
+        self.main = Task(0)
+        self.main.started = True
+        self.main.handle = threading.Condition(self.lock)
+        self._local.task = self.main
+        self.tasks = []          # Every spawned task, in order
+        self._runs = {}          # Code and context of the tasks that have not started yet
+        self._pending = deque()  # Those tasks, in the order they were spawned
+        self._blocked = set()    # Tasks waiting in block() until they are woken
+        self._live = 1           # The main program plus the tasks that have started and not finished
+        self._running = 0        # Slots in use: tasks running on their own thread right now
+        self._slot_waiters = 0   # Woken tasks waiting for a slot to carry on (they go before new tasks)
+        self._slot_free = threading.Condition(self.lock)
+        self.spawned = 0
+        self.error = None        # Deadlock found while every task waits, raised in the main program
+        self.closed = False
+
+        # Each task gets its own copy of the meter, so make sure there is one to copy (see preempt)
+        self._own_meter = current_meter() is None
+        if self._own_meter:
+            set_limits(Limits())
+        self.meter = current_meter()
+        self.meter.scheduler = self
+
+    @property
+    def current(self) -> Task:
+        return self._local.task
+
+    def spawn(self, run) -> Task:
+        with self.lock:
+            self.spawned += 1
+            task = Task(self.spawned)
+            task.handle = threading.Condition(self.lock)  # Notified when the task is woken or finishes
+            self.tasks.append(task)
+            self._runs[task] = (run, contextvars.copy_context())
+            self._pending.append(task)
+            self._start_threads()
+        return task
+
+    # Starts tasks that have not started yet while there are free slots. The caller holds the lock
+    def _start_threads(self) -> None:
+        while self._running < _threads and not self._slot_waiters and not self.closed:
+            task = self._next_pending()
+            if task is None:
+                return
+            self._running += 1
+            threading.Thread(target=self._work, args=(task,), name=f"luma-task-{task.number}", daemon=True).start()
+
+    # The next task that has not started, skipping those a join already ran. The caller holds the lock
+    def _next_pending(self):
+        while self._pending:
+            task = self._pending.popleft()
+            if task in self._runs:
+                return task
+        return None
+
+    # A task thread: runs its task, then the next one that has not started while no woken task
+    # is waiting for a slot, and gives its slot back when there is nothing left for it to do
+    def _work(self, task: Task) -> None:
+        self._local.slot = True
+        while task is not None:
+            self._run_task(task)
+            with self.lock:
+                task = self._next_pending() if not self._slot_waiters and not self.closed else None
+                if task is None:
+                    self._release_slot()
+
+    # Runs a task unless another thread has already claimed it. A task that is joined before a
+    # thread gets to it runs in the joining thread
+    def _run_task(self, task: Task) -> None:
+        with self.lock:
+            claimed = self._runs.pop(task, None)
+            if claimed is None:
+                return
+            task.started = True
+            self._live += 1
+        run, context = claimed
+        previous = getattr(self._local, "task", None)
+        self._local.task = task
+        try:
+            context.run(self._call, task, run)
+        finally:
+            self._local.task = previous
+            with self.lock:
+                task.done = True
+                self._live -= 1
+                for waiter in task.waiters:
+                    self.wake(waiter)
+                task.waiters.clear()
+                task.handle.notify_all()
+                self._check_deadlock()
+
+    def _call(self, task: Task, run) -> None:
+        token = fork_meter()
+        try:
+            task.result = run()
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            task.error = e
+        finally:
+            restore_meter(token)
+
+    # The caller holds the lock
+    def _release_slot(self) -> None:
+        self._running -= 1
+        if self._slot_waiters:
+            self._slot_free.notify()
+        else:
+            self._start_threads()
+
+    # The caller holds the lock
+    def _take_slot(self) -> None:
+        self._slot_waiters += 1
+        while self._running >= _threads and not self.closed:
+            self._slot_free.wait()
+        self._slot_waiters -= 1
+        self._running += 1
+        self._start_threads()  # Another slot may have come free while this task was waiting
+
+    # Called by the meter of every task at each check; stops long loops once the run has ended
+    def preempt(self) -> None:
+        if self.closed:
+            raise TaskCancelled
+
+    # Waits until the current task is woken. The caller holds the lock
+    def block(self) -> None:
+        task = self.current
+        slot = getattr(self._local, "slot", False)
+        self._blocked.add(task)
+        if slot:
+            self._release_slot()
+        self._check_deadlock()
+        while task in self._blocked and not self.closed:
+            task.handle.wait()
+        self._blocked.discard(task)
+        if slot:
+            self._take_slot()
+        if self.closed:
+            raise TaskCancelled
+        if task is self.main and self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    # The caller holds the lock
+    def wake(self, task: Task) -> None:
+        self._blocked.discard(task)
+        task.handle.notify_all()
+
+    # When every task, the main program included, waits on a channel or join and none is left to
+    # start, nothing can ever wake them: the main program is woken with an error. The caller holds the lock
+    def _check_deadlock(self) -> None:
+        if (self._blocked and len(self._blocked) == self._live and not self._runs
+                and self.error is None and not self.closed):
+            self.error = RuntimeError(f"Deadlock: all {self._live} task(s) are waiting on channels or joins.")
+            self.wake(self.main)
+
+    # Waits until task has finished and returns its result, or raises its error
+    def join(self, task: Task):
+        self._run_task(task)  # Runs it here if no thread has started it yet
+        with self.lock:
+            while not task.done:
+                task.waiters.append(self.current)
+                self.block()
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    # Tasks spawned while waiting are joined as well
+    def join_all(self) -> None:
+        index = 0
+        while index < len(self.tasks):
+            self.join(self.tasks[index])
+            index += 1
+
+    # Ends the run: tasks that have not started never will, blocked ones are woken to unwind
+    # and running ones stop at their meter's next check
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            for task in self._runs:
+                task.done = True
+            self._runs.clear()
+            self._pending.clear()
+            for task in self.tasks:
+                task.handle.notify_all()
+            self._slot_free.notify_all()
+            current = self.current
+            for task in self.tasks:
+                while task is not current and not task.done:
+                    task.handle.wait()
+        self.meter.scheduler = None
+        if self._own_meter:
+            set_limits(None)
+
+
+# The scheduler of the current run, created by the first spawn or channel operation
+_current_scheduler = ContextVar("luma_scheduler", default=None)
+
+
+def current_scheduler() -> Scheduler:
+    scheduler = _current_scheduler.get()
+    if scheduler is None:
+        scheduler = ThreadScheduler() if _threads else Scheduler()
+        _current_scheduler.set(scheduler)
+    return scheduler
+
+
+# True once the current run has a scheduler: from then on other tasks may run between any
+# two steps of the program (and see its variables)
+def tasks_started() -> bool:
+    return _current_scheduler.get() is not None
+
+
+# Starts a task that calls run() (a Python callable) and returns it
+def spawn_task(run) -> Task:
+    return current_scheduler().spawn(run)
+
+
+# Called at the end of a program: the program is not finished until its tasks are.
+# With error=True the run failed, so the tasks are stopped instead of waited for
+def finish_tasks(error: bool = False) -> None:
+    scheduler = _current_scheduler.get()
+    if scheduler is None:
+        return
+    try:
+        if not error:
+            scheduler.join_all()
+    finally:
+        scheduler.close()
+        _current_scheduler.set(None)
+
+
+#--------------------
+# Channels          |
+#--------------------
+
+# A queue between tasks. With capacity 0 a send waits until a receiver takes the value;
+# otherwise sends only wait while the buffer is full
+class Channel:
+    __slots__ = ("capacity", "buffer", "senders", "receivers", "closed")
+
+    def __init__(self, capacity: int = 0):
+        self.capacity = capacity
+        self.buffer = deque()     # Values sent but not received yet
+        self.senders = deque()    # (task, value) for tasks blocked in send
+        self.receivers = deque()  # Tasks blocked in recv
+        self.closed = False
+
+    def send(self, value) -> None:
+        scheduler = current_scheduler()
+        with scheduler.lock:
+            if self.closed:
+                raise RuntimeError("Cannot send on a closed channel.")
+            if self.receivers:
+                task = self.receivers.popleft()
+                task.value = value  # Handed straight to a waiting receiver
+                scheduler.wake(task)
+                return
+            if len(self.buffer) < self.capacity:
+                self.buffer.append(value)
+                return
+            task = scheduler.current
+            task.value = None
+            self.senders.append((task, value))
+            scheduler.block()
+            if task.value is _CLOSED:
+                raise RuntimeError("Cannot send on a closed channel.")
+
+    # Returns the next value, or _CLOSED once the channel is closed and empty
+    def receive(self):
+        scheduler = current_scheduler()
+        with scheduler.lock:
+            if self.buffer:
+                value = self.buffer.popleft()
+                if self.senders:
+                    task, sent = self.senders.popleft()
+                    self.buffer.append(sent)
+                    scheduler.wake(task)
+                return value
+            if self.senders:
+                task, sent = self.senders.popleft()
+                scheduler.wake(task)
+                return sent
+            if self.closed:
+                return _CLOSED
+            task = scheduler.current
+            self.receivers.append(task)
+            scheduler.block()
+            return task.value
+
+    # Blocked receivers get _CLOSED and blocked senders fail
+    def close(self) -> None:
+        scheduler = current_scheduler()
+        with scheduler.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for task in self.receivers:
+                task.value = _CLOSED
+                scheduler.wake(task)
+            for task, _ in self.senders:
+                task.value = _CLOSED
+                scheduler.wake(task)
+            self.receivers.clear()
+            self.senders.clear()
+
+    # for x in ch { ... } receives until the channel is closed
+    def __iter__(self):
+        while (value := self.receive()) is not _CLOSED:
+            yield value
+
+    def __str__(self):
+        return f"<channel {len(self.buffer)}/{self.capacity}{' closed' if self.closed else ''}>"
+
+
+def _expect_channel(name: str, value) -> Channel:
+    if not isinstance(value, Channel):
+        raise TypeError(f"{name}() expects a channel, got {type(value).__name__}.")
+    return value
+
+
+@register("channel", pure=False)
+def _channel(capacity=0):
+    if not isinstance(capacity, int) or isinstance(capacity, bool) or capacity < 0:
+        raise TypeError("channel() expects a capacity of 0 or more.")
+    return Channel(capacity)
+
+
+@register("send", pure=False)
+def _send(channel, value):
+    _expect_channel("send", channel).send(value)
+
+
+@register("recv", pure=False)
+def _recv(channel):
+    value = _expect_channel("recv", channel).receive()
+    if value is _CLOSED:
+        raise RuntimeError("Cannot receive from a closed channel.")
+    return value
+
+
+@register("close", pure=False)
+def _close(channel):
+    _expect_channel("close", channel).close()
+
+
+_join_strings = NATIVES["join"].function
+
+
+# join(task) waits for a spawned task to finish and gives back what its function returned.
+# Any other argument goes to the string join(list, separator) from Builtins.py
+@register("join", pure=True)
+def _join(value, separator=""):
+    if not isinstance(value, Task):
+        return _join_strings(value, separator)
+    if value.done:
+        return value.result
+    return current_scheduler().join(value)
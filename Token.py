@@ -27,7 +27,7 @@ class TokenType(Enum):
     OR = 17               # or
 
     # Literals
-    FLOAT = 18            # Number literals (e.g., 3.14, 5)
+    FLOAT = 18            # Decimal number literals (e.g., 3.14)
     STRING = 19           # Text in quotes (e.g., "hello")
     BOOLEAN = 20          # true / false
 
@@ -55,6 +55,15 @@ class TokenType(Enum):
     RIGHT_BRACKET = 37    # ]
     CLASS = 38            # class keyword
     DOT = 39              # . (used for object field access)
+    COLON = 40            # : (used for slices like v[1:3])
+    IN = 41               # in keyword (for x in xs)
+    INTEGER = 42          # Whole number literals (e.g., 5)
+    FLOOR_DIV = 43        # // (integer division)
+    INTERPOLATED_STRING = 44  # Text in quotes with {expressions} inside (e.g., "hi {name}")
+    PARALLEL = 45         # parallel keyword (parallel for x in xs { ... })
+    SPAWN = 46            # spawn keyword (spawn f(args) starts a task)
+    YIELD = 47            # yield keyword (makes a function a generator)
+    IMPORT = 48           # import keyword (import "lib.luma" loads another file's definitions)
 
     # Special token
     EOF = 100             # End of file/input (used to indicate there's nothing more to parse)
@@ -0,0 +1,164 @@
+from array import array
+from itertools import repeat
+import operator
+from Token import TokenType
+
+# NumPy is optional. When it is missing vectors fall back to array('d') from the standard library
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Python operator function for every Luma operator a vector supports
+_OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.TIMES: operator.mul,
+    TokenType.DIV: operator.truediv,
+    TokenType.FLOOR_DIV: operator.floordiv,
+    TokenType.MOD: operator.mod,
+    TokenType.EXP: operator.pow,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.BANG_EQUAL: operator.ne,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+}
+
+# Comparisons produce a vector of 1.0 (true) and 0.0 (false) values
+_COMPARISONS = (
+    TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL,
+    TokenType.LESS, TokenType.LESS_EQUAL, TokenType.GREATER, TokenType.GREATER_EQUAL,
+)
+
+
+# Checks that a value is a plain Luma number (booleans are not numbers in Luma)
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Represents a numeric vector created with vec([...]) or zeros(n)
+# All elements are stored as 64-bit floats in one contiguous buffer
+class Vector:
+    def __init__(self, data):
+        self.data = data  # numpy.ndarray (float64) or array('d')
+
+    # Builds a vector from a list of numbers
+    @staticmethod
+    def from_values(values):
+        for value in values:
+            if not _is_number(value):
+                raise TypeError(f"vec() expects a list of numbers, found {type(value).__name__}.")
+        if numpy is not None:
+            return Vector(numpy.array(values, dtype=numpy.float64))
+        return Vector(array("d", values))
+
+    # Builds a vector of n zeros
+    @staticmethod
+    def zeros(n):
+        if not _is_number(n) or n < 0:
+            raise TypeError("zeros() expects a non-negative number.")
+        n = int(n)
+        if numpy is not None:
+            return Vector(numpy.zeros(n, dtype=numpy.float64))
+        return Vector(array("d", bytes(8 * n)))  # 8 zero bytes per double
+
+    def __len__(self):
+        return len(self.data)
+
+    # Iterating a vector yields Python floats, so `for x in v` sees ordinary Luma numbers
+    def __iter__(self):
+        return map(float, self.data)
+
+    # Returns the element at a position as a Python float
+    def get(self, index):
+        return float(self.data[index])
+
+    # Returns the elements between start and stop (NumPy slices share the buffer)
+    def slice(self, start, stop):
+        return Vector(self.data[start:stop])
+
+    def tolist(self):
+        return [float(value) for value in self.data]
+
+    # Applies a binary operator element-wise
+    # other can be another vector of the same length or a single number
+    # reflected is True when the vector was the right-hand operand (e.g. 2 - v)
+    def binary(self, operator_token, other, reflected=False):
+        function = _OPERATORS.get(operator_token.type)
+        if function is None or not (isinstance(other, Vector) or _is_number(other)):
+            left_name, right_name = "Vector", type(other).__name__
+            if reflected:
+                left_name, right_name = right_name, left_name
+            raise TypeError(f"Cannot use '{operator_token.lexeme}' between {left_name} and {right_name}.")
+
+        if isinstance(other, Vector):
+            if len(other) != len(self):
+                raise TypeError(f"Vector length mismatch: {len(self)} and {len(other)}.")
+            other_data = other.data
+        else:
+            other_data = float(other)
+
+        left, right = (other_data, self.data) if reflected else (self.data, other_data)
+
+        # Division and modulo by zero are errors, as they are for plain numbers
+        if operator_token.type in (TokenType.DIV, TokenType.FLOOR_DIV, TokenType.MOD):
+            has_zero = (right == 0) if isinstance(right, float) else (0.0 in right)
+            if has_zero:
+                raise ZeroDivisionError("Division by zero is not allowed.")
+
+        if numpy is not None:
+            result = function(left, right)
+            if operator_token.type in _COMPARISONS:
+                result = result.astype(numpy.float64)
+            return Vector(result)
+
+        # array('d') fallback: map() walks both buffers in C without building temporary lists
+        if isinstance(left, float):
+            left = repeat(left, len(self))
+        if isinstance(right, float):
+            right = repeat(right, len(self))
+        return Vector(array("d", map(function, left, right)))
+
+    # Element-wise negation for unary minus
+    def negate(self):
+        if numpy is not None:
+            return Vector(-self.data)
+        return Vector(array("d", map(operator.neg, self.data)))
+
+    # Element-wise absolute value for abs(v)
+    def absolute(self):
+        if numpy is not None:
+            return Vector(numpy.abs(self.data))
+        return Vector(array("d", map(abs, self.data)))
+
+    def sum(self):
+        if numpy is not None:
+            return float(numpy.sum(self.data))
+        return float(sum(self.data))
+
+    def min(self):
+        if len(self) == 0:
+            raise ValueError("min() of an empty vector.")
+        if numpy is not None:
+            return float(numpy.min(self.data))
+        return float(min(self.data))
+
+    def max(self):
+        if len(self) == 0:
+            raise ValueError("max() of an empty vector.")
+        if numpy is not None:
+            return float(numpy.max(self.data))
+        return float(max(self.data))
+
+    def dot(self, other):
+        if len(other) != len(self):
+            raise TypeError(f"Vector length mismatch: {len(self)} and {len(other)}.")
+        if numpy is not None:
+            return float(numpy.dot(self.data, other.data))
+        return float(sum(map(operator.mul, self.data, other.data)))
+
+    def __str__(self):
+        return "vec([" + ", ".join(str(value) for value in self.tolist()) + "])"
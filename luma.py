@@ -1,13 +1,24 @@
 import sys
+import argparse
+import contextvars
 from Token import Token
 from AST import AST
 import Scanner
 from Expression import Print
 from Environment import Environment
+from Output import FLUSH_LINE, FLUSH_BYTES, FLUSH_EXIT, configure_output, flush_output
+from Input import BufferedInput, RecordingInput, current_input, input_from_path, set_input
+from Output import OutputWriter, set_output
+from Errors import LumaError, LumaLimitError, LumaSyntaxError, translate_error
+from Sandbox import Limits, set_limits
+from Modules import importing_from, preload
+import Data      # Registers load_csv, load_json, dump_csv, ... (see Data.py)
+import Database  # Registers db (see Database.py)
 
 # Define a function named error which takes the line number 
 # where the error happened and the error message and prints it
 def error(line: int, message: str) -> None:
+    flush_output()  # Show everything the program printed before the error
     print(f"\nError on line {line}: {message}\n")
 
 
@@ -16,7 +27,8 @@ def error(line: int, message: str) -> None:
   # source: the user's code as a string
   # env: the enviroment (dictionary that holds variables)
   # verbose: if True, it prints debug info at each stage (tokenization, AST, evaluation)
-def run(source: str, env: Environment, verbose: bool = True) -> None:
+#   path: the file the code came from, if any (imports are relative to it)
+def run(source: str, env: Environment, verbose: bool = True, path: str = None) -> None:
 
     # This checks if the code is empty and if so a warning is printed
     if not source.strip():
@@ -50,8 +62,10 @@ def run(source: str, env: Environment, verbose: bool = True) -> None:
         if verbose:
             print("\nEvaluation Result")
 
-        # This is where the program is actually executed. It evaluates the tree using the environment
-        result = ast.evaluate(env, verbose=verbose)
+        # Parse the modules it imports ahead of time, then run it
+        preload(ast.tree, path)
+        with importing_from(path):
+            result = ast.evaluate(env, verbose=verbose)
 
         # Only print final result if it's not a Print expression
         # If it's not a print statement, output the result
@@ -69,13 +83,86 @@ def run(source: str, env: Environment, verbose: bool = True) -> None:
         error(scanner._line, f"Math Error: {str(e)}")  # Handle division by 0
     except OverflowError as e:
         error(scanner._line, f"Overflow Error: {str(e)}")  # Handle very large exponentiation
+    except LumaLimitError as e:
+        error(scanner._line, f"Limit Error: {e.message}")  # A sandbox limit was reached (e.g. --max-steps)
+    except RecursionError as e:
+        error(scanner._line, f"Limit Error: {str(e)}")  # Calls nested deeper than Python allows
     except Exception as e:
         error(scanner._line, f"Unexpected Error: {str(e)}")  # Catch any other unexpected error
+    finally:
+        flush_output()  # Write out any buffered print output once the run is over
+
+# The outcome of Program.run()
+class RunResult:
+    def __init__(self, value, globals: dict):
+        self.value = value      # Value of the last top-level statement (or of a top-level return)
+        self.globals = globals  # Top-level variables after the run, by name
+
+
+# A compiled Luma program. Scanning and parsing happen once in compile(), and the same
+# Program can then be run any number of times, including from several threads at once:
+# the tree is never modified while running and every run gets its own Environment.
+class Program:
+    def __init__(self, source: str, ast: AST, path: str = None):
+        self.source = source  # The original source code
+        self.path = path      # File the source came from, if any (imports are relative to it)
+        self._ast = ast       # The parsed tree, shared by all runs
+
+    # Runs the program in a fresh environment and returns a RunResult
+    #   globals: optional dict of variables defined before the program starts
+    #   stdout:  optional text stream for print output (default: the current output)
+    #   stdin:   optional text stream or list of lines answering ask (default: the current input)
+    #   limits:  optional Sandbox.Limits (steps, time, list and string sizes, call depth) for untrusted code
+    # Errors are raised as LumaError subclasses instead of being printed
+    def run(self, globals: dict = None, stdout=None, stdin=None, limits: Limits = None) -> RunResult:
+        # Run in a copy of the current context, so the output, input and limits used by this run
+        # never leak into the caller or into other runs happening at the same time
+        return contextvars.copy_context().run(self._run, globals, stdout, stdin, limits)
+
+    def _run(self, globals, stdout, stdin, limits) -> RunResult:
+        env = Environment()
+        for name, value in (globals or {}).items():
+            env.define(name, value)
+
+        if stdout is not None:
+            set_output(OutputWriter(stdout))
+        if stdin is not None:
+            set_input(BufferedInput(stdin) if isinstance(stdin, list) else BufferedInput.from_stream(stdin))
+        if limits is not None:
+            set_limits(limits)
+
+        try:
+            with importing_from(self.path):
+                value = self._ast.evaluate(env, verbose=False)
+        except LumaError:
+            raise
+        except Exception as e:
+            raise translate_error(e) from e
+        finally:
+            flush_output()
+
+        return RunResult(value, dict(env.variables))
+
+
+# Compiles Luma source into a reusable Program, and parses the modules it imports
+#   path: the file the source came from, if any (imports are relative to it)
+# Raises LumaSyntaxError if the source cannot be scanned or parsed
+def compile(source: str, path: str = None) -> Program:
+    scanner = Scanner.Scanner(source)
+    try:
+        tokens = scanner.scan_tokens()
+        ast = AST(tokens)
+    except Exception as e:
+        raise LumaSyntaxError(str(e), scanner._line) from e
+    preload(ast.tree, path)
+    return Program(source, ast, path)
+
 
 # Run a prompt where users can enter expressions
-def run_prompt() -> None:
+#   env: the environment to start from (default: an empty one)
+def run_prompt(env: Environment = None) -> None:
     print("Type expressions to evaluate, or type 'exit()' to quit. Type 'script()' to enter multi-line mode.\n")
-    env = Environment()  # Shared environment for variables
+    env = env if env is not None else Environment()  # Shared environment for variables
 
     while True:
         print("\n>>> ", end="")
@@ -124,23 +211,171 @@ def run_script(env: Environment) -> None:
     run(full_script, env, verbose=False)
 
 # Run file input from a .txt or .luma script
-def run_file(filename: str):
-    env = Environment()
+#   env: the environment to run it in (default: an empty one)
+def run_file(filename: str, env: Environment = None):
+    env = env if env is not None else Environment()
     try:
         with open(filename, 'r') as file:
             source = file.read()
-            run(source, env, verbose=False)  # Run the entire file at once
+            run(source, env, verbose=False, path=filename)  # Run the entire file at once
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")  # Handle if the file doesn't exist
 
 
+# Turns options like --jobs and --max-steps into a positive whole number
+def parse_count_option(value: str) -> int:
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise argparse.ArgumentTypeError("expected a positive whole number")
+
+
+# Runs many programs in parallel (the --jobs option) and exits with status 1 if any failed
+def run_batch_mode(paths, jobs: int, results_path: str = None, limits: Limits = None) -> None:
+    import time
+    from Batch import collect_programs, run_batch, report  # Batch imports this module, so import it here
+
+    programs = collect_programs(paths)
+    if not programs:
+        print("Error: No .luma files found.")
+        sys.exit(1)
+    start = time.perf_counter()
+    results = run_batch(programs, jobs, limits)
+    failed = report(results, time.perf_counter() - start, jobs, results_path)
+    sys.exit(1 if failed else 0)
+
+
+# Builds the sandbox limits from the command line, or None when no limit was given
+def limits_from_args(args):
+    values = (args.max_steps, args.timeout, args.max_list, args.max_string, args.max_depth)
+    if all(value is None for value in values) and not args.no_files:
+        return None
+    return Limits(*values, files=not args.no_files)
+
+
+# Turns the --flush option into a (mode, bytes) pair: "line", "exit" or a number of bytes
+def parse_flush_option(value: str):
+    if value in (FLUSH_LINE, FLUSH_EXIT):
+        return value, None
+    if value.isdigit() and int(value) > 0:
+        return FLUSH_BYTES, int(value)
+    raise argparse.ArgumentTypeError("expected 'line', 'exit' or a positive number of bytes")
+
+
 if __name__ == "__main__":
+    # python luma.py serve [options] starts the job server instead (see Server.py)
+    if sys.argv[1:2] == ["serve"]:
+        import Server
+        Server.main(sys.argv[2:])
+        sys.exit(0)
+    # python luma.py serve-repl [options] serves many REPL sessions at once (see ReplServer.py)
+    if sys.argv[1:2] == ["serve-repl"]:
+        import ReplServer
+        ReplServer.main(sys.argv[2:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Run a Luma program, or start the REPL when no file is given.")
+    parser.add_argument("files", nargs="*", metavar="file",
+                        help="the .luma program to run (with --jobs: any number of programs and directories)")
+    parser.add_argument("--jobs", type=parse_count_option, default=None, metavar="N",
+                        help="batch mode: run every given program in a pool of N worker processes, "
+                             "each with its own environment and captured output, and report per-file timings")
+    parser.add_argument("--results", metavar="FILE",
+                        help="with --jobs, also write every result (output, error, timing) to FILE as JSON Lines")
+    parser.add_argument("--flush", type=parse_flush_option, default=None, metavar="line|exit|BYTES",
+                        help="when print output is flushed: after every line, only at exit (and before ask), "
+                             "or every BYTES bytes (default: line for a terminal, 65536 otherwise)")
+    parser.add_argument("--input", metavar="FILE",
+                        help="answer ask prompts from FILE, one answer per line ('-' reads standard input)")
+    parser.add_argument("--echo", action="store_true",
+                        help="with --input, print each prompt and its answer as a terminal session would")
+    parser.add_argument("--record", metavar="FILE",
+                        help="save every answer given to ask in FILE, to replay later with --input FILE")
+    parser.add_argument("--workers", type=parse_count_option, metavar="N",
+                        help="worker processes used by pmap and parallel for (default: one per CPU)")
+    parser.add_argument("--threads", type=parse_count_option, metavar="N",
+                        help="run spawned tasks on a pool of N OS threads instead of taking turns in one "
+                             "(faster for CPU-bound tasks on a free-threaded Python build)")
+    parser.add_argument("--max-steps", type=parse_count_option, metavar="N",
+                        help="sandbox: stop after N loop iterations and function calls")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="sandbox: stop a program that runs longer than SECONDS")
+    parser.add_argument("--max-list", type=parse_count_option, metavar="N",
+                        help="sandbox: refuse to build lists or vectors longer than N items")
+    parser.add_argument("--max-string", type=parse_count_option, metavar="N",
+                        help="sandbox: refuse to build strings longer than N characters")
+    parser.add_argument("--max-depth", type=parse_count_option, metavar="N",
+                        help="sandbox: refuse to nest function calls deeper than N")
+    parser.add_argument("--no-files", action="store_true",
+                        help="sandbox: refuse to open, read or write files")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="start with the variables saved in FILE by --save-snapshot, instead of "
+                             "running the code that defined them again")
+    parser.add_argument("--save-snapshot", metavar="FILE",
+                        help="after the program (or REPL session) ends, save its top-level variables "
+                             "(functions, classes, instances, lists, ...) to FILE")
+    args = parser.parse_args()
+    limits = limits_from_args(args)
+
+    if args.jobs is not None:
+        if args.snapshot is not None or args.save_snapshot is not None:
+            parser.error("--snapshot and --save-snapshot cannot be used with --jobs")
+        if not args.files:
+            parser.error("--jobs needs at least one program or directory")
+        run_batch_mode(args.files, args.jobs, args.results, limits)
+    if len(args.files) > 1:
+        parser.error("running several programs needs --jobs N")
+
+    if args.input is not None:
+        try:
+            set_input(input_from_path(args.input, echo=args.echo))
+        except FileNotFoundError:
+            print(f"Error: Input file '{args.input}' not found.")
+            sys.exit(1)
+    if args.record is not None:
+        set_input(RecordingInput(current_input(), args.record))
+
+    if args.flush is not None:
+        mode, size = args.flush
+        if size is None:
+            configure_output(mode)
+        else:
+            configure_output(mode, size)
+
+    if limits is not None:
+        set_limits(limits)
+    if args.workers is not None:
+        from Parallel import set_workers
+        set_workers(args.workers)
+    if args.threads is not None:
+        from Tasks import set_threads
+        set_threads(args.threads)
+
+    env = Environment()
+    if args.snapshot is not None:
+        import Snapshot
+        try:
+            Snapshot.restore(args.snapshot, env)
+        except FileNotFoundError:
+            print(f"Error: Snapshot file '{args.snapshot}' not found.")
+            sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")  # Not a snapshot, or made by a different version of the interpreter
+            sys.exit(1)
+
     # Handle script execution with filename as argument
-    if len(sys.argv) == 2:
-        filename = sys.argv[1]
+    if args.files:
+        filename = args.files[0]
         if not filename.endswith(".luma"):
             print("Error: Only .luma files are allowed.")  # Restrict to valid Luma source files
             sys.exit(1)
-        run_file(filename)
+        run_file(filename, env)
     else:
-        run_prompt()  # Handle interactive one-line prompt
+        run_prompt(env)  # Handle interactive one-line prompt
+
+    if args.save_snapshot is not None:
+        import Snapshot
+        try:
+            Snapshot.save(env, args.save_snapshot)
+        except (TypeError, OSError) as e:
+            print(f"Error: {e}")  # A value that cannot be saved, like an open file
+            sys.exit(1)